@@ -13,8 +13,7 @@ def log_message(message):
     with open(log_file, "a") as f:
         f.write(message + "\n")
 
-from geopy.distance import geodesic
-from map import renderMap, GOLDEN_STAKE, diameterKInFeet
+from map import renderMap, diameterKInFeet, FRAME_FEET
 
 # Global variables
 FLIP_Z = True
@@ -30,46 +29,9 @@ HOUR_FONT = "Reef"
 LOWER_NUMBERS_FOLLOW_CLOCK = False  
 EXTEND_RADIAL_NAMES_BY_BLOCKS = 1.5
 
-def calculate_bearing(pointA, pointB):
-    """
-    Calculates the bearing between two points.
-    The formulae used to calculate the bearing is:
-        θ = atan2(sin(Δlong).cos(lat2),
-                  cos(lat1).sin(lat2) − sin(lat1).cos(lat2).cos(Δlong))
-    :Parameters:
-      - `pointA: The tuple representing the latitude/longitude for the
-        first point. Latitude and longitude must be in decimal degrees
-      - `pointB: The tuple representing the latitude/longitude for the
-        second point. Latitude and longitude must be in decimal degrees
-    :Returns:
-      The bearing in degrees
-    :Returns Type:
-      float
-    """
-    lat1 = math.radians(pointA[0])
-    lat2 = math.radians(pointB[0])
-    diffLong = math.radians(pointB[1] - pointA[1])
-    x = math.sin(diffLong) * math.cos(lat2)
-    y = math.cos(lat1) * math.sin(lat2) - (math.sin(lat1)
-            * math.cos(lat2) * math.cos(diffLong))
-
-    initial_bearing = math.atan2(x, y)
-    initial_bearing = math.degrees(initial_bearing)
-    compass_bearing = (initial_bearing + 360) % 360
-
-    return compass_bearing
-
-def convertGeoToFeet(coordinates):
-    # Calculate the distance and bearing from the GOLDEN_STAKE
-    distance = geodesic(GOLDEN_STAKE, coordinates).feet
-    bearing = calculate_bearing(GOLDEN_STAKE, coordinates)
-    angle = math.radians(bearing)
-    x = distance * math.sin(angle)
-    y = distance * math.cos(angle)
-    return x, y
-
 def point_to_cm(point, mirror_x, flip_z, feet_per_cm, move_x, move_y):
-    x, y = convertGeoToFeet(point)
+    # renderMap is called with frame=FRAME_FEET, so points are already feet east/north of the Golden Stake
+    x, y = point
     if mirror_x:
         x = -x
     if flip_z:
@@ -355,7 +317,8 @@ def render_map(sketch, sketch_text, sketch_fence, flip_z, mirror_x, city_diamete
         lambda hour, minute, location, bearing: add_fusion_hour_label(
             sketch_text, hour, minute, location, bearing, hour_font_size, hour_font, lower_numbers_follow_clock, flip_z, mirror_x, feet_per_cm, move_x, move_y, move_z),
         None, #lambda location, width, name: add_fusion_circle(sketch, location, width, name, flip_z, mirror_x, feet_per_cm, move_x, move_y, move_z),  # addAirport 
-        extend_radial_names_by_blocks
+        extend_radial_names_by_blocks,
+        frame=FRAME_FEET
     )
     log_message("Finished rendering the map")
 
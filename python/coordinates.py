@@ -1,9 +1,16 @@
 # source: https://github.com/heavior/burningman-map-functions
 # don't forget to push changes there as well!
 
-from geopy.distance import distance as geopy_distance
+from geographiclib.geodesic import Geodesic
+import numpy as np
 import re
 import math
+import functools
+from collections import namedtuple
+from dataclasses import dataclass, fields
+from types import MappingProxyType
+import hashlib
+import os
 
 YEAR = 2024 # Important: Man moves, so you need to check the latest
 
@@ -31,7 +38,6 @@ MINUTE_DEGREE = .5
 # True North/South follows the 4:30 axis
 southHour = 4
 southMinute = 30
-midnightBearing = 180 - (southHour * HOUR_DEGREE + southMinute * MINUTE_DEGREE)
 
 # Promenades are 40’ wide on the 3:00/9:00 and 6:00/12:00 axis, with lantern spires approximately every 150’.
 promenadeWidthInFeet = 40
@@ -85,22 +91,6 @@ streetDepths = {
     'j': depthItoKInFeet,
     'k': depthItoKInFeet
 }
-lastStreet = 'k'
-
-# A quick pass to create distance from man for each street
-distanceToStreetCenter = {}
-cumulative_distance = 0
-
-streetDepths['esplanade'] -= annularStreetWidthInFeet - (esplanadeWidthInFeet - annularStreetWidthInFeet)/2
-for street, depth in streetDepths.items():
-    cumulative_distance += depth + annularStreetWidthInFeet
-    distanceToStreetCenter[street] = cumulative_distance
-streetDepths['esplanade'] += annularStreetWidthInFeet
-distanceToStreetCenter['esplanade'] -= (esplanadeWidthInFeet - annularStreetWidthInFeet)/2
-
-distanceToStreetCenter['k'] += (outerStreetWidthInFeet-annularStreetWidthInFeet)/2
-
-assert distanceToStreetCenter['k'] * 2 == diameterKInFeet, f"Street width calculations do not match defined K street diameter {distanceToStreetCenter['k'] * 2} vs {diameterKInFeet}"
 
 """
 Man to the center of Central Canopy = 2,999’
@@ -114,26 +104,7 @@ centerCampRadiusInsideInFeet = 250 # eyeballing based on PDF map, NO OFFICIAL DA
 
 # centerCampRadiusOutsideInFeet = 763
 # centerCampRadiusToRodsRingInFeet = 783
-
-centerCampRadiusOutsideInFeet = math.sqrt(
-    manToCenterOfCenterCampInFeet*manToCenterOfCenterCampInFeet + distanceToStreetCenter['a']*distanceToStreetCenter['a']
-    - 2*manToCenterOfCenterCampInFeet * distanceToStreetCenter['a']*math.cos(math.radians(MINUTE_DEGREE * 30)))
-
-centerCampRadiusToRodsRingInFeet = centerCampRadiusOutsideInFeet
-
-
-centerCampStreetCrossRadius = 1 # some default setting
-centerCampOuterRadius = centerCampRadiusToRodsRingInFeet # outer radius of center camp that look into playa
-
-# defining the center camp circle road that breaks letter streets:
-if YEAR == 2023:
-    centerCampStreetName = "Rod’s Ring Road"  
-    centerCampStreetCrossRadius = centerCampRadiusToRodsRingInFeet 
-if YEAR == 2024:
-    centerCampStreetName = "Center Camp"  
-    centerCampStreetCrossRadius = centerCampRadiusInsideInFeet # 2024
-
-        
+# the rest of center camp dimensions depends on the year, see CityLayout
 
 """
 There are five plaza portals to the Esplanade: at 6:00 (Center Camp), 3:00, 4:30, 7:30, and
@@ -141,19 +112,6 @@ There are five plaza portals to the Esplanade: at 6:00 (Center Camp), 3:00, 4:30
 """
 portalMouthInFeet = 210 # not used, I think
 
-def bearing(hours, minutes):
-    result =  midnightBearing + hours * HOUR_DEGREE + minutes * MINUTE_DEGREE
-    if result < 0:
-        result += 360
-    if result > 360:
-        result -= 360
-    return result
-
-def letterToDistance(letter):
-    return distanceToStreetCenter[letter.lower()]
-
-
-
 """
 Plazas are at 3:00, 4:30, 7:30 and 9:00 and Baffle, centered 3215’ from the Man. A ring
 of mid-city plazas at 3:00, 4:30, 6:00, 7:30, and 9:00 are at Gobsmack, centered 4,815’
@@ -164,27 +122,206 @@ innerPlazaToManInFeet = 3215 # Not used, using center of intersection to render
 outerPlazaToManInFeet = 4815 # Not used, using center of intersection to render plazas
 plazaWidth = 5 * radialAvenueWidthInFeet # magical number
 
-plazaOuterWidth = 0 # defines circles around plazas on the map
-plazaOuterWidth6 = 2*(depthAtoIInFeet + annularStreetWidthInFeet) # plaza behind center camp - magical number
-
-if YEAR == 2023: # in 2023, circles were around each plaza
-    plazaOuterWidth = plazaOuterWidth6
+# circles around plazas and the list of plazas depend on the year, see CityLayout
 
-# TODO: create formatName function and use it here to name plazas
-plazas = [
-    (3, 00, letterToDistance('b'), plazaWidth, plazaOuterWidth, "3:00 & B Plaza"),
-    (4, 30, letterToDistance('b'), plazaWidth, plazaOuterWidth, "4:30 & B Plaza"),
-    (7, 30, letterToDistance('b'), plazaWidth, plazaOuterWidth, "7:30 & B Plaza"),
-    (9, 00, letterToDistance('b'), plazaWidth, plazaOuterWidth, "9:00 & B Plaza"),
+# per-year overrides of the measurements above, add the new year here when the data is published
+YEAR_CONFIGS = {
+    2023: {},
+    2024: {},
+}
 
-    (3, 00, letterToDistance('g'), plazaWidth, plazaOuterWidth, "3:00 & G Plaza"),
-    (4, 30, letterToDistance('g'), plazaWidth, plazaOuterWidth, "4:30 & G Plaza"),
-    (6, 00, letterToDistance('g'), plazaWidth, plazaOuterWidth6, "6:00 & G Plaza"),
-    (7, 30, letterToDistance('g'), plazaWidth, plazaOuterWidth, "7:30 & G Plaza"),
-    (9, 00, letterToDistance('g'), plazaWidth, plazaOuterWidth, "9:00 & G Plaza"),
-]
+"""
+CityLayout holds the measurements of one year plus every table derived from them (street distances,
+center camp radii, plazas), computed once when the layout is built. Layouts are immutable, so one process can
+render and geocode several years at the same time - functions in this library take layout=None and use
+DEFAULT_LAYOUT (the layout for YEAR) when it's not given:
+    layout2023 = layoutForYear(2023)
+    locationObjectToCoordinate(location, layout=layout2023)
+To try other parameters build a new layout instead of changing module constants:
+    dataclasses.replace(layoutForYear(2024), centerCampRadiusInsideInFeet=300)
+"""
+@dataclass(frozen=True, eq=False)
+class CityLayout:
+    year: int
+    goldenStake: tuple
+    elevation: float
+    fencePoints: tuple
+    airportCoordinates: tuple
+    manToTempleInFeet: float
+    templeRadiusInFeet: float
+    manRadiusInFeet: float
+    southHour: int
+    southMinute: int
+    promenadeWidthInFeet: float
+    streetDepths: tuple # ((street, depth), ...) from esplanade out, first entry is the distance from the Man to esplanade
+    depthAtoIInFeet: float
+    diameterKInFeet: float
+    radialAvenueWidthInFeet: float
+    annularStreetWidthInFeet: float
+    esplanadeWidthInFeet: float
+    outerStreetWidthInFeet: float
+    quaterHourStreetWidthinFeet: float
+    quaterHourStreetsStartAt: str
+    manToCenterOfCenterCampInFeet: float
+    centerCampRadiusInsideInFeet: float
+    portalMouthInFeet: float
+    plazaWidth: float
+
+    def __post_init__(self):
+        derived = {}
+        derived['midnightBearing'] = 180 - (self.southHour * HOUR_DEGREE + self.southMinute * MINUTE_DEGREE)
+
+        # A quick pass to create distance from man for each street
+        depths = dict(self.streetDepths)
+        distanceToStreetCenter = {}
+        cumulative_distance = 0
+        depths['esplanade'] -= self.annularStreetWidthInFeet - (self.esplanadeWidthInFeet - self.annularStreetWidthInFeet)/2
+        for street, depth in depths.items():
+            cumulative_distance += depth + self.annularStreetWidthInFeet
+            distanceToStreetCenter[street] = cumulative_distance
+        distanceToStreetCenter['esplanade'] -= (self.esplanadeWidthInFeet - self.annularStreetWidthInFeet)/2
+        lastStreet = list(distanceToStreetCenter)[-1]
+        distanceToStreetCenter[lastStreet] += (self.outerStreetWidthInFeet - self.annularStreetWidthInFeet)/2
+
+        if distanceToStreetCenter[lastStreet] * 2 != self.diameterKInFeet:
+            raise ValueError(f"Street width calculations do not match defined K street diameter {distanceToStreetCenter[lastStreet] * 2} vs {self.diameterKInFeet}")
+
+        derived['distanceToStreetCenter'] = MappingProxyType(distanceToStreetCenter)
+        derived['streetIndex'] = MappingProxyType({street: index for index, street in enumerate(distanceToStreetCenter)})
+        derived['lastStreet'] = lastStreet
+
+        centerCampRadiusOutsideInFeet = math.sqrt(
+            self.manToCenterOfCenterCampInFeet*self.manToCenterOfCenterCampInFeet + distanceToStreetCenter['a']*distanceToStreetCenter['a']
+            - 2*self.manToCenterOfCenterCampInFeet * distanceToStreetCenter['a']*math.cos(math.radians(MINUTE_DEGREE * 30)))
+        derived['centerCampRadiusOutsideInFeet'] = centerCampRadiusOutsideInFeet
+        derived['centerCampRadiusToRodsRingInFeet'] = centerCampRadiusOutsideInFeet
+        derived['centerCampOuterRadius'] = centerCampRadiusOutsideInFeet # outer radius of center camp that look into playa
+
+        # defining the center camp circle road that breaks letter streets:
+        derived['centerCampStreetName'] = None
+        derived['centerCampStreetCrossRadius'] = 1 # some default setting
+        if self.year == 2023:
+            derived['centerCampStreetName'] = "Rod’s Ring Road"
+            derived['centerCampStreetCrossRadius'] = centerCampRadiusOutsideInFeet
+        if self.year == 2024:
+            derived['centerCampStreetName'] = "Center Camp"
+            derived['centerCampStreetCrossRadius'] = self.centerCampRadiusInsideInFeet
+
+        plazaOuterWidth = 0 # defines circles around plazas on the map
+        plazaOuterWidth6 = 2*(self.depthAtoIInFeet + self.annularStreetWidthInFeet) # plaza behind center camp - magical number
+        if self.year == 2023: # in 2023, circles were around each plaza
+            plazaOuterWidth = plazaOuterWidth6
+        derived['plazaOuterWidth'] = plazaOuterWidth
+        derived['plazaOuterWidth6'] = plazaOuterWidth6
+
+        # TODO: create formatName function and use it here to name plazas
+        plazaWidth = self.plazaWidth
+        derived['plazas'] = (
+            (3, 00, distanceToStreetCenter['b'], plazaWidth, plazaOuterWidth, "3:00 & B Plaza"),
+            (4, 30, distanceToStreetCenter['b'], plazaWidth, plazaOuterWidth, "4:30 & B Plaza"),
+            (7, 30, distanceToStreetCenter['b'], plazaWidth, plazaOuterWidth, "7:30 & B Plaza"),
+            (9, 00, distanceToStreetCenter['b'], plazaWidth, plazaOuterWidth, "9:00 & B Plaza"),
+
+            (3, 00, distanceToStreetCenter['g'], plazaWidth, plazaOuterWidth, "3:00 & G Plaza"),
+            (4, 30, distanceToStreetCenter['g'], plazaWidth, plazaOuterWidth, "4:30 & G Plaza"),
+            (6, 00, distanceToStreetCenter['g'], plazaWidth, plazaOuterWidth6, "6:00 & G Plaza"),
+            (7, 30, distanceToStreetCenter['g'], plazaWidth, plazaOuterWidth, "7:30 & G Plaza"),
+            (9, 00, distanceToStreetCenter['g'], plazaWidth, plazaOuterWidth, "9:00 & G Plaza"),
+        )
+
+        # identifies the layout in cache keys and file names
+        derived['fingerprint'] = hashlib.sha1(repr(self.config()).encode()).hexdigest()
+
+        for name, value in derived.items():
+            object.__setattr__(self, name, value)
+
+    def config(self):
+        return {field.name: getattr(self, field.name) for field in fields(self)}
+
+    def __reduce__(self):
+        # pickled as its fields, derived values (mapping proxies) are computed again, so layouts can go to worker processes
+        return (CityLayout, tuple(getattr(self, field.name) for field in fields(self)))
+
+def baseLayoutConfig():
+    # measurements defined at the top of this file
+    return {
+        'goldenStake': tuple(GOLDEN_STAKE),
+        'elevation': ELEVATION,
+        'fencePoints': tuple(tuple(point) for point in fencePoints),
+        'airportCoordinates': tuple(AIRPORT_COORDINATES),
+        'manToTempleInFeet': manToTempleInFeet,
+        'templeRadiusInFeet': templeRadiusInFeet,
+        'manRadiusInFeet': manRadiusInFeet,
+        'southHour': southHour,
+        'southMinute': southMinute,
+        'promenadeWidthInFeet': promenadeWidthInFeet,
+        'streetDepths': tuple(streetDepths.items()),
+        'depthAtoIInFeet': depthAtoIInFeet,
+        'diameterKInFeet': diameterKInFeet,
+        'radialAvenueWidthInFeet': radialAvenueWidthInFeet,
+        'annularStreetWidthInFeet': annularStreetWidthInFeet,
+        'esplanadeWidthInFeet': esplanadeWidthInFeet,
+        'outerStreetWidthInFeet': outerStreetWidthInFeet,
+        'quaterHourStreetWidthinFeet': quaterHourStreetWidthinFeet,
+        'quaterHourStreetsStartAt': quaterHourStreetsStartAt,
+        'manToCenterOfCenterCampInFeet': manToCenterOfCenterCampInFeet,
+        'centerCampRadiusInsideInFeet': centerCampRadiusInsideInFeet,
+        'portalMouthInFeet': portalMouthInFeet,
+        'plazaWidth': plazaWidth,
+    }
 
+def layoutFromConfig(config):
+    """
+    Builds a layout from a (partial) config dict, for example loaded from json. Missing values come from
+    the base config and YEAR_CONFIGS, lists are converted to tuples
+    """
+    year = config.get('year', YEAR)
+    merged = dict(baseLayoutConfig(), **YEAR_CONFIGS.get(year, {}))
+    merged.update(config)
+    merged['year'] = year
+    if isinstance(merged['streetDepths'], dict):
+        merged['streetDepths'] = tuple(merged['streetDepths'].items())
+    merged['streetDepths'] = tuple((street.lower(), depth) for street, depth in merged['streetDepths'])
+    merged['fencePoints'] = tuple(tuple(point) for point in merged['fencePoints'])
+    merged['goldenStake'] = tuple(merged['goldenStake'])
+    merged['airportCoordinates'] = tuple(merged['airportCoordinates'])
+    return CityLayout(**merged)
+
+@functools.lru_cache(maxsize=None)
+def layoutForYear(year):
+    # built on first use, then shared
+    if year not in YEAR_CONFIGS:
+        raise ValueError(f"No layout config for year {year}, expected one of {list(YEAR_CONFIGS)}")
+    return layoutFromConfig({'year': year})
+
+# built at import on purpose: about 0.1 ms of a ~140 ms import that is nearly all numpy (python -X importtime -c "import coordinates"),
+# and star importers (map, geojson_map, incremental_render) and the module level names below read it as a plain global
+DEFAULT_LAYOUT = layoutForYear(YEAR)
+
+# module level names for scripts that read them directly, they describe DEFAULT_LAYOUT - changing them has no effect
+midnightBearing = DEFAULT_LAYOUT.midnightBearing
+distanceToStreetCenter = dict(DEFAULT_LAYOUT.distanceToStreetCenter)
+lastStreet = DEFAULT_LAYOUT.lastStreet
+centerCampRadiusOutsideInFeet = DEFAULT_LAYOUT.centerCampRadiusOutsideInFeet
+centerCampRadiusToRodsRingInFeet = DEFAULT_LAYOUT.centerCampRadiusToRodsRingInFeet
+centerCampOuterRadius = DEFAULT_LAYOUT.centerCampOuterRadius
+centerCampStreetName = DEFAULT_LAYOUT.centerCampStreetName
+centerCampStreetCrossRadius = DEFAULT_LAYOUT.centerCampStreetCrossRadius
+plazaOuterWidth = DEFAULT_LAYOUT.plazaOuterWidth
+plazaOuterWidth6 = DEFAULT_LAYOUT.plazaOuterWidth6
+plazas = list(DEFAULT_LAYOUT.plazas)
+
+def bearing(hours, minutes, layout=None):
+    layout = layout or DEFAULT_LAYOUT
+    result =  layout.midnightBearing + hours * HOUR_DEGREE + minutes * MINUTE_DEGREE
+    if result < 0:
+        result += 360
+    if result > 360:
+        result -= 360
+    return result
 
+def letterToDistance(letter, layout=None):
+    return (layout or DEFAULT_LAYOUT).distanceToStreetCenter[letter.lower()]
 
 # before calling view functions, convert Points to simple lists 
 def point_to_list(point):
@@ -193,16 +330,381 @@ def point_to_list(point):
 """
 number of helpful functions to calculate coordinates based on stuff
 """
+# geopy imports all of its geocoders with it (~0.1s), so it's only loaded on the first scalar karney call.
+# Batch functions and other backends never need it
+geopy_distance = None
+
 def distanceBearingFromCenter(distance, bearing, center):
-    return point_to_list(geopy_distance(feet = distance).destination(center, bearing = bearing))
-def distanceBearingToCoordinate(distance, bearing):
-    return distanceBearingFromCenter(distance, bearing, GOLDEN_STAKE)
-def distanceToCoordinate(distance, hours, minutes):
-    return distanceBearingToCoordinate(distance, bearing(hours, minutes))
-def addressToCoordinate(letter, hours, minutes):
-    return distanceToCoordinate(letterToDistance(letter), hours, minutes)
-def letterBearingToCoordinate(letter, bearing):
-    return distanceBearingToCoordinate(letterToDistance(letter), bearing)
+    global geopy_distance
+    if geodesicBackend == GEODESIC_KARNEY:
+        if geopy_distance is None:
+            from geopy.distance import distance as geopy_distance
+        return point_to_list(geopy_distance(feet = distance).destination(center, bearing = bearing))
+    destination, inverse = GEODESIC_BACKENDS[geodesicBackend]
+    return destination(distance, bearing, center)[0].tolist()
+def distanceBearingToCoordinate(distance, bearing, layout=None):
+    return distanceBearingFromCenter(distance, bearing, (layout or DEFAULT_LAYOUT).goldenStake)
+def distanceToCoordinate(distance, hours, minutes, layout=None):
+    return distanceBearingToCoordinate(distance, bearing(hours, minutes, layout), layout)
+def addressToCoordinate(letter, hours, minutes, layout=None):
+    layout = layout or DEFAULT_LAYOUT
+    address = normalizeAddress(letter, hours, minutes)
+    grid = intersectionGrids.get((layout, geodesicBackend))
+    if grid is not None:
+        index = gridIndex(*address, layout)
+        if index is not None:
+            return grid[index].tolist()
+    return list(cachedAddressToCoordinate(layout, geodesicBackend, *address))
+def letterBearingToCoordinate(letter, bearing, layout=None):
+    return distanceBearingToCoordinate(letterToDistance(letter, layout), bearing, layout)
+
+"""
+Address cache: the city only has ~12 streets x ~100 clock positions, and dozens of camps share one address,
+so addressToCoordinate memoizes on the normalized address. Cache is bounded, and keyed by the layout and
+the geodesic backend, so several years can share it and switching backends never returns stale points.
+bearing() and letterToDistance() are not wrapped: they are cheaper than a cache lookup.
+"""
+ADDRESS_CACHE_SIZE = 4096
+
+def normalizeAddress(letter, hours, minutes):
+    # "E", 4, 60 and "e", 5, 0 are the same address
+    total = hours * 60 + minutes
+    return letter.lower(), total // 60, total % 60
+
+@functools.lru_cache(maxsize=ADDRESS_CACHE_SIZE)
+def cachedAddressToCoordinate(layout, backend, letter, hours, minutes):
+    # backend is only part of the key, distanceBearingFromCenter reads the current one
+    return tuple(distanceToCoordinate(letterToDistance(letter, layout), hours, minutes, layout))
+
+def clearAddressCache():
+    cachedAddressToCoordinate.cache_clear()
+
+def addressCacheInfo():
+    # named tuple with hits, misses, maxsize, currsize
+    return cachedAddressToCoordinate.cache_info()
+
+"""
+Intersection grid: every letter street x every 5 minutes from 2:00 to 10:00, as a (streets, times, 2) array of lat/lon.
+Build it once per layout and save it as .npy, other processes load it memory mapped instead of recomputing,
+so worker processes share the same pages. While a grid is loaded addressToCoordinate and addressToCoordinateBatch
+(so locationObjectsToCoordinates) read on-grid addresses from it.
+File name carries the layout fingerprint and the backend, a grid for a different layout is never picked up.
+"""
+GRID_FIRST_MINUTE = 2 * 60
+GRID_LAST_MINUTE = 10 * 60
+GRID_STEP_MINUTES = 5
+
+intersectionGrids = {} # (layout, geodesic backend) -> memory mapped grid
+
+def gridIndex(letter, hours, minutes, layout=None):
+    # (street, time) index in the intersection grid, None for addresses that are not on the grid
+    streetIndex = (layout or DEFAULT_LAYOUT).streetIndex
+    total = hours * 60 + minutes
+    if letter not in streetIndex or total < GRID_FIRST_MINUTE or total > GRID_LAST_MINUTE \
+            or (total - GRID_FIRST_MINUTE) % GRID_STEP_MINUTES != 0:
+        return None
+    return streetIndex[letter], int((total - GRID_FIRST_MINUTE) // GRID_STEP_MINUTES)
+
+def buildIntersectionGrid(layout=None):
+    layout = layout or DEFAULT_LAYOUT
+    streets = list(layout.distanceToStreetCenter)
+    times = np.arange(GRID_FIRST_MINUTE, GRID_LAST_MINUTE + 1, GRID_STEP_MINUTES)
+    letters = np.repeat(streets, len(times))
+    minutes = np.tile(times, len(streets))
+    grid = addressToCoordinateBatch(letters, minutes // 60, minutes % 60, layout)
+    return grid.reshape(len(streets), len(times), 2)
+
+def intersectionGridPath(directory='.', layout=None):
+    layout = layout or DEFAULT_LAYOUT
+    fingerprint = hashlib.sha1((layout.fingerprint + geodesicBackend).encode()).hexdigest()[:12]
+    return os.path.join(directory, f"intersections_{layout.year}_{fingerprint}.npy")
+
+def saveIntersectionGrid(directory='.', layout=None):
+    path = intersectionGridPath(directory, layout)
+    np.save(path, buildIntersectionGrid(layout))
+    return path
+
+def loadIntersectionGrid(directory='.', build=True, layout=None):
+    # memory maps the grid for the layout and the current backend, building and saving it first if it doesn't exist yet
+    layout = layout or DEFAULT_LAYOUT
+    path = intersectionGridPath(directory, layout)
+    if not os.path.isfile(path):
+        if not build:
+            raise FileNotFoundError(f"No intersection grid for the layout: {path}")
+        saveIntersectionGrid(directory, layout)
+    grid = np.load(path, mmap_mode='r')
+    intersectionGrids[(layout, geodesicBackend)] = grid
+    return grid
+
+def unloadIntersectionGrid(layout=None):
+    layout = layout or DEFAULT_LAYOUT
+    for key in [key for key in intersectionGrids if key[0] is layout]:
+        del intersectionGrids[key]
+
+"""
+Batch versions of the functions above: same arguments, but accept numpy arrays (or anything numpy can broadcast)
+and return an (N, 2) array of [lat, lon] rows. Use these when geocoding whole datasets or densifying arcs,
+per-call geopy overhead dominates otherwise.
+"""
+FEET_TO_METERS = 0.3048
+
+# WGS-84, same ellipsoid geopy uses by default
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_B = (1 - WGS84_F) * WGS84_A
+
+def bearingBatch(hours, minutes, layout=None):
+    result = (layout or DEFAULT_LAYOUT).midnightBearing + np.asarray(hours, dtype=float) * HOUR_DEGREE + np.asarray(minutes, dtype=float) * MINUTE_DEGREE
+    result = np.where(result < 0, result + 360, result)
+    result = np.where(result > 360, result - 360, result)
+    return result
+
+def vincentyDestinationBatch(distances, bearings, centers):
+    """
+    Vincenty's direct formula, vectorized. Agrees with geopy's geodesic (Karney) to well under a millimeter at city scale,
+    so it serves batch calls of the "karney" backend, scalar calls still go through geopy.
+    distances are in feet, bearings in degrees, centers is a single [lat, lon] or an (N, 2) array of them
+    """
+    distances = np.asarray(distances, dtype=float) * FEET_TO_METERS
+    alpha1 = np.radians(np.asarray(bearings, dtype=float))
+    centers = np.asarray(centers, dtype=float)
+    lat1 = np.radians(centers[..., 0])
+    lon1 = np.radians(centers[..., 1])
+    distances, alpha1, lat1, lon1 = np.broadcast_arrays(distances, alpha1, lat1, lon1)
+
+    sinAlpha1 = np.sin(alpha1)
+    cosAlpha1 = np.cos(alpha1)
+    tanU1 = (1 - WGS84_F) * np.tan(lat1)
+    cosU1 = 1 / np.sqrt(1 + tanU1 * tanU1)
+    sinU1 = tanU1 * cosU1
+    sigma1 = np.arctan2(tanU1, cosAlpha1)
+    sinAlpha = cosU1 * sinAlpha1
+    cosSqAlpha = 1 - sinAlpha * sinAlpha
+    uSq = cosSqAlpha * (WGS84_A * WGS84_A - WGS84_B * WGS84_B) / (WGS84_B * WGS84_B)
+    A = 1 + uSq / 16384 * (4096 + uSq * (-768 + uSq * (320 - 175 * uSq)))
+    B = uSq / 1024 * (256 + uSq * (-128 + uSq * (74 - 47 * uSq)))
+
+    sigma = distances / (WGS84_B * A)
+    for _ in range(100):
+        cos2SigmaM = np.cos(2 * sigma1 + sigma)
+        sinSigma = np.sin(sigma)
+        cosSigma = np.cos(sigma)
+        deltaSigma = B * sinSigma * (cos2SigmaM + B / 4 * (cosSigma * (-1 + 2 * cos2SigmaM * cos2SigmaM) -
+                        B / 6 * cos2SigmaM * (-3 + 4 * sinSigma * sinSigma) * (-3 + 4 * cos2SigmaM * cos2SigmaM)))
+        previousSigma = sigma
+        sigma = distances / (WGS84_B * A) + deltaSigma
+        if np.all(np.abs(sigma - previousSigma) < 1e-12):
+            break
+
+    cos2SigmaM = np.cos(2 * sigma1 + sigma)
+    sinSigma = np.sin(sigma)
+    cosSigma = np.cos(sigma)
+    tmp = sinU1 * sinSigma - cosU1 * cosSigma * cosAlpha1
+    lat2 = np.arctan2(sinU1 * cosSigma + cosU1 * sinSigma * cosAlpha1,
+                      (1 - WGS84_F) * np.sqrt(sinAlpha * sinAlpha + tmp * tmp))
+    lam = np.arctan2(sinSigma * sinAlpha1, cosU1 * cosSigma - sinU1 * sinSigma * cosAlpha1)
+    C = WGS84_F / 16 * cosSqAlpha * (4 + WGS84_F * (4 - 3 * cosSqAlpha))
+    L = lam - (1 - C) * WGS84_F * sinAlpha * (sigma + C * sinSigma * (cos2SigmaM + C * cosSigma * (-1 + 2 * cos2SigmaM * cos2SigmaM)))
+    lon2 = lon1 + L
+
+    return np.column_stack((np.degrees(lat2).ravel(), np.degrees(lon2).ravel()))
+
+def karneyInverseBatch(center, coordinates):
+    # returns distances in feet and bearings in degrees from the center to each coordinate
+    # geographiclib's Karney inverse, one call per point, it has no vectorized form
+    results = [Geodesic.WGS84.Inverse(center[0], center[1], coordinate[0], coordinate[1]) for coordinate in coordinates]
+    return np.array([result['s12'] for result in results]) / FEET_TO_METERS, np.array([result['azi1'] for result in results]) % 360
+
+"""
+Alternative geodesic backends. Both are closed-form and vectorized, and only meant to be exact enough at city scale:
+- spherical: great circle on a sphere with the Gaussian mean radius at the center, the Golden Stake of the layout
+- tangent-plane: steps in the local east/north plane of the center, and drops the point back to the ellipsoid via ECEF
+Run geodesic_scorecard.py to see how far each one is from karney for everything the map renders.
+"""
+GEODESIC_KARNEY = 'karney' # geopy, today's behavior, batch destinations use Vincenty's formula
+GEODESIC_SPHERICAL = 'spherical'
+GEODESIC_TANGENT_PLANE = 'tangent-plane'
+
+WGS84_E2 = WGS84_F * (2 - WGS84_F)
+
+def localRadius(latitude):
+    # Gaussian mean radius of curvature, in meters, latitude can be an array
+    sinLat = np.sin(np.radians(latitude))
+    w = 1 - WGS84_E2 * sinLat * sinLat
+    meridional = WGS84_A * (1 - WGS84_E2) / w ** 1.5
+    primeVertical = WGS84_A / np.sqrt(w)
+    return np.sqrt(meridional * primeVertical)
+
+@functools.lru_cache(maxsize=None)
+def sphereRadius(latitude):
+    # radius for a single center, the batch functions are called with the same layout.goldenStake over and over
+    return float(localRadius(latitude))
+
+def sphericalDestinationBatch(distances, bearings, centers):
+    centers = np.asarray(centers, dtype=float)
+    radius = sphereRadius(float(centers[0])) if centers.ndim == 1 else localRadius(centers[..., 0])
+    delta = np.asarray(distances, dtype=float) * FEET_TO_METERS / radius
+    theta = np.radians(np.asarray(bearings, dtype=float))
+    lat1 = np.radians(centers[..., 0])
+    lon1 = np.radians(centers[..., 1])
+    delta, theta, lat1, lon1 = np.broadcast_arrays(delta, theta, lat1, lon1)
+
+    lat2 = np.arcsin(np.sin(lat1) * np.cos(delta) + np.cos(lat1) * np.sin(delta) * np.cos(theta))
+    lon2 = lon1 + np.arctan2(np.sin(theta) * np.sin(delta) * np.cos(lat1), np.cos(delta) - np.sin(lat1) * np.sin(lat2))
+    return np.column_stack((np.degrees(lat2).ravel(), np.degrees(lon2).ravel()))
+
+def sphericalInverseBatch(center, coordinates):
+    coordinates = np.asarray(coordinates, dtype=float).reshape(-1, 2)
+    lat1 = math.radians(center[0])
+    lat2 = np.radians(coordinates[:, 0])
+    diffLon = np.radians(coordinates[:, 1] - center[1])
+    haversine = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin(diffLon / 2) ** 2
+    distances = 2 * sphereRadius(float(center[0])) * np.arcsin(np.sqrt(haversine)) / FEET_TO_METERS
+    bearings = np.degrees(np.arctan2(np.sin(diffLon) * np.cos(lat2),
+                                     math.cos(lat1) * np.sin(lat2) - math.sin(lat1) * np.cos(lat2) * np.cos(diffLon)))
+    return distances, bearings % 360
+
+def geodeticToEcef(lat, lon):
+    sinLat = np.sin(lat)
+    primeVertical = WGS84_A / np.sqrt(1 - WGS84_E2 * sinLat * sinLat)
+    return np.stack((primeVertical * np.cos(lat) * np.cos(lon),
+                     primeVertical * np.cos(lat) * np.sin(lon),
+                     primeVertical * (1 - WGS84_E2) * sinLat), axis=-1)
+
+def ecefToGeodetic(ecef):
+    # Bowring's formula, a single step is sub-millimeter for points this close to the surface
+    x, y, z = ecef[..., 0], ecef[..., 1], ecef[..., 2]
+    ep2 = WGS84_E2 / (1 - WGS84_E2)
+    p = np.hypot(x, y)
+    theta = np.arctan2(z * WGS84_A, p * WGS84_B)
+    lat = np.arctan2(z + ep2 * WGS84_B * np.sin(theta) ** 3, p - WGS84_E2 * WGS84_A * np.cos(theta) ** 3)
+    return lat, np.arctan2(y, x)
+
+def eastNorthAxes(lat, lon):
+    east = np.stack((-np.sin(lon), np.cos(lon), np.zeros_like(lon)), axis=-1)
+    north = np.stack((-np.sin(lat) * np.cos(lon), -np.sin(lat) * np.sin(lon), np.cos(lat)), axis=-1)
+    return east, north
+
+def tangentPlaneDestinationBatch(distances, bearings, centers):
+    distances = np.asarray(distances, dtype=float) * FEET_TO_METERS
+    theta = np.radians(np.asarray(bearings, dtype=float))
+    centers = np.asarray(centers, dtype=float)
+    lat1 = np.radians(centers[..., 0])
+    lon1 = np.radians(centers[..., 1])
+    distances, theta, lat1, lon1 = np.broadcast_arrays(distances, theta, lat1, lon1)
+
+    east, north = eastNorthAxes(lat1, lon1)
+    ecef = geodeticToEcef(lat1, lon1) + \
+        (distances * np.sin(theta))[..., None] * east + (distances * np.cos(theta))[..., None] * north
+    lat2, lon2 = ecefToGeodetic(ecef)
+    return np.column_stack((np.degrees(lat2).ravel(), np.degrees(lon2).ravel()))
+
+def tangentPlaneInverseBatch(center, coordinates):
+    coordinates = np.radians(np.asarray(coordinates, dtype=float).reshape(-1, 2))
+    lat1 = np.radians(center[0])
+    lon1 = np.radians(center[1])
+    east, north = eastNorthAxes(lat1, lon1)
+    offsets = geodeticToEcef(coordinates[:, 0], coordinates[:, 1]) - geodeticToEcef(lat1, lon1)
+    x = offsets @ east
+    y = offsets @ north
+    return np.hypot(x, y) / FEET_TO_METERS, np.degrees(np.arctan2(x, y)) % 360
+
+# name -> (destination, inverse), batch functions with the signatures of vincentyDestinationBatch and karneyInverseBatch
+GEODESIC_BACKENDS = {
+    GEODESIC_KARNEY: (vincentyDestinationBatch, karneyInverseBatch), # batch destinations are Vincenty, close enough to Karney
+    GEODESIC_SPHERICAL: (sphericalDestinationBatch, sphericalInverseBatch),
+    GEODESIC_TANGENT_PLANE: (tangentPlaneDestinationBatch, tangentPlaneInverseBatch),
+}
+
+geodesicBackend = GEODESIC_KARNEY
+
+def setGeodesicBackend(name):
+    global geodesicBackend
+    if name not in GEODESIC_BACKENDS:
+        raise ValueError(f"Unknown geodesic backend: {name}, expected one of {list(GEODESIC_BACKENDS)}")
+    geodesicBackend = name
+
+def distanceBearingFromCenterBatch(distances, bearings, centers):
+    destination, inverse = GEODESIC_BACKENDS[geodesicBackend]
+    return destination(distances, bearings, centers)
+def distanceBearingToCoordinateBatch(distances, bearings, layout=None):
+    return distanceBearingFromCenterBatch(distances, bearings, (layout or DEFAULT_LAYOUT).goldenStake)
+def distanceToCoordinateBatch(distances, hours, minutes, layout=None):
+    return distanceBearingToCoordinateBatch(distances, bearingBatch(hours, minutes, layout), layout)
+def addressToCoordinateBatch(letters, hours, minutes, layout=None):
+    if isinstance(letters, str):
+        letters = [letters]
+    layout = layout or DEFAULT_LAYOUT
+    grid = intersectionGrids.get((layout, geodesicBackend))
+    if grid is None:
+        return distanceToCoordinateBatch([letterToDistance(letter, layout) for letter in letters], hours, minutes, layout)
+    # same as addressToCoordinate: on-grid addresses are read from the loaded grid, only the rest is solved
+    letters, hours, minutes = np.broadcast_arrays(np.asarray(letters), np.asarray(hours, dtype=float), np.asarray(minutes, dtype=float))
+    indexes = [gridIndex(*normalizeAddress(str(letter), hour, minute), layout) for letter, hour, minute in zip(letters, hours, minutes)]
+    onGrid = np.array([index is not None for index in indexes], dtype=bool)
+    result = np.empty((len(indexes), 2))
+    if onGrid.any():
+        streets, times = np.array([index for index in indexes if index is not None]).T
+        result[onGrid] = grid[streets, times]
+    if not onGrid.all():
+        offGrid = ~onGrid
+        result[offGrid] = distanceToCoordinateBatch([letterToDistance(str(letter), layout) for letter in letters[offGrid]],
+                                                    hours[offGrid], minutes[offGrid], layout)
+    return result
+def letterBearingToCoordinateBatch(letters, bearings, layout=None):
+    if isinstance(letters, str):
+        letters = [letters]
+    return distanceBearingToCoordinateBatch([letterToDistance(letter, layout) for letter in letters], bearings, layout)
+
+"""
+Local BRC frame: feet east (x) and north (y) of the Golden Stake.
+It's an azimuthal equidistant projection around the stake, so distance and bearing from the stake are exact,
+and everything else is plain planar math. Renderers that work in feet (svg, Fusion) should stay in this frame,
+only geo outputs (kml) need to convert points to lat/lon.
+"""
+GOLDEN_STAKE_FEET = [0, 0]
+
+def distanceBearingToFeet(distance, bearing, center=GOLDEN_STAKE_FEET):
+    angle = math.radians(bearing)
+    return [center[0] + distance * math.sin(angle), center[1] + distance * math.cos(angle)]
+def distanceToFeet(distance, hours, minutes, layout=None):
+    return distanceBearingToFeet(distance, bearing(hours, minutes, layout))
+def addressToFeet(letter, hours, minutes, layout=None):
+    return distanceToFeet(letterToDistance(letter, layout), hours, minutes, layout)
+
+def feetToPolar(point):
+    # returns distance and bearing from the Golden Stake
+    distance = math.hypot(point[0], point[1])
+    bearing = math.degrees(math.atan2(point[0], point[1])) % 360
+    return distance, bearing
+
+def feetToCoordinate(point, layout=None):
+    distance, bearing = feetToPolar(point)
+    return distanceBearingToCoordinate(distance, bearing, layout)
+
+def feetToCoordinateBatch(points, layout=None):
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    distances = np.hypot(points[:, 0], points[:, 1])
+    bearings = np.degrees(np.arctan2(points[:, 0], points[:, 1])) % 360
+    return distanceBearingToCoordinateBatch(distances, bearings, layout)
+
+def coordinateToFeet(coordinate, layout=None):
+    goldenStake = (layout or DEFAULT_LAYOUT).goldenStake
+    if geodesicBackend == GEODESIC_KARNEY:
+        result = Geodesic.WGS84.Inverse(goldenStake[0], goldenStake[1], coordinate[0], coordinate[1])
+        return distanceBearingToFeet(result['s12'] / FEET_TO_METERS, result['azi1'])
+    distances, bearings = coordinateToPolarBatch([coordinate], layout)
+    return distanceBearingToFeet(float(distances[0]), float(bearings[0]))
+
+def coordinateToPolarBatch(coordinates, layout=None):
+    # distances in feet and bearings from the Golden Stake
+    destination, inverse = GEODESIC_BACKENDS[geodesicBackend]
+    return inverse((layout or DEFAULT_LAYOUT).goldenStake, coordinates)
+
+def coordinateToFeetBatch(coordinates, layout=None):
+    distances, bearings = coordinateToPolarBatch(coordinates, layout)
+    angles = np.radians(bearings)
+    return np.column_stack((distances * np.sin(angles), distances * np.cos(angles)))
 
 def parseHoursMinutes(s):
     if s is None:
@@ -277,10 +779,10 @@ def exactLocationToBearing (exact_location, man_bearing):
     
     return value
 
-def calculateExactLocation(hours, minutes, letter, radius, exact_location):
+def calculateExactLocation(hours, minutes, letter, radius, exact_location, layout=None):
     # find center of the plaza
-    center = addressToCoordinate (letter, hours, minutes)
-    man_bearing = bearing(hours, minutes)
+    center = addressToCoordinate (letter, hours, minutes, layout)
+    man_bearing = bearing(hours, minutes, layout)
 
     center_bearing = exactLocationToBearing (exact_location, man_bearing) 
     # step by plaza radius in that direction
@@ -293,22 +795,80 @@ def calculateExactLocation(hours, minutes, letter, radius, exact_location):
 
 
 
-def locationObjectToCoordinate(location):
-    # this function takes location of the art or camp from the database, and returns a best guess about coordinates
+"""
+Location kinds, locationObjectToCoordinate first classifies a location object into one of these,
+then resolves it. Batch API uses the same codes in its "kind" column.
+"""
+LOCATION_ERROR = 0 # only in batch results, see "error" column
+LOCATION_EMPTY = 1
+LOCATION_GPS = 2
+LOCATION_DISTANCE = 3
+LOCATION_PLAZA = 4
+LOCATION_AIRPORT = 5
+LOCATION_PORTAL = 6
+LOCATION_CENTER_CAMP = 7
+LOCATION_INTERSECTION = 8
+
+LOCATION_KIND_NAMES = {
+    LOCATION_ERROR: "error",
+    LOCATION_EMPTY: "empty",
+    LOCATION_GPS: "gps",
+    LOCATION_DISTANCE: "distance",
+    LOCATION_PLAZA: "plaza",
+    LOCATION_AIRPORT: "airport",
+    LOCATION_PORTAL: "portal",
+    LOCATION_CENTER_CAMP: "center camp",
+    LOCATION_INTERSECTION: "intersection",
+}
 
+# kinds that resolve through calculateExactLocation, their params are (hours, minutes, letter, radius, exact_location)
+EXACT_LOCATION_KINDS = (LOCATION_PLAZA, LOCATION_PORTAL, LOCATION_INTERSECTION)
+
+"""
+LocationKey is the normalized, immutable form of a location object: a kind and a tuple of params.
+Resolving a key never looks at the source dict, so results are cached by key (see resolveLocationKey),
+and keys can be shared across threads without copying the records.
+Radii in the params come from the layout the key was classified with, resolve it with the same layout.
+"""
+LocationKey = namedtuple('LocationKey', ['kind', 'params'])
+LOCATION_CACHE_SIZE = 16384
+
+def exactLocationKey(kind, hours, minutes, letter, radius, exact_location, layout=None):
+    letter, hours, minutes = normalizeAddress(letter, hours, minutes)
+    letterToDistance(letter, layout) # raises KeyError for unknown streets
+    exactLocationToBearing(exact_location, 0) # raises ValueError for unknown exact_location
+    return LocationKey(kind, (hours, minutes, letter, radius, exact_location))
+
+def optionalFloat(value):
+    # unplaced art has null gps
+    return None if value is None else float(value)
+
+def classifyLocation(location, layout=None):
+    """
+    Parses location of the art or camp from the database without computing any coordinates, and without changing it.
+    Returns LocationKey(kind, params):
+        LOCATION_EMPTY: ()
+        LOCATION_GPS: (latitude, longitude)
+        LOCATION_DISTANCE: (distance, hours, minutes)
+        LOCATION_AIRPORT: ()
+        LOCATION_CENTER_CAMP: (radius, bearing) - step from the center of the Center Camp
+        LOCATION_PLAZA, LOCATION_PORTAL, LOCATION_INTERSECTION: (hours, minutes, letter, radius, exact_location)
+    Raises ValueError for locations it can't understand, numbers are converted here so bad ones fail in this call
+    """
+    layout = layout or DEFAULT_LAYOUT
 
     # simplest case, likey art:
     if 'gps_latitude' in location and 'gps_longitude' in location:
-        return [location['gps_latitude'], location['gps_longitude']]
+        return LocationKey(LOCATION_GPS, (optionalFloat(location['gps_latitude']), optionalFloat(location['gps_longitude'])))
     
     # use-case 2: art
     if 'hour' in location and 'minute' in location and 'distance' in location and \
                 not (location['distance'] is None or location['hour'] is None or location['minute'] is None):
-        return distanceToCoordinate(location['distance'],location['hour'], location['minute']);
+        return LocationKey(LOCATION_DISTANCE, (float(location['distance']), float(location['hour']), float(location['minute'])))
 
     # ValueError: Cannot parse street location: {'string': '', 'frontage': None, 'intersection': None, 'intersection_type': '&', 'dimensions': 'x', 'exact_location': None}
     if location["string"] == '':
-        return None, None
+        return LocationKey(LOCATION_EMPTY, ())
 
     # Plaza locations have no interestion type:
     if "intersection_type" not in location or \
@@ -331,24 +891,21 @@ def locationObjectToCoordinate(location):
             """
             # parse Plaza address
             hours, minutes, letter = parsePlazaAddress( location["frontage"])
-            radius = (plazaOuterWidth if hours != 6 else plazaOuterWidth6)/2
+            radius = (layout.plazaOuterWidth if hours != 6 else layout.plazaOuterWidth6)/2
             # use "exact location" field to find angle position relative to the plaza center, 
 
-            return calculateExactLocation(hours, minutes, letter, radius, location["exact_location"])
+            return exactLocationKey(LOCATION_PLAZA, hours, minutes, letter, radius, location["exact_location"], layout)
         
         if 'Airport Road' == location["frontage"]:
-            return AIRPORT_COORDINATES
+            return LocationKey(LOCATION_AIRPORT, ())
         
         if 'Portal' in location['frontage']:
             # special case - a portal, it has time
-            location["frontage"] = location["frontage"].replace (' Portal','')
-            is_portal = True
-
-            hours, minutes = parseHoursMinutes(location["frontage"])
+            hours, minutes = parseHoursMinutes(location["frontage"].replace (' Portal',''))
             letter = "esplanade"
-            radius = portalMouthInFeet/2 # square diagonal 
+            radius = layout.portalMouthInFeet/2 # square diagonal 
 
-            return calculateExactLocation(hours, minutes, letter, radius, location["exact_location"])
+            return exactLocationKey(LOCATION_PORTAL, hours, minutes, letter, radius, location["exact_location"], layout)
 
         raise ValueError (f"Non-plaza location with no intersection: {location}")
 
@@ -384,21 +941,19 @@ def locationObjectToCoordinate(location):
         """
         # Only one camp is observed for reach direction, so ignoring exact_location here
         
-        # Find center of the Center camp
-        center = distanceToCoordinate(manToCenterOfCenterCampInFeet, 6, 00)
         hours, minutes = parseHoursMinutes(location["intersection"])
         # translate "intersection" into bearing
-        center_bearing = bearing(hours, minutes)
+        center_bearing = bearing(hours, minutes, layout)
 
         if  'Center Camp Plaza' == location['frontage']:
-            radius = centerCampRadiusInsideInFeet
+            radius = layout.centerCampRadiusInsideInFeet
         elif "Rod's Ring Road" == location['frontage']: # this is here for compatibility with 2023 map, but it's not maintained - so not checked for accuracy
-            radius = centerCampRadiusOutsideInFeet
+            radius = layout.centerCampRadiusOutsideInFeet
         else:
             raise ValueError (f"Unknown location with @-intersection: {location['string']}")
 
         # step by center camp radius in that direction
-        return distanceBearingFromCenter(radius, center_bearing, center)
+        return LocationKey(LOCATION_CENTER_CAMP, (radius, center_bearing))
 
     # City camps, "intersection_type": "&"
 
@@ -436,35 +991,128 @@ def locationObjectToCoordinate(location):
         if  not "intersection" in location or location["intersection"] is None:
             # 'frontage': '4:30 G Plaza',
             pass
-        is_portal = False
+        is_portal = ' Portal' in location["intersection"] or ' Portal' in location["frontage"]
         try:
-            if ' Portal' in location["intersection"]:
-                location["intersection"] = location["intersection"].replace (' Portal','')
-                is_portal = True
-
-            hours, minutes = parseHoursMinutes(location["intersection"])
+            hours, minutes = parseHoursMinutes(location["intersection"].replace (' Portal',''))
             letter = location["frontage"]
             frontage_letter = True
         except ValueError:
-            if ' Portal' in location["frontage"]:
-                location["frontage"] = location["frontage"].replace (' Portal','')
-                is_portal = True
-        
-            hours, minutes = parseHoursMinutes(location["frontage"])
+            hours, minutes = parseHoursMinutes(location["frontage"].replace (' Portal',''))
             letter = location["intersection"]
             frontage_letter = False
 
         # TODO: How to use frontage here?
         # TODO: maybe use better calculation for street sizes - different streets = different points
-        radius = math.sqrt(annularStreetWidthInFeet**2 + radialAvenueWidthInFeet**2)/2 # fiagonal
+        radius = math.sqrt(layout.annularStreetWidthInFeet**2 + layout.radialAvenueWidthInFeet**2)/2 # fiagonal
 
         # if is_portal:
         #     print(f"TODO: find better width for the portal depending on the crossing street {location}")
 
-        return calculateExactLocation( hours, minutes, letter, radius, location["exact_location"])
+        return exactLocationKey(LOCATION_INTERSECTION, hours, minutes, letter, radius, location["exact_location"], layout)
 
 
        
     raise ValueError (f"Cannot parse location: {location}")
-  
-    
+
+def centerCampCenterCoordinate(layout=None):
+    layout = layout or DEFAULT_LAYOUT
+    return distanceToCoordinate(layout.manToCenterOfCenterCampInFeet, 6, 00, layout)
+
+def resolveLocation(kind, params, layout=None):
+    # turns classifyLocation result into coordinates, use resolveLocationKey to get cached results
+    layout = layout or DEFAULT_LAYOUT
+    if kind == LOCATION_EMPTY:
+        return None, None
+    if kind == LOCATION_GPS:
+        return list(params)
+    if kind == LOCATION_DISTANCE:
+        return distanceToCoordinate(*params, layout)
+    if kind == LOCATION_AIRPORT:
+        return list(layout.airportCoordinates)
+    if kind == LOCATION_CENTER_CAMP:
+        radius, center_bearing = params
+        return distanceBearingFromCenter(radius, center_bearing, centerCampCenterCoordinate(layout))
+    if kind in EXACT_LOCATION_KINDS:
+        return calculateExactLocation(*params, layout)
+    raise ValueError (f"Unknown location kind: {kind}")
+
+@functools.lru_cache(maxsize=LOCATION_CACHE_SIZE)
+def cachedResolveLocation(layout, backend, key):
+    return tuple(resolveLocation(*key, layout))
+
+def resolveLocationKey(key, layout=None):
+    # returns an immutable (lat, lon) tuple, cached by layout, geodesic backend and key
+    return cachedResolveLocation(layout or DEFAULT_LAYOUT, geodesicBackend, key)
+
+def locationCacheInfo():
+    return cachedResolveLocation.cache_info()
+
+def locationObjectToCoordinate(location, layout=None):
+    # this function takes location of the art or camp from the database, and returns a best guess about coordinates
+    return list(resolveLocationKey(classifyLocation(location, layout), layout))
+
+def locationObjectsToCoordinates(locations, layout=None):
+    """
+    Batch version of locationObjectToCoordinate for whole datasets: takes a list or an iterator of location objects,
+    classifies them in one pass and resolves each distinct LocationKey once, with the batch geodesic functions.
+    Returns columns: {"lat": array, "lon": array, "kind": int8 array of LOCATION_* codes, "error": list}
+    Locations that can't be parsed get LOCATION_ERROR, NaN coordinates and the message in "error", the rest of the batch still resolves.
+    Empty locations get NaN coordinates.
+    """
+    layout = layout or DEFAULT_LAYOUT
+    keys = []
+    errors = []
+    for location in locations:
+        try:
+            key = classifyLocation(location, layout)
+            error = None
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            key = LocationKey(LOCATION_ERROR, ())
+            error = f"{type(e).__name__}: {e}"
+        keys.append(key)
+        errors.append(error)
+
+    uniqueKeys = {}
+    inverse = np.array([uniqueKeys.setdefault(key, len(uniqueKeys)) for key in keys], dtype=np.intp)
+    uniqueKeys = list(uniqueKeys)
+    kinds = np.array([key.kind for key in uniqueKeys], dtype=np.int8)
+    result = np.full((len(uniqueKeys), 2), np.nan)
+
+    def keysOf(*selected):
+        rows = np.flatnonzero(np.isin(kinds, selected))
+        return rows, [uniqueKeys[row].params for row in rows]
+
+    rows, params = keysOf(LOCATION_GPS)
+    if len(rows):
+        result[rows] = np.array(params, dtype=float)
+
+    rows, params = keysOf(LOCATION_AIRPORT)
+    result[rows] = layout.airportCoordinates
+
+    rows, params = keysOf(LOCATION_DISTANCE)
+    if len(rows):
+        distances, hours, minutes = np.array(params, dtype=float).T
+        result[rows] = distanceToCoordinateBatch(distances, hours, minutes, layout)
+
+    rows, params = keysOf(LOCATION_CENTER_CAMP)
+    if len(rows):
+        radii, bearings = np.array(params, dtype=float).T
+        result[rows] = distanceBearingFromCenterBatch(radii, bearings, centerCampCenterCoordinate(layout))
+
+    rows, params = keysOf(*EXACT_LOCATION_KINDS)
+    if len(rows):
+        # same two steps as calculateExactLocation: intersection center, then step by radius from it
+        hours = np.array([param[0] for param in params])
+        minutes = np.array([param[1] for param in params])
+        centers = addressToCoordinateBatch([param[2] for param in params], hours, minutes, layout)
+        manBearings = bearingBatch(hours, minutes, layout)
+        centerBearings = [exactLocationToBearing(param[4], manBearing) for param, manBearing in zip(params, manBearings)]
+        stepped = np.array([centerBearing is not None for centerBearing in centerBearings])
+        if stepped.any():
+            radii = np.array([param[3] for param in params], dtype=float)
+            centers[stepped] = distanceBearingFromCenterBatch(radii[stepped],
+                                    [centerBearing for centerBearing in centerBearings if centerBearing is not None], centers[stepped])
+        result[rows] = centers
+
+    result = result[inverse]
+    return {"lat": result[:, 0], "lon": result[:, 1], "kind": kinds[inverse], "error": errors}
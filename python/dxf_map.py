@@ -0,0 +1,231 @@
+"""
+DXF renderer for CAD/CAM without a Fusion 360 session: arches are true ARC entities, lines LINE, plazas, the Man,
+the Temple and the airport CIRCLE, hour labels TEXT. Every map layer is its own DXF layer.
+Entities are written to the stream as they are rendered, in the local feet frame or in cm scaled like the Fusion plugin:
+
+    with open("map.dxf", "w") as stream, DxfRenderer(stream, cityDiameterCm=4.7, flipY=True) as renderer:
+        renderer.render(buildDisplayList(1.5, FRAME_FEET, layout))
+
+ASCII DXF R12 (AC1009), any CAD or laser software reads it. R12 has no units header variable, the units (feet or cm)
+are written as a comment at the top of the file, set them on import.
+
+usage: python dxf_map.py -y 2024 --city-diameter-cm 4.7 --flip-y
+"""
+import argparse
+import itertools
+from map import renderMap, replayPrimitives, iterDisplayList, FRAME_FEET, DEFAULT_LAYOUT, MAP_LAYERS, YEAR, layoutForYear
+from svg_map import ROMAN_NUMERALS
+
+EXTEND_RADIAL_NAMES_BY_BLOCKS = 1.5 # same as svg_map and the Fusion plugin
+DXF_PRECISION = 6 # decimals of the output unit
+HOUR_TEXT_HEIGHT = 240 # feet, same as 24px labels at 10 feet per pixel in svg_map
+LOWER_NUMBERS_FOLLOW_CLOCK = False
+
+LAYER_COLOR = 7 # ACI white/black
+
+def dxfLayerName(layer):
+    # R12 layer names are upper case letters, digits, $, - and _
+    return layer.upper().replace(' ', '_')
+
+
+class DxfRenderer:
+    """
+    Streams entities to a text stream, renderMap callbacks or a display list:
+        renderer.layer = LAYER_PLAZAS  # layer of the next entities, render() sets it from the display list
+        renderMap(*renderer.callbacks(), 1.5, frame=FRAME_FEET, layers=[LAYER_PLAZAS])
+    Output is in feet by default. cityDiameterCm scales the K street diameter to that many cm, the same as
+    lid_city_diameter in the Fusion plugin, and so do mirrorX, flipY (flip_z), fenceScale and moveX/moveY (output units).
+    """
+    def __init__(self, stream, cityDiameterCm=None, mirrorX=False, flipY=False, fenceScale=1, moveX=0, moveY=0, layout=None,
+                 precision=DXF_PRECISION, hourTextHeight=HOUR_TEXT_HEIGHT, lowerNumbersFollowClock=LOWER_NUMBERS_FOLLOW_CLOCK):
+        self.write = stream.write
+        layout = layout or DEFAULT_LAYOUT
+        self.feetPerUnit = layout.diameterKInFeet / cityDiameterCm if cityDiameterCm else 1
+        self.units = "cm" if cityDiameterCm else "feet"
+        self.mirrorX = mirrorX
+        self.flipY = flipY
+        self.fenceScale = fenceScale
+        self.moveX = moveX
+        self.moveY = moveY
+        self.precision = precision
+        self.hourTextHeight = hourTextHeight
+        self.lowerNumbersFollowClock = lowerNumbersFollowClock
+        self.layer = MAP_LAYERS[0]
+
+    def number(self, value):
+        return f"{value:.{self.precision}f}"
+
+    def group(self, code, value):
+        self.write(f"{code}\n{value}\n")
+
+    def convertPoint(self, point):
+        x = -point[0] if self.mirrorX else point[0]
+        y = -point[1] if self.flipY else point[1]
+        return x / self.feetPerUnit + self.moveX, y / self.feetPerUnit + self.moveY
+
+    def convertBearing(self, bearing):
+        # map bearings are clockwise from north, dxf angles counterclockwise from east, after mirroring and flipping
+        angle = 90 - bearing
+        if self.mirrorX:
+            angle = 180 - angle
+        if self.flipY:
+            angle = -angle
+        return angle % 360
+
+    def begin(self):
+        self.group(999, f"units: {self.units}") # comment, $INSUNITS only came with R2000
+        self.group(0, "SECTION")
+        self.group(2, "HEADER")
+        self.group(9, "$ACADVER")
+        self.group(1, "AC1009")
+        self.group(0, "ENDSEC")
+
+        self.group(0, "SECTION")
+        self.group(2, "TABLES")
+        self.group(0, "TABLE")
+        self.group(2, "LTYPE")
+        self.group(70, 1)
+        self.group(0, "LTYPE")
+        self.group(2, "CONTINUOUS")
+        self.group(70, 0)
+        self.group(3, "Solid line")
+        self.group(72, 65)
+        self.group(73, 0)
+        self.group(40, self.number(0))
+        self.group(0, "ENDTAB")
+        self.group(0, "TABLE")
+        self.group(2, "LAYER")
+        self.group(70, len(MAP_LAYERS))
+        for layer in MAP_LAYERS:
+            self.group(0, "LAYER")
+            self.group(2, dxfLayerName(layer))
+            self.group(70, 0)
+            self.group(62, LAYER_COLOR)
+            self.group(6, "CONTINUOUS")
+        self.group(0, "ENDTAB")
+        self.group(0, "ENDSEC")
+
+        self.group(0, "SECTION")
+        self.group(2, "ENTITIES")
+
+    def end(self):
+        self.group(0, "ENDSEC")
+        self.group(0, "EOF")
+
+    def __enter__(self):
+        self.begin()
+        return self
+
+    def __exit__(self, *exception):
+        self.end()
+
+    def entity(self, kind):
+        self.group(0, kind)
+        self.group(8, dxfLayerName(self.layer))
+
+    def addArch(self, startAngle, endAngle, archRadius, center, name):
+        # dxf arcs always go counterclockwise, which one is the start depends on the reflections
+        if endAngle < startAngle: # reversed arch (see toolpath.py), same points
+            startAngle, endAngle = endAngle, startAngle
+        start, end = self.convertBearing(endAngle), self.convertBearing(startAngle)
+        if self.mirrorX != self.flipY:
+            start, end = end, start
+        x, y = self.convertPoint(center)
+        self.entity("ARC")
+        self.group(10, self.number(x))
+        self.group(20, self.number(y))
+        self.group(30, self.number(0))
+        self.group(40, self.number(archRadius / self.feetPerUnit))
+        self.group(50, self.number(start))
+        self.group(51, self.number(end))
+
+    def addLine(self, startCoordinates, endCoordinates, name):
+        startX, startY = self.convertPoint(startCoordinates)
+        endX, endY = self.convertPoint(endCoordinates)
+        self.entity("LINE")
+        self.group(10, self.number(startX))
+        self.group(20, self.number(startY))
+        self.group(30, self.number(0))
+        self.group(11, self.number(endX))
+        self.group(21, self.number(endY))
+        self.group(31, self.number(0))
+
+    def addFenceLine(self, startCoordinates, endCoordinates, name):
+        # scaled around the Golden Stake, like feet_per_cm_fence in the Fusion plugin
+        if self.fenceScale != 1:
+            startCoordinates = [value * self.fenceScale for value in startCoordinates]
+            endCoordinates = [value * self.fenceScale for value in endCoordinates]
+        self.addLine(startCoordinates, endCoordinates, name)
+
+    def addCircle(self, location, width, name):
+        x, y = self.convertPoint(location)
+        self.entity("CIRCLE")
+        self.group(10, self.number(x))
+        self.group(20, self.number(y))
+        self.group(30, self.number(0))
+        self.group(40, self.number(width / 2 / self.feetPerUnit))
+
+    def addHourLabel(self, hour, minute, location, bearing):
+        if minute > 0:
+            return
+        # text reads along the radial, upside down ones are turned unless lowerNumbersFollowClock, same as svg_map
+        rotation = (-self.convertBearing(bearing) + 90) % 360 # clockwise from north, as it looks on the output
+        if not self.lowerNumbersFollowClock and 90 < rotation < 270:
+            rotation += 180
+        x, y = self.convertPoint(location)
+        self.entity("TEXT")
+        self.group(10, self.number(x))
+        self.group(20, self.number(y))
+        self.group(30, self.number(0))
+        self.group(40, self.number(self.hourTextHeight / self.feetPerUnit))
+        self.group(1, ROMAN_NUMERALS[hour - 1])
+        self.group(50, self.number(-rotation % 360))
+        self.group(72, 1) # centered on the baseline at the alignment point
+        self.group(11, self.number(x))
+        self.group(21, self.number(y))
+        self.group(31, self.number(0))
+
+    def callbacks(self):
+        # renderer functions in renderMap argument order, Man, Temple and airport are circles
+        return (self.addArch, self.addLine, self.addFenceLine, self.addCircle, self.addCircle, self.addCircle, self.addHourLabel, self.addCircle)
+
+    def render(self, displayList):
+        # writes a whole document for a feet frame display list (see map.buildDisplayList)
+        with self:
+            for layer, primitives in itertools.groupby(iterDisplayList(displayList), key=lambda primitive: primitive.layer):
+                self.layer = layer
+                replayPrimitives(primitives, *self.callbacks())
+        return self
+
+
+def writeDxf(displayList, fileName, **options):
+    # options go to DxfRenderer
+    with open(fileName, "w") as dxf_file:
+        DxfRenderer(dxf_file, **options).render(displayList)
+
+def renderDxfMap(layout=None, fileName=None, **options):
+    # renders the map into ../renders/burning_man_map_YEAR.dxf by default, one renderMap pass per layer, returns the file name
+    layout = layout or DEFAULT_LAYOUT
+    file_name = fileName or f"../renders/burning_man_map_{layout.year}.dxf"
+    with open(file_name, "w") as dxf_file, DxfRenderer(dxf_file, layout=layout, **options) as renderer:
+        for layer in MAP_LAYERS:
+            renderer.layer = layer
+            renderMap(*renderer.callbacks(), EXTEND_RADIAL_NAMES_BY_BLOCKS, frame=FRAME_FEET, layout=layout, layers=(layer,))
+    return file_name
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the map as DXF, in feet or scaled to a lid like the Fusion plugin")
+    parser.add_argument("-y", "--year", type=int, default=YEAR)
+    parser.add_argument("-o", "--output", default=None, help="../renders/burning_man_map_YEAR.dxf by default")
+    parser.add_argument("--city-diameter-cm", type=float, default=None, help="K street diameter in cm, output is in feet without it")
+    parser.add_argument("--mirror-x", action="store_true")
+    parser.add_argument("--flip-y", action="store_true")
+    parser.add_argument("--fence-scale", type=float, default=1)
+    parser.add_argument("--move-x", type=float, default=0, help="output units")
+    parser.add_argument("--move-y", type=float, default=0, help="output units")
+    args = parser.parse_args()
+    print(renderDxfMap(layoutForYear(args.year), args.output, cityDiameterCm=args.city_diameter_cm, mirrorX=args.mirror_x,
+                       flipY=args.flip_y, fenceScale=args.fence_scale, moveX=args.move_x, moveY=args.move_y))
+
+if __name__ == "__main__":
+    main()
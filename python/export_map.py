@@ -0,0 +1,99 @@
+"""
+Exports the map in every format at once: geometry is computed once, then serializers run in parallel worker processes,
+each writing its own file. Prints how long every stage took.
+
+usage: python export_map.py -o ../renders --formats kml kmz svg geojson dxf
+"""
+import argparse
+import os
+import sys
+import time
+from multiprocessing import Pool
+import coordinates
+from map import buildDisplayList, FRAME_FEET, FRAME_GEO, DEFAULT_LAYOUT, layoutForYear, setGeodesicBackend, YEAR
+
+# svg labels are placed 1.5 blocks outside the city, kml skips labels, geojson keeps them where svg has them
+EXTEND_RADIAL_NAMES_BY_BLOCKS = 1.5
+
+def exportKml(displayList, fileName, layout):
+    import kml_map
+    kml_map.writeKml(displayList, fileName, layout.year)
+
+def exportKmz(displayList, fileName, layout):
+    import kml_map
+    kml_map.writeKmz(displayList, fileName, layout.year)
+
+def exportSvg(displayList, fileName, layout):
+    import svg_map
+    svg_map.writeSvg(displayList, fileName)
+
+def exportGeoJson(displayList, fileName, layout):
+    import geojson_map
+    geojson_map.writeGeoJson(displayList, fileName, layout.year)
+
+def exportDxf(displayList, fileName, layout):
+    import dxf_map
+    dxf_map.writeDxf(displayList, fileName, layout=layout)
+
+# format -> (serializer, frame of the display list it takes, file extension)
+# serializers import their renderer on first use, so workers only load what they run
+EXPORT_FORMATS = {
+    "kml": (exportKml, FRAME_GEO, "kml"),
+    "kmz": (exportKmz, FRAME_GEO, "kmz"),
+    "svg": (exportSvg, FRAME_FEET, "svg"),
+    "geojson": (exportGeoJson, FRAME_GEO, "geojson"),
+    "dxf": (exportDxf, FRAME_FEET, "dxf"),
+}
+
+def exportFileName(outputDirectory, year, exportFormat):
+    return os.path.join(outputDirectory, f"burning_man_map_{year}.{EXPORT_FORMATS[exportFormat][2]}")
+
+def runExport(exportFormat, displayList, fileName, layout, backend):
+    # runs in a worker process, returns (format, file name, seconds)
+    setGeodesicBackend(backend) # arcs and circles are densified with it
+    start = time.perf_counter()
+    EXPORT_FORMATS[exportFormat][0](displayList, fileName, layout)
+    return exportFormat, fileName, time.perf_counter() - start
+
+def exportMap(formats=None, outputDirectory="../renders", workers=None, layout=None):
+    """
+    Writes every format in formats (all of EXPORT_FORMATS by default) to outputDirectory.
+    Returns timings in seconds: {"geometry": ..., "kml": ..., ..., "total": ...}
+    """
+    layout = layout or DEFAULT_LAYOUT
+    formats = list(formats or EXPORT_FORMATS)
+    for exportFormat in formats:
+        if exportFormat not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {exportFormat}, expected one of {list(EXPORT_FORMATS)}")
+    os.makedirs(outputDirectory, exist_ok=True)
+
+    start = time.perf_counter()
+    displayLists = {frame: buildDisplayList(EXTEND_RADIAL_NAMES_BY_BLOCKS, frame, layout)
+                    for frame in {EXPORT_FORMATS[exportFormat][1] for exportFormat in formats}}
+    timings = {"geometry": time.perf_counter() - start}
+
+    with Pool(workers or len(formats)) as pool:
+        results = [pool.apply_async(runExport, (exportFormat, displayLists[EXPORT_FORMATS[exportFormat][1]],
+                                                exportFileName(outputDirectory, layout.year, exportFormat),
+                                                layout, coordinates.geodesicBackend))
+                   for exportFormat in formats]
+        for result in results:
+            exportFormat, fileName, seconds = result.get()
+            timings[exportFormat] = seconds
+    timings["total"] = time.perf_counter() - start
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the map to several formats in parallel")
+    parser.add_argument("-o", "--output-dir", default="../renders")
+    parser.add_argument("-f", "--formats", nargs="+", choices=list(EXPORT_FORMATS), default=None, help="all formats by default")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="one process per format by default")
+    parser.add_argument("-y", "--year", type=int, default=YEAR)
+    args = parser.parse_args()
+
+    timings = exportMap(args.formats, args.output_dir, args.workers, layoutForYear(args.year))
+    for stage, seconds in timings.items():
+        print(f"{stage:>10} {seconds * 1000:8.1f} ms", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Persistent geocode cache for camp/art/event datasets
+
+Results of locationObjectsToCoordinates are stored in an SQLite file next to the data, keyed by a hash of the
+location object. Cache remembers the layout it was built for, and drops everything when the layout or the geodesic
+backend changes, so nightly runs only geocode new or changed records. Use the same layout to open and to query the cache.
+
+usage:
+    cache = openGeocodeCache(geocodeCachePath("camp.json"), layout)
+    result = cachedLocationObjectsToCoordinates(cache, (camp["location"] for camp in camps), layout)
+    cache.close()
+"""
+import hashlib
+import json
+import sqlite3
+import numpy as np
+import coordinates
+from coordinates import locationObjectsToCoordinates, DEFAULT_LAYOUT
+
+LOOKUP_CHUNK_SIZE = 500 # sqlite has a limit on number of query parameters
+
+def geocodeCachePath(dataPath):
+    # camp.json -> camp.geocode.sqlite
+    base = dataPath[:-len('.json')] if dataPath.endswith('.json') else dataPath
+    return base + '.geocode.sqlite'
+
+def geocodeLayoutFingerprint(layout=None):
+    # layout fingerprint covers everything classifyLocation and resolveLocation depend on, except the backend
+    return (layout or DEFAULT_LAYOUT).fingerprint + ':' + coordinates.geodesicBackend
+
+# one encoder for all records, json.dumps with options builds a new one on every call
+LOCATION_ENCODER = json.JSONEncoder(sort_keys=True, separators=(',', ':'))
+
+def locationHash(location):
+    return hashlib.sha1(LOCATION_ENCODER.encode(location).encode()).hexdigest()
+
+def openGeocodeCache(path, layout=None):
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    connection.execute("CREATE TABLE IF NOT EXISTS geocodes (hash TEXT PRIMARY KEY, lat REAL, lon REAL, kind INTEGER, error TEXT)")
+
+    fingerprint = geocodeLayoutFingerprint(layout)
+    row = connection.execute("SELECT value FROM meta WHERE key = 'layout'").fetchone()
+    if row is None or row[0] != fingerprint:
+        connection.execute("DELETE FROM geocodes")
+        connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('layout', ?)", (fingerprint,))
+    connection.commit()
+    return connection
+
+def lookupGeocodes(connection, hashes):
+    found = {}
+    unique = list(dict.fromkeys(hashes))
+    for start in range(0, len(unique), LOOKUP_CHUNK_SIZE):
+        chunk = unique[start:start + LOOKUP_CHUNK_SIZE]
+        query = f"SELECT hash, lat, lon, kind, error FROM geocodes WHERE hash IN ({','.join('?' * len(chunk))})"
+        for hash, lat, lon, kind, error in connection.execute(query, chunk):
+            found[hash] = (lat, lon, kind, error)
+    return found
+
+def cachedLocationObjectsToCoordinates(connection, locations, layout=None):
+    """
+    Same as locationObjectsToCoordinates, but only geocodes locations that are not in the cache yet.
+    Extra "cached" column tells which rows came from the cache.
+    """
+    locations = list(locations)
+    hashes = [locationHash(location) for location in locations]
+    found = lookupGeocodes(connection, hashes)
+
+    missing = [index for index, hash in enumerate(hashes) if hash not in found]
+    computed = locationObjectsToCoordinates((locations[index] for index in missing), layout)
+
+    newRows = {}
+    for position, index in enumerate(missing):
+        lat, lon = computed["lat"][position], computed["lon"][position]
+        newRows[hashes[index]] = (None if np.isnan(lat) else float(lat), None if np.isnan(lon) else float(lon),
+                                  int(computed["kind"][position]), computed["error"][position])
+    connection.executemany("INSERT OR REPLACE INTO geocodes (hash, lat, lon, kind, error) VALUES (?, ?, ?, ?, ?)",
+                           [(hash,) + row for hash, row in newRows.items()])
+    connection.commit()
+    found.update(newRows)
+
+    rows = [found[hash] for hash in hashes]
+    missingRows = set(missing)
+    return {
+        "lat": np.array([np.nan if row[0] is None else row[0] for row in rows], dtype=float),
+        "lon": np.array([np.nan if row[1] is None else row[1] for row in rows], dtype=float),
+        "kind": np.array([row[2] for row in rows], dtype=np.int8),
+        "error": [row[3] for row in rows],
+        "cached": np.array([index not in missingRows for index in range(len(rows))], dtype=bool),
+    }
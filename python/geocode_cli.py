@@ -0,0 +1,136 @@
+"""
+Geocodes camp/art dumps with a pool of worker processes and writes NDJSON or CSV
+
+Records are streamed from the input files and sent to workers in chunks, a few per worker in flight at a time,
+every worker resolves its chunk with locationObjectsToCoordinates. The city layout is built once per worker at startup: workers build
+the layout for --year and memory map the intersection grid, which the main process builds before the pool starts.
+Street addresses on the grid (intersections, plazas and portals before the exact location step) are read from it,
+only the rest is solved.
+
+usage: python geocode_cli.py camp_2024.json art_2024.json -o camps.ndjson --workers 8 --chunk-size 500 --year 2024
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from multiprocessing import Pool
+from queue import SimpleQueue
+from json_stream import iterJsonArray, chunked
+from coordinates import locationObjectsToCoordinates, loadIntersectionGrid, layoutForYear, LOCATION_KIND_NAMES, YEAR
+
+OUTPUT_FIELDS = ["file", "index", "uid", "name", "location", "lat", "lon", "kind", "error"]
+CHUNKS_IN_FLIGHT_PER_WORKER = 2 # enough to keep every worker busy while the main process writes
+MISSING_LOCATION_ERROR = "KeyError: 'location'"
+
+workerLayout = None
+
+def initWorker(gridDirectory, year):
+    # runs once per worker process
+    global workerLayout
+    workerLayout = layoutForYear(year)
+    loadIntersectionGrid(gridDirectory, build=False, layout=workerLayout)
+
+def geocodeChunk(chunk):
+    # chunk is a list of (file, index, record), returns one output row per record in the same order,
+    # records without a location get LOCATION_ERROR like the ones that can't be parsed
+    result = locationObjectsToCoordinates((record.get('location') for file, index, record in chunk), workerLayout)
+    rows = []
+    for position, (file, index, record) in enumerate(chunk):
+        lat = float(result["lat"][position])
+        lon = float(result["lon"][position])
+        location = record.get('location')
+        rows.append({
+            "file": file,
+            "index": index,
+            "uid": record.get("uid"),
+            "name": record.get("name"),
+            "location": location.get("string") if isinstance(location, dict) else None,
+            "lat": None if lat != lat else lat, # NaN check
+            "lon": None if lon != lon else lon,
+            "kind": LOCATION_KIND_NAMES[int(result["kind"][position])],
+            "error": result["error"][position] if 'location' in record else MISSING_LOCATION_ERROR,
+        })
+    return rows
+
+def iterRecords(files):
+    for file in files:
+        for index, record in enumerate(iterJsonArray(file)):
+            yield file, index, record
+
+def iterChunkResults(pool, chunks, ordered, window):
+    # like pool.imap, but reads the next chunk only when one of the window chunks in flight is done,
+    # imap's feeder thread would read the whole input into the task queue ahead of the workers
+    pending = deque() # in input order
+    finished = SimpleQueue() # in completion order, only used unordered
+
+    def nextResult():
+        if ordered:
+            return pending.popleft().get()
+        pending.popleft()
+        result = finished.get()
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+    for chunk in chunks:
+        if len(pending) >= window:
+            yield nextResult()
+        if ordered:
+            pending.append(pool.apply_async(geocodeChunk, (chunk,)))
+        else:
+            pending.append(pool.apply_async(geocodeChunk, (chunk,), callback=finished.put, error_callback=finished.put))
+    while pending:
+        yield nextResult()
+
+def writeRows(rows, output, outputFormat):
+    if outputFormat == "csv":
+        writer = csv.DictWriter(output, fieldnames=OUTPUT_FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            yield row
+    else:
+        for row in rows:
+            output.write(json.dumps(row) + "\n")
+            yield row
+
+def geocodeFiles(files, output, outputFormat="ndjson", workers=None, chunkSize=500, ordered=True, gridDirectory='.', year=YEAR):
+    # returns (records written, errors)
+    loadIntersectionGrid(gridDirectory, layout=layoutForYear(year)) # build the grid once here, workers only map it
+    chunks = chunked(iterRecords(files), chunkSize)
+    written = 0
+    errors = 0
+    with Pool(workers, initializer=initWorker, initargs=(gridDirectory, year)) as pool:
+        results = iterChunkResults(pool, chunks, ordered, (workers or os.cpu_count()) * CHUNKS_IN_FLIGHT_PER_WORKER)
+        rows = (row for chunk in results for row in chunk)
+        for row in writeRows(rows, output, outputFormat):
+            written += 1
+            errors += row["error"] is not None
+    return written, errors
+
+def main():
+    parser = argparse.ArgumentParser(description="Geocode camp/art dumps into NDJSON or CSV")
+    parser.add_argument("files", nargs="+", help="camp.json/art.json dumps")
+    parser.add_argument("-o", "--output", default="-", help="output file, '-' for stdout")
+    parser.add_argument("-f", "--format", choices=["ndjson", "csv"], default=None, help="defaults to the output file extension, ndjson otherwise")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("-c", "--chunk-size", type=int, default=500, help="records per work item")
+    parser.add_argument("--unordered", action="store_true", help="write chunks as soon as they are done, not in input order")
+    parser.add_argument("--grid-dir", default=".", help="where to keep the intersection grid .npy, reused by later runs")
+    parser.add_argument("-y", "--year", type=int, default=YEAR, help="city layout year of the dumps")
+    args = parser.parse_args()
+
+    outputFormat = args.format or ("csv" if args.output.endswith(".csv") else "ndjson")
+    start = time.perf_counter()
+    if args.output == "-":
+        written, errors = geocodeFiles(args.files, sys.stdout, outputFormat, args.workers, args.chunk_size, not args.unordered, args.grid_dir, args.year)
+    else:
+        with open(args.output, "w", newline="") as output:
+            written, errors = geocodeFiles(args.files, output, outputFormat, args.workers, args.chunk_size, not args.unordered, args.grid_dir, args.year)
+    print(f"{written} records, {errors} errors, {time.perf_counter() - start:.2f}s with {args.workers} workers", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Speed/accuracy scorecard for geodesic backends (see GEODESIC_BACKENDS in coordinates.py)
+
+Every backend solves the same problems and is compared against karney:
+- destination: every point renderMap emits (line ends, arch ends, circle rims, labels) and camp addresses
+  (every letter street x every 5 minutes, plus corner offsets the way calculateExactLocation does it)
+- inverse: lat/lon of the same points back to feet around the Golden Stake, the way renderers convert geo data
+
+usage: python geodesic_scorecard.py
+"""
+import time
+import numpy as np
+from geopy.distance import geodesic
+from map import *
+
+EXACT_LOCATION_RADIUS = math.sqrt(annularStreetWidthInFeet**2 + radialAvenueWidthInFeet**2)/2
+
+def collectMapProblems():
+    # returns destination problems as (distance, bearing, center) with center in feet, as renderMap emits them
+    problems = []
+    def addPoint(point):
+        problems.append(feetToPolar(point) + (GOLDEN_STAKE_FEET,))
+    def addArch(startAngle, endAngle, archRadius, center, name):
+        for angle in (startAngle, (startAngle + endAngle) / 2, endAngle):
+            problems.append((archRadius, angle, center))
+    def addLine(start, end, name):
+        addPoint(start)
+        addPoint(end)
+    def addCircle(location, width, name):
+        for angle in range(0, 360, 45):
+            problems.append((width / 2, angle, location))
+    def addHourLabel(hour, minute, location, rotation):
+        addPoint(location)
+
+    renderMap(addArch, addLine, addLine, addCircle, addCircle, addCircle, addHourLabel, addCircle, 1.5, frame=FRAME_FEET)
+    return problems
+
+def collectAddressProblems():
+    problems = []
+    for letter in distanceToStreetCenter:
+        for minutes in range(2 * 60, 10 * 60 + 1, 5):
+            center = addressToFeet(letter, minutes // 60, minutes % 60)
+            problems.append(feetToPolar(center) + (GOLDEN_STAKE_FEET,))
+            for angle in range(45, 360, 90):
+                problems.append((EXACT_LOCATION_RADIUS, angle, center))
+    return problems
+
+def solveReference(problems):
+    # karney through geopy, one call at a time - exactly what production does today
+    setGeodesicBackend(GEODESIC_KARNEY)
+    centers = {}
+    result = []
+    for distance, bearing, center in problems:
+        key = tuple(center)
+        if key not in centers:
+            centers[key] = feetToCoordinate(center)
+        result.append(distanceBearingFromCenter(distance, bearing, centers[key]))
+    return np.array(result), np.array([centers[tuple(center)] for distance, bearing, center in problems])
+
+def errorsInFeet(reference, result):
+    return np.array([geodesic(a, b).feet for a, b in zip(reference, result)])
+
+def timeIt(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+def scoreBackend(name, problems, reference, centers, referencePolar, scalarSample=500):
+    setGeodesicBackend(name)
+    distances = np.array([problem[0] for problem in problems])
+    bearings = np.array([problem[1] for problem in problems])
+
+    destination = distanceBearingFromCenterBatch(distances, bearings, centers)
+    destinationErrors = errorsInFeet(reference, destination)
+
+    polar = coordinateToPolarBatch(reference)
+    inverseErrors = np.abs(polar[0] - referencePolar[0]) + \
+        np.radians(np.abs((polar[1] - referencePolar[1] + 180) % 360 - 180)) * referencePolar[0]
+
+    sample = list(zip(distances[:scalarSample], bearings[:scalarSample], centers[:scalarSample]))
+    scalarTime = timeIt(lambda: [distanceBearingFromCenter(d, b, c) for d, b, c in sample], 3) / len(sample)
+    batchTime = timeIt(lambda: distanceBearingFromCenterBatch(distances, bearings, centers), 5) / len(problems)
+    inverseTime = timeIt(lambda: coordinateToPolarBatch(reference), 3) / len(problems)
+
+    return {
+        "backend": name,
+        "destination max ft": destinationErrors.max(),
+        "destination mean ft": destinationErrors.mean(),
+        "inverse max ft": inverseErrors.max(),
+        "inverse mean ft": inverseErrors.mean(),
+        "scalar pts/s": 1 / scalarTime,
+        "batch pts/s": 1 / batchTime,
+        "inverse pts/s": 1 / inverseTime,
+    }
+
+def printScorecard(rows):
+    columns = list(rows[0].keys())
+    print("  ".join(f"{column:>20}" for column in columns))
+    for row in rows:
+        cells = []
+        for column in columns:
+            value = row[column]
+            if isinstance(value, str):
+                cells.append(f"{value:>20}")
+            elif column.endswith("ft"):
+                cells.append(f"{value:>20.6f}")
+            else:
+                cells.append(f"{value:>20,.0f}")
+        print("  ".join(cells))
+
+def main():
+    mapProblems = collectMapProblems()
+    addressProblems = collectAddressProblems()
+    problems = mapProblems + addressProblems
+    print(f"{len(mapProblems)} map points, {len(addressProblems)} address points, {YEAR} layout\n")
+
+    reference, centers = solveReference(problems)
+    referencePolar = coordinateToPolarBatch(reference)
+
+    rows = [scoreBackend(name, problems, reference, centers, referencePolar) for name in GEODESIC_BACKENDS]
+    setGeodesicBackend(GEODESIC_KARNEY)
+    printScorecard(rows)
+
+if __name__ == "__main__":
+    main()
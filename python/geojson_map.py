@@ -0,0 +1,73 @@
+"""
+GeoJSON renderer: every primitive of the map becomes a feature with its name, layer and kind in properties
+Streets, promenades and the fence are LineStrings, plazas and other circles are Polygons,
+Man, Temple, airport and hour labels are Points. Arcs and circles are densified the same way kml_map does it,
+by chord tolerance (map.arcAngles).
+
+usage: python geojson_map.py
+"""
+import json
+import numpy as np
+from map import *
+
+COORDINATE_DIGITS = 7 # ~1 cm
+
+PRIMITIVE_KIND_NAMES = {
+    PRIMITIVE_ARCH: "arch",
+    PRIMITIVE_LINE: "line",
+    PRIMITIVE_FENCE_LINE: "fence",
+    PRIMITIVE_CIRCLE: "circle",
+    PRIMITIVE_MAN: "man",
+    PRIMITIVE_TEMPLE: "temple",
+    PRIMITIVE_AIRPORT: "airport",
+    PRIMITIVE_HOUR_LABEL: "hour label",
+}
+
+def toPositions(coordinates):
+    # [lat, lon] rows -> geojson [lon, lat] positions
+    return [[round(lon, COORDINATE_DIGITS), round(lat, COORDINATE_DIGITS)] for lat, lon in np.asarray(coordinates).tolist()]
+
+def primitiveGeometry(kind, row, tolerance=DEFAULT_CHORD_TOLERANCE):
+    if kind == PRIMITIVE_ARCH:
+        angles = arcAngles(row[0], row[1], row[2], tolerance)
+        return {"type": "LineString", "coordinates": toPositions(distanceBearingFromCenterBatch(row[2], angles, [row[3], row[4]]))}
+    if kind in (PRIMITIVE_LINE, PRIMITIVE_FENCE_LINE):
+        return {"type": "LineString", "coordinates": toPositions([[row[0], row[1]], [row[2], row[3]]])}
+    if kind == PRIMITIVE_CIRCLE:
+        radius = row[2] / 2
+        ring = toPositions(distanceBearingFromCenterBatch(radius, circleAngles(radius, tolerance), [row[0], row[1]]))
+        ring[-1] = ring[0] # rings must close exactly
+        return {"type": "Polygon", "coordinates": [ring]}
+    if kind == PRIMITIVE_HOUR_LABEL:
+        return {"type": "Point", "coordinates": toPositions([[row[2], row[3]]])[0]}
+    return {"type": "Point", "coordinates": toPositions([[row[0], row[1]]])[0]}
+
+def primitiveProperties(primitive):
+    properties = {"name": primitive.name, "layer": primitive.layer, "kind": PRIMITIVE_KIND_NAMES[primitive.kind]}
+    row = primitive.values
+    if primitive.kind == PRIMITIVE_HOUR_LABEL:
+        properties.update(name=f"{int(row[0])}:{int(row[1]):02}", hour=int(row[0]), minute=int(row[1]), rotation=row[4])
+    elif primitive.kind in (PRIMITIVE_MAN, PRIMITIVE_TEMPLE, PRIMITIVE_AIRPORT, PRIMITIVE_CIRCLE):
+        properties["widthInFeet"] = row[2]
+    return properties
+
+def buildFeatureCollection(primitives, year, tolerance=DEFAULT_CHORD_TOLERANCE):
+    # primitives in FRAME_GEO, see iterMapPrimitives. tolerance is feet or a CHORD_TOLERANCE_PRESETS name
+    tolerance = chordTolerance(tolerance)
+    features = [{"type": "Feature", "geometry": primitiveGeometry(primitive.kind, primitive.values, tolerance),
+                 "properties": primitiveProperties(primitive)} for primitive in primitives]
+    return {"type": "FeatureCollection", "name": f"Burning Man Map {year}", "features": features}
+
+def writeGeoJson(displayList, fileName, year, tolerance=DEFAULT_CHORD_TOLERANCE):
+    with open(fileName, "w") as geojson_file:
+        json.dump(buildFeatureCollection(iterDisplayList(displayList), year, tolerance), geojson_file)
+
+def renderGeoJsonMap(layout=None):
+    # renders the map into ../renders/burning_man_map_YEAR.geojson, returns the file name
+    layout = layout or DEFAULT_LAYOUT
+    file_name = f"../renders/burning_man_map_{layout.year}.geojson"
+    writeGeoJson(buildDisplayList(1.5, FRAME_GEO, layout), file_name, layout.year)
+    return file_name
+
+if __name__ == "__main__":
+    renderGeoJsonMap()
@@ -0,0 +1,230 @@
+"""
+Incremental re-render for tuning a year's layout
+
+The map is split into units: every letter street, every radial street, and each of the other layers.
+While a unit is generated, every layout value it reads is recorded (street distances per street, so a change to
+one street depth only touches the streets it moves). After a parameter change only units that read a changed value
+are recomputed, and only units whose primitives actually changed are serialized again.
+For example, changing centerCampRadiusInsideInFeet (the 2024 centerCampStreetCrossRadius) recomputes letter streets
+and radials that check the center camp break, but only A, B, the 6:00 radial and center camp itself are rewritten.
+
+Watch mode re-renders an svg every time the year config (json with CityLayout fields, see layoutFromConfig) is saved:
+    python incremental_render.py year_2025.json -o ../renders/preview.svg
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from types import MappingProxyType
+import numpy as np
+import coordinates
+from map import *
+import svg_map
+
+WATCH_INTERVAL = 0.2 # seconds between config file checks
+
+# same clock range and step as generateRadialStreets
+RADIAL_FIRST_MINUTE = 2 * 60
+RADIAL_LAST_MINUTE = 10 * 60
+RADIAL_STEP_MINUTES = 15
+
+KEYS = 'keys' # dependency on the list of keys of a layout mapping, like the list of streets
+
+class TrackingMapping:
+    # read-only mapping that records which keys were read
+    def __init__(self, mapping, name, reads):
+        self.mapping = mapping
+        self.name = name
+        self.reads = reads
+    def __getitem__(self, key):
+        value = self.mapping[key]
+        self.reads[(self.name, key)] = value
+        return value
+    def __iter__(self):
+        self.reads[(self.name, KEYS)] = tuple(self.mapping)
+        return iter(self.mapping)
+    def __len__(self):
+        self.reads[(self.name, KEYS)] = tuple(self.mapping)
+        return len(self.mapping)
+    def __contains__(self, key):
+        self.reads[(self.name, KEYS)] = tuple(self.mapping)
+        return key in self.mapping
+
+class TrackingLayout:
+    # stands in for a CityLayout while a unit is generated, records every value the generators read
+    def __init__(self, layout):
+        self.layout = layout
+        self.reads = {}
+    def __getattr__(self, name):
+        value = getattr(self.layout, name)
+        if isinstance(value, MappingProxyType):
+            return TrackingMapping(value, name, self.reads)
+        self.reads[name] = value
+        return value
+
+def readDependency(layout, dependency):
+    if isinstance(dependency, tuple):
+        name, key = dependency
+        mapping = getattr(layout, name)
+        if key == KEYS:
+            return tuple(mapping)
+        return mapping.get(key, KEYS) # KEYS never equals a real value, so a removed key reads as changed
+    return getattr(layout, dependency)
+
+def dependenciesChanged(dependencies, layout):
+    return any(readDependency(layout, dependency) != value for dependency, value in dependencies.items())
+
+def mapUnits(layout):
+    # (layer, key) for every unit in renderMap order, key is the street for letter and radial streets
+    units = []
+    for layer in MAP_LAYERS:
+        if layer == LAYER_LETTER_STREETS:
+            units += [(layer, letter) for letter in layout.distanceToStreetCenter]
+        elif layer == LAYER_RADIAL_STREETS:
+            units += [(layer, minutes) for minutes in range(RADIAL_FIRST_MINUTE, RADIAL_LAST_MINUTE + 1, RADIAL_STEP_MINUTES)]
+        else:
+            units.append((layer, None))
+    return units
+
+def renderUnit(unit, callbacks, extendRadialNamesByBlocks, layout):
+    layer, key = unit
+    addArch, addLine = callbacks[0], callbacks[1]
+    if layer == LAYER_LETTER_STREETS:
+        generateLetterStreet(key, addArch, layout=layout)
+    elif layer == LAYER_RADIAL_STREETS:
+        generateRadialStreet(key // 60, key % 60, addLine, layout=layout)
+    else:
+        renderLayer(layer, *callbacks, extendRadialNamesByBlocks, layout)
+
+def sameDisplayList(a, b):
+    return a is not None and a.nameTable == b.nameTable and np.array_equal(a.kinds, b.kinds) \
+        and np.array_equal(a.names, b.names) and np.array_equal(a.values, b.values)
+
+class IncrementalMap:
+    """
+    Keeps the display list of every unit with the layout values it was computed from.
+        incremental = IncrementalMap(frame=FRAME_FEET)
+        changed = incremental.update(layout)     # everything on the first call
+        changed = incremental.update(dataclasses.replace(layout, plazaWidth=250))   # only what moved
+    """
+    def __init__(self, extendRadialNamesByBlocks=0, frame=FRAME_FEET):
+        self.extendRadialNamesByBlocks = extendRadialNamesByBlocks
+        self.frame = frame
+        self.units = {} # unit -> (dependencies, display list)
+        self.order = []
+        self.recomputed = 0 # units recomputed by the last update
+        self.backend = None # fence and airport go through the geodesic backend, everything is recomputed when it changes
+
+    def computeUnit(self, unit, layout):
+        tracking = TrackingLayout(layout)
+        kinds, values, names = recordPrimitives(
+            lambda *callbacks: renderUnit(unit, callbacks, self.extendRadialNamesByBlocks, tracking))
+        layerIndexes = [MAP_LAYERS.index(unit[0])] * len(kinds)
+        return tracking.reads, makeDisplayList(kinds, values, names, layerIndexes, self.frame, layout)
+
+    def update(self, layout):
+        # recomputes units that read changed values, returns units whose primitives changed, in map order
+        self.order = mapUnits(layout)
+        backendChanged = self.backend != coordinates.geodesicBackend
+        self.backend = coordinates.geodesicBackend
+        changed = []
+        self.recomputed = 0
+        units = {}
+        for unit in self.order:
+            previous = self.units.get(unit)
+            if previous is not None and not backendChanged and not dependenciesChanged(previous[0], layout):
+                units[unit] = previous
+                continue
+            units[unit] = self.computeUnit(unit, layout)
+            self.recomputed += 1
+            if previous is None or not sameDisplayList(previous[1], units[unit][1]):
+                changed.append(unit)
+        self.units = units
+        return changed
+
+    def displayLists(self):
+        return [self.units[unit][1] for unit in self.order]
+
+    def displayList(self):
+        return concatDisplayLists(self.displayLists(), self.frame)
+
+class IncrementalSvg:
+    # svg groups of every unit, only changed units are rendered again
+    def __init__(self):
+        self.fragments = {} # unit -> (svg groups, max distance, icon symbols)
+
+    def update(self, incrementalMap, changedUnits):
+        for unit in changedUnits:
+            self.fragments[unit] = svg_map.renderSvgGroups(incrementalMap.units[unit][1])
+        self.fragments = {unit: self.fragments[unit] for unit in incrementalMap.order}
+
+    def content(self):
+        groups = {}
+        maxDistance = 0
+        symbols = {}
+        for unitGroups, unitMaxDistance, unitSymbols in self.fragments.values():
+            for name, elements in unitGroups.items():
+                groups.setdefault(name, []).extend(elements)
+            maxDistance = max(maxDistance, unitMaxDistance)
+            symbols.update(unitSymbols)
+        return svg_map.buildSvgContent(groups, maxDistance, symbols.values())
+
+    def write(self, fileName):
+        # write next to the target and rename, so viewers never see a half written file
+        temporary = fileName + '.tmp'
+        with open(temporary, 'w') as svg_file:
+            svg_file.write(self.content())
+        os.replace(temporary, fileName)
+
+def loadLayout(path):
+    with open(path, 'r', encoding='utf-8') as file:
+        return layoutFromConfig(json.load(file))
+
+def watch(configPath, output, interval=WATCH_INTERVAL, once=False):
+    incremental = IncrementalMap(1.5, FRAME_FEET) # same label offset as svg_map
+    svg = IncrementalSvg()
+    lastModified = None
+    lastError = None
+    while True:
+        layout = None
+        try:
+            modified = os.stat(configPath).st_mtime_ns
+            if modified != lastModified:
+                lastModified = modified
+                start = time.perf_counter()
+                layout = loadLayout(configPath)
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            # editors that save by renaming a temp file over the config remove it for a moment, and a half written
+            # file doesn't parse: the last good render stays, a missing file is loaded again as soon as it is back
+            if isinstance(e, OSError):
+                lastModified = None
+            error = f"Cannot load {configPath}: {type(e).__name__}: {e}"
+            if error != lastError: # once, not on every poll
+                print(error, file=sys.stderr)
+            lastError = error
+        if layout is not None:
+            lastError = None
+            changed = incremental.update(layout)
+            svg.update(incremental, changed)
+            svg.write(output)
+            print(f"recomputed {incremental.recomputed} of {len(incremental.order)} units, rewrote {len(changed)} "
+                  f"in {(time.perf_counter() - start) * 1000:.1f} ms", file=sys.stderr)
+        if once:
+            return
+        time.sleep(interval)
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-render the map svg every time the year config changes")
+    parser.add_argument("config", help="json with CityLayout fields, missing ones come from coordinates.py")
+    parser.add_argument("-o", "--output", default="../renders/preview.svg")
+    parser.add_argument("-i", "--interval", type=float, default=WATCH_INTERVAL, help="seconds between checks")
+    parser.add_argument("--once", action="store_true", help="render once and exit")
+    args = parser.parse_args()
+    try:
+        watch(args.config, args.output, args.interval, args.once)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Streaming reader for camp.json / art.json / event.json dumps
+
+The dumps are one big top-level array. iterJsonArray yields its elements one at a time while reading the file
+in chunks, so memory stays flat no matter how big the file is, and processing starts right away.
+This module has no dependencies on the rest of the library on purpose.
+"""
+import json
+from itertools import islice
+
+READ_CHUNK_SIZE = 1 << 16
+
+decoder = json.JSONDecoder()
+
+def skipWhitespace(buffer, position):
+    while position < len(buffer) and buffer[position] in ' \t\r\n':
+        position += 1
+    return position
+
+def iterJsonArray(file, chunkSize=READ_CHUNK_SIZE):
+    # file is a path or a text file object
+    if isinstance(file, str):
+        with open(file, 'r', encoding='utf-8') as handle:
+            yield from iterJsonArray(handle, chunkSize)
+        return
+
+    buffer = ''
+    position = 0
+    eof = False
+
+    def readMore():
+        nonlocal buffer, position, eof
+        chunk = file.read(chunkSize)
+        if not chunk:
+            eof = True
+        buffer = buffer[position:] + chunk
+        position = 0
+
+    # opening bracket
+    while True:
+        position = skipWhitespace(buffer, position)
+        if position < len(buffer) or eof:
+            break
+        readMore()
+    if position >= len(buffer) or buffer[position] != '[':
+        raise ValueError("Expected a JSON array at the top level")
+    position += 1
+
+    expectValue = None # None right after '[', True after ',', False after a value
+    while True:
+        position = skipWhitespace(buffer, position)
+        if position >= len(buffer):
+            if eof:
+                raise ValueError("Unexpected end of file inside JSON array")
+            readMore()
+            continue
+
+        if buffer[position] == ']' and expectValue is not True:
+            return
+        if expectValue is False:
+            if buffer[position] != ',':
+                raise ValueError(f"Expected ',' or ']' in JSON array, got {buffer[position]!r}")
+            position += 1
+            expectValue = True
+            continue
+
+        try:
+            value, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            readMore()
+            continue
+        if not eof and (end == len(buffer) or buffer[end] not in ' \t\r\n,]'):
+            # a number cut by the chunk boundary ("1." of "1.5") also decodes, make sure the value is complete
+            readMore()
+            continue
+
+        yield value
+        position = end
+        expectValue = False
+        if position > chunkSize:
+            buffer = buffer[position:]
+            position = 0
+
+def chunked(iterable, size):
+    # yields lists of up to size items, to feed streams into batch functions
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
@@ -1,146 +1,203 @@
-import simplekml
-import math
-from map import renderMap, GOLDEN_STAKE, distanceBearingFromCenter, ELEVATION, YEAR
+import io
+import time
+from xml.sax.saxutils import escape
+from map import renderMap, replayDisplayList, distanceBearingFromCenterBatch, ELEVATION, DEFAULT_LAYOUT, \
+    arcAngles, circleAngles, chordTolerance, DEFAULT_CHORD_TOLERANCE
 import os
 import zipfile
 
-# KML generation
-kml = simplekml.Kml()
-kml_folder = kml.newfolder(name=f"Burning Man Map {YEAR}")
-
-# Global variables
-LINE_COLOR = simplekml.Color.blue
-ARCH_COLOR = simplekml.Color.red
-CIRCLE_COLOR = simplekml.Color.changealphaint(100, simplekml.Color.green)
+# Global variables, colors are KML aabbggrr
+LINE_COLOR = "ffff0000" # blue
+ARCH_COLOR = "ff0000ff" # red
+CIRCLE_COLOR = "64008000" # green, alpha 100
 ICON_SCALE = 1.0
-FEET_PER_POINT = 100  # This determines the number of nodes
-DEGREES_PER_POINT = 7.5
-MIN_CURCLE_POINTS = 10
+COORDINATE_PRECISION = 7 # decimals of lat/lon, 7 is ~1 cm
 
-# List to keep track of used icons
-used_icons = []
+# shared styles, every placemark references one of them with styleUrl
+ARCH_STYLE = "arch"
+LINE_STYLE = "line"
+CIRCLE_STYLE = "circle"
 
 # Utility function to convert geopy Point to a list
 def point_to_list(point, altitude=ELEVATION):
     return [point[1], point[0], altitude]
 
-# Function to render an arch
-def renderKmlArch(startAngle, endAngle, archRadius, center):
-    coords = []
-    angle = startAngle
-
-    while angle <= endAngle:
-        rounded_angle = round(angle / DEGREES_PER_POINT) * DEGREES_PER_POINT
-        if rounded_angle > startAngle and rounded_angle < endAngle:
-            coords.append(point_to_list(distanceBearingFromCenter(archRadius, rounded_angle, center)))
-        angle += DEGREES_PER_POINT
+def toKmlCoordinates(points, altitude=ELEVATION):
+    # [lat, lon] rows -> [lon, lat, altitude]
+    return [[lon, lat, altitude] for lat, lon in points.tolist()]
 
-    coords.insert(0, point_to_list(distanceBearingFromCenter(archRadius, startAngle, center)))
-    coords.append(point_to_list(distanceBearingFromCenter(archRadius, endAngle, center)))
-    return coords
+# Function to render an arch, every vertex in one batch, spaced by map.arcAngles
+def renderKmlArch(startAngle, endAngle, archRadius, center, altitude=ELEVATION, tolerance=DEFAULT_CHORD_TOLERANCE):
+    return toKmlCoordinates(distanceBearingFromCenterBatch(archRadius, arcAngles(startAngle, endAngle, archRadius, tolerance), center), altitude)
 
 # Function to render a circle
-def renderKmlCircle(radius, center):
-    points_per_circle = max(MIN_CURCLE_POINTS, int((2 * math.pi * radius) / FEET_PER_POINT))
-    angleStep = 360 / points_per_circle
-    coords = []
-    angle = 0
-
-    while angle <= 360:
-        coords.append(point_to_list(distanceBearingFromCenter(radius, angle, center)))
-        angle += angleStep
-
-    coords.append(point_to_list(distanceBearingFromCenter(radius, 0, center)))
+def renderKmlCircle(radius, center, altitude=ELEVATION, tolerance=DEFAULT_CHORD_TOLERANCE):
+    coords = toKmlCoordinates(distanceBearingFromCenterBatch(radius, circleAngles(radius, tolerance), center), altitude)
+    coords[-1] = coords[0] # ring closes exactly
     return coords
 
-# Function to add arches to the KML file
-def addKmlArch(startAngle, endAngle, archRadius, center, name):
-    coords = renderKmlArch(startAngle, endAngle, archRadius, center)
-    
-    # Create a line for the arch
-    line = kml_folder.newlinestring(name=name)
-    line.coords = coords
-    line.style.linestyle.color = ARCH_COLOR
-    line.style.linestyle.width = 2
-
-# Function to add lines to the KML file
-def addKmlLine(startCoordinates, endCoordinates, name):
-    startCoord = point_to_list(startCoordinates)
-    endCoord = point_to_list(endCoordinates)
-    coords = [startCoord, endCoord]
-    
-    # Create a line
-    line = kml_folder.newlinestring(name=name)
-    line.coords = coords
-    line.style.linestyle.color = LINE_COLOR
-    line.style.linestyle.width = 2
-
-# Function to add circles to the KML file
-def addKmlCircle(location, width, name):
-    radius = width / 2
-    coords = renderKmlCircle(radius, location)
-
-    # Create a polygon for the circle
-    polygon = kml_folder.newpolygon(name=name)
-    polygon.outerboundaryis = coords
-    polygon.style.polystyle.color = CIRCLE_COLOR
-
-# Function to add icons to the KML file
-def addKmlIcon(filename, centerX, centerY, width, name, rotation=0):
-    global used_icons
-    if filename not in used_icons:
-        used_icons.append(filename)
-    
-    # Create a point for the icon
-    point = kml_folder.newpoint(name=name)
-    point.coords = [(centerX, centerY, ELEVATION)]
-    point.iconstyle.icon.href = filename
-    point.iconstyle.scale = width / 100 * ICON_SCALE
-    point.iconstyle.heading = rotation
-
-# Function to create a point
-def createPoint(location, name):
-    point = kml_folder.newpoint(name=name)
-    point.coords = [point_to_list(location)]
-
-# Function to add the Man icon or circle
-def addMan(location, width, name):
-    location_list = point_to_list(location)
-    if os.path.isfile('man.svg'):
-        addKmlIcon('man.svg', location_list[0], location_list[1], width, name)
-    else:
-        addKmlCircle(location, width, name)
-
-# Function to add the Temple icon or circle
-def addTemple(location, width, name):
-    location_list = point_to_list(location)
-    if os.path.isfile('temple.svg'):
-        addKmlIcon('temple.svg', location_list[0], location_list[1], width, name)
-    else:
-        addKmlCircle(location, width, name)
-
-
-# Function to add the Temple icon or circle
-def addAirport(location, width, name):
-    location_list = point_to_list(location)
-    if os.path.isfile('airport.svg'):
-        addKmlIcon('airport.svg', location_list[0], location_list[1], width, name)
-    else:
-        addKmlCircle(location, width, name)
-
-# Render the map elements
-renderMap(addKmlArch, addKmlLine, addKmlLine, addKmlCircle, addMan, addTemple, addAirport=addAirport)
-
-# Save the KML file
-kml_file_name = f"../renders/burning_man_map_{YEAR}.kml"
-kmz_file_name = f"../renders/burning_man_map_{YEAR}.kmz"
-kml.save(kml_file_name)
-
-# Create KMZ file
-with zipfile.ZipFile(kmz_file_name, 'w') as kmz:
-    # Add the KML file to the KMZ archive
-    kmz.write(kml_file_name, arcname=kml_file_name)
-    
-    # Add the used icon files to the KMZ archive
-    for icon in used_icons:
+def formatCoordinates(coords, precision=COORDINATE_PRECISION):
+    # lon,lat,alt tuples separated by spaces, lat/lon rounded to precision decimals, no trailing zeros
+    return " ".join(f"{round(float(lon), precision)!r},{round(float(lat), precision)!r},{altitude:g}" for lon, lat, altitude in coords)
+
+
+class KmlRenderer:
+    """
+    Writes placemarks straight to a text stream as they are rendered, nothing is kept in memory, so thousands of
+    placemarks cost the same as a few. Styles are defined once and referenced with styleUrl.
+        with open("map.kml", "w", encoding="utf-8") as stream, KmlRenderer(stream, 2024) as renderer:
+            renderMap(*renderer.callbacks(), layout=layoutForYear(2024))
+    Every render has its own renderer, so renders for different years or colors can run side by side in a thread pool.
+    """
+    def __init__(self, stream, year=DEFAULT_LAYOUT.year, lineColor=LINE_COLOR, archColor=ARCH_COLOR, circleColor=CIRCLE_COLOR,
+                 iconScale=ICON_SCALE, elevation=ELEVATION, precision=COORDINATE_PRECISION, tolerance=DEFAULT_CHORD_TOLERANCE):
+        self.write = stream.write
+        self.year = year
+        self.lineColor = lineColor
+        self.archColor = archColor
+        self.circleColor = circleColor
+        self.iconScale = iconScale
+        self.elevation = elevation
+        self.precision = precision
+        self.tolerance = chordTolerance(tolerance) # max chord deviation of arcs and circles in feet, or a preset name from map.CHORD_TOLERANCE_PRESETS
+
+        self.used_icons = [] # List to keep track of used icons
+        self.iconStyles = {} # (filename, scale, rotation) -> style id, icon styles are written on first use
+
+    def begin(self):
+        self.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                   '<kml xmlns="http://www.opengis.net/kml/2.2">\n<Document>\n')
+        self.write(f'<Style id="{ARCH_STYLE}"><LineStyle><color>{self.archColor}</color><width>2</width></LineStyle></Style>\n')
+        self.write(f'<Style id="{LINE_STYLE}"><LineStyle><color>{self.lineColor}</color><width>2</width></LineStyle></Style>\n')
+        self.write(f'<Style id="{CIRCLE_STYLE}"><PolyStyle><color>{self.circleColor}</color></PolyStyle></Style>\n')
+        self.write(f'<Folder>\n<name>Burning Man Map {self.year}</name>\n')
+
+    def end(self):
+        self.write('</Folder>\n</Document>\n</kml>\n')
+
+    def __enter__(self):
+        self.begin()
+        return self
+
+    def __exit__(self, *exception):
+        self.end()
+
+    def writePlacemark(self, name, style, geometry, description=None):
+        description = f'<description>{escape(description)}</description>' if description is not None else ''
+        style = f'<styleUrl>#{style}</styleUrl>' if style is not None else ''
+        self.write(f'<Placemark><name>{escape(name)}</name>{description}{style}{geometry}</Placemark>\n')
+
+    def lineString(self, coords):
+        return f'<LineString><coordinates>{formatCoordinates(coords, self.precision)}</coordinates></LineString>'
+
+    # Function to add arches to the KML file
+    def addArch(self, startAngle, endAngle, archRadius, center, name):
+        coords = renderKmlArch(startAngle, endAngle, archRadius, center, self.elevation, self.tolerance)
+        self.writePlacemark(name, ARCH_STYLE, self.lineString(coords))
+
+    # Function to add lines to the KML file
+    def addLine(self, startCoordinates, endCoordinates, name):
+        coords = [point_to_list(startCoordinates, self.elevation), point_to_list(endCoordinates, self.elevation)]
+        self.writePlacemark(name, LINE_STYLE, self.lineString(coords))
+
+    def polygon(self, coords):
+        return f'<Polygon><outerBoundaryIs><LinearRing><coordinates>{formatCoordinates(coords, self.precision)}</coordinates></LinearRing></outerBoundaryIs></Polygon>'
+
+    # Function to add circles to the KML file
+    def addCircle(self, location, width, name):
+        coords = renderKmlCircle(width / 2, location, self.elevation, self.tolerance)
+        self.writePlacemark(name, CIRCLE_STYLE, self.polygon(coords))
+
+    # Function to add icons to the KML file
+    def addIcon(self, filename, centerX, centerY, width, name, rotation=0):
+        if filename not in self.used_icons:
+            self.used_icons.append(filename)
+        key = (filename, width / 100 * self.iconScale, rotation)
+        if key not in self.iconStyles:
+            self.iconStyles[key] = f"icon{len(self.iconStyles)}"
+            self.write(f'<Style id="{self.iconStyles[key]}"><IconStyle><scale>{key[1]}</scale><heading>{rotation}</heading>'
+                       f'<Icon><href>{escape(filename)}</href></Icon></IconStyle></Style>\n')
+        self.writePlacemark(name, self.iconStyles[key],
+                            f'<Point><coordinates>{formatCoordinates([(centerX, centerY, self.elevation)], self.precision)}</coordinates></Point>')
+
+    # Function to create a point, for camps and art placemarks
+    def createPoint(self, location, name, description=None):
+        self.writePlacemark(name, None,
+                            f'<Point><coordinates>{formatCoordinates([point_to_list(location, self.elevation)], self.precision)}</coordinates></Point>',
+                            description)
+
+    def addIconOrCircle(self, filename, location, width, name):
+        location_list = point_to_list(location, self.elevation)
+        if os.path.isfile(filename):
+            self.addIcon(filename, location_list[0], location_list[1], width, name)
+        else:
+            self.addCircle(location, width, name)
+
+    # Function to add the Man icon or circle
+    def addMan(self, location, width, name):
+        self.addIconOrCircle('man.svg', location, width, name)
+
+    # Function to add the Temple icon or circle
+    def addTemple(self, location, width, name):
+        self.addIconOrCircle('temple.svg', location, width, name)
+
+    # Function to add the airport icon or circle
+    def addAirport(self, location, width, name):
+        self.addIconOrCircle('airport.svg', location, width, name)
+
+    def callbacks(self):
+        # renderer functions in renderMap argument order, kml has no hour labels
+        return (self.addArch, self.addLine, self.addLine, self.addCircle, self.addMan, self.addTemple, None, self.addAirport)
+
+    def render(self, displayList):
+        # writes a whole document for a FRAME_GEO display list (see map.buildDisplayList)
+        with self:
+            replayDisplayList(displayList, *self.callbacks())
+        return self
+
+
+class StreamTee:
+    # writes to several streams at once, so one render fills the kml and the kmz
+    def __init__(self, *streams):
+        self.streams = streams
+
+    def write(self, text):
+        for stream in self.streams:
+            stream.write(text)
+
+def openKmzDocument(kmz, name='doc.kml'):
+    # doc.kml at the root of the archive, compressed while it is written
+    info = zipfile.ZipInfo(name, time.localtime()[:6])
+    info.compress_type = zipfile.ZIP_DEFLATED
+    return io.TextIOWrapper(kmz.open(info, 'w'), encoding='utf-8')
+
+def addKmzIcons(kmz, icons):
+    for icon in icons:
         kmz.write(icon, arcname=icon)
+
+def writeKml(displayList, fileName, year, **options):
+    with open(fileName, 'w', encoding='utf-8') as kml_file:
+        KmlRenderer(kml_file, year, **options).render(displayList)
+
+def writeKmz(displayList, fileName, year, **options):
+    with zipfile.ZipFile(fileName, 'w', zipfile.ZIP_DEFLATED) as kmz:
+        with openKmzDocument(kmz) as document:
+            renderer = KmlRenderer(document, year, **options).render(displayList)
+        addKmzIcons(kmz, renderer.used_icons)
+
+def renderKmlMap(layout=None, **options):
+    # renders the map into ../renders/burning_man_map_YEAR.kml and .kmz in one pass, returns their names.
+    # options go to KmlRenderer
+    layout = layout or DEFAULT_LAYOUT
+    kml_file_name = f"../renders/burning_man_map_{layout.year}.kml"
+    kmz_file_name = f"../renders/burning_man_map_{layout.year}.kmz"
+
+    with open(kml_file_name, 'w', encoding='utf-8') as kml_file, zipfile.ZipFile(kmz_file_name, 'w', zipfile.ZIP_DEFLATED) as kmz:
+        with openKmzDocument(kmz) as document, KmlRenderer(StreamTee(kml_file, document), layout.year, **options) as renderer:
+            renderMap(*renderer.callbacks(), layout=layout)
+        # Add the used icon files to the KMZ archive
+        addKmzIcons(kmz, renderer.used_icons)
+    return kml_file_name, kmz_file_name
+
+if __name__ == "__main__":
+    renderKmlMap()
@@ -0,0 +1,232 @@
+"""
+Levels of detail for Google Earth: a KMZ whose doc.kml only has NetworkLinks with <Region>/<Lod>,
+so Earth loads the overview when the whole city is on screen and the street level file only when zoomed in.
+
+Arcs and circles are densified once at LOD_BASE_TOLERANCE, the fence segments are joined into one polyline,
+then every level simplifies them with Douglas-Peucker down to its tolerance in feet. The street level is at the
+plain kml tolerance, so the closest zoom is never heavier than the kmz without levels. Simplification preserves
+topology: a shortcut is only taken if it crosses other streets exactly like the points it replaces did
+(and doesn't cross its own line), so intersections don't appear or vanish at coarse levels.
+The last LOD_CACHE_SIZE level sets are cached by layout and geodesic backend.
+
+usage: python lod_map.py
+"""
+import functools
+import sys
+from collections import namedtuple
+import numpy as np
+import coordinates
+from map import *
+from kml_map import KmlRenderer, openKmzDocument, addKmzIcons, toKmlCoordinates, ARCH_STYLE, LINE_STYLE, CIRCLE_STYLE
+import zipfile
+
+# maxLodPixels -1 means no upper limit, the city fills ~1000 pixels when it fits the screen
+LodLevel = namedtuple('LodLevel', ['name', 'tolerance', 'minLodPixels', 'maxLodPixels'])
+# on an arc densified at the base tolerance, dropping every other vertex takes 4 times the tolerance, every third 9 times,
+# so levels between those steps would simplify to the same vertices
+LOD_LEVELS = (
+    LodLevel('overview', 9 * DEFAULT_CHORD_TOLERANCE, 0, 1024),
+    LodLevel('city', 4 * DEFAULT_CHORD_TOLERANCE, 1024, 4096),
+    LodLevel('street', DEFAULT_CHORD_TOLERANCE, 4096, -1),
+)
+LOD_BASE_TOLERANCE = DEFAULT_CHORD_TOLERANCE
+LOD_CACHE_SIZE = 16
+
+SHAPE_LINE = 'line'
+SHAPE_RING = 'ring'
+SHAPE_POINT = 'point'
+
+# points are (x, y) feet rows before toGeo and (lat, lon) rows after it
+LodFeature = namedtuple('LodFeature', ['shape', 'kind', 'name', 'points', 'width'])
+
+def arcPoints(startAngle, endAngle, radius, center, tolerance):
+    angles = np.radians(arcAngles(startAngle, endAngle, radius, tolerance))
+    return np.column_stack((center[0] + radius * np.sin(angles), center[1] + radius * np.cos(angles)))
+
+def circlePoints(radius, center, tolerance):
+    angles = np.radians(circleAngles(radius, tolerance))
+    points = np.column_stack((center[0] + radius * np.sin(angles), center[1] + radius * np.cos(angles)))
+    points[-1] = points[0]
+    return points
+
+def mapFeatures(displayList, tolerance=LOD_BASE_TOLERANCE):
+    # densified features of a FRAME_FEET display list, touching lines of the same name are joined into one polyline
+    features = []
+    for primitive in iterDisplayList(displayList):
+        kind, name, row = primitive.kind, primitive.name, primitive.values
+        if kind == PRIMITIVE_ARCH:
+            features.append(LodFeature(SHAPE_LINE, kind, name, arcPoints(row[0], row[1], row[2], row[3:5], tolerance), 0))
+        elif kind in (PRIMITIVE_LINE, PRIMITIVE_FENCE_LINE):
+            last = features[-1] if features else None
+            if last is not None and last.shape == SHAPE_LINE and last.kind == kind and last.name == name \
+                    and np.allclose(last.points[-1], row[0:2]):
+                features[-1] = last._replace(points=np.vstack((last.points, [row[2:4]])))
+            else:
+                features.append(LodFeature(SHAPE_LINE, kind, name, np.array([row[0:2], row[2:4]]), 0))
+        elif kind == PRIMITIVE_CIRCLE:
+            features.append(LodFeature(SHAPE_RING, kind, name, circlePoints(row[2] / 2, row[0:2], tolerance), 0))
+        elif kind in (PRIMITIVE_MAN, PRIMITIVE_TEMPLE, PRIMITIVE_AIRPORT):
+            features.append(LodFeature(SHAPE_POINT, kind, name, np.array([row[0:2]]), row[2]))
+    return features
+
+def isClosed(points):
+    return len(points) >= 4 and np.array_equal(points[0], points[-1])
+
+def segments(points):
+    return np.hstack((points[:-1], points[1:]))
+
+def orientation(ax, ay, bx, by, cx, cy):
+    return np.sign((bx - ax) * (cy - ay) - (by - ay) * (cx - ax))
+
+def crossedIds(chain, obstacles, ids):
+    # sorted ids of obstacle segments properly crossed by segments of chain, touching ends don't count
+    low, high = chain.min(axis=0), chain.max(axis=0)
+    near = (np.minimum(obstacles[:, 0], obstacles[:, 2]) <= high[0]) & (np.maximum(obstacles[:, 0], obstacles[:, 2]) >= low[0]) \
+        & (np.minimum(obstacles[:, 1], obstacles[:, 3]) <= high[1]) & (np.maximum(obstacles[:, 1], obstacles[:, 3]) >= low[1])
+    obstacles, ids = obstacles[near], ids[near]
+    if not len(obstacles):
+        return []
+    a, b = chain[:-1, None, :], chain[1:, None, :]
+    c, d = obstacles[None, :, 0:2], obstacles[None, :, 2:4]
+    crossing = (orientation(a[..., 0], a[..., 1], b[..., 0], b[..., 1], c[..., 0], c[..., 1])
+                * orientation(a[..., 0], a[..., 1], b[..., 0], b[..., 1], d[..., 0], d[..., 1]) < 0) \
+        & (orientation(c[..., 0], c[..., 1], d[..., 0], d[..., 1], a[..., 0], a[..., 1])
+           * orientation(c[..., 0], c[..., 1], d[..., 0], d[..., 1], b[..., 0], b[..., 1]) < 0)
+    return sorted(np.broadcast_to(ids, crossing.shape)[crossing].tolist())
+
+def pointSegmentDistances(points, start, end):
+    direction = end - start
+    length = direction @ direction
+    if length == 0:
+        return np.hypot(*(points - start).T)
+    t = np.clip((points - start) @ direction / length, 0, 1)
+    return np.hypot(*(points - start - t[:, None] * direction).T)
+
+def douglasPeucker(points, first, last, tolerance, accept, keep):
+    stack = [(first, last)]
+    while stack:
+        i, j = stack.pop()
+        if j - i < 2:
+            continue
+        distances = pointSegmentDistances(points[i + 1:j], points[i], points[j])
+        k = i + 1 + int(np.argmax(distances))
+        if distances[k - i - 1] > tolerance or not accept(i, j):
+            keep.add(k)
+            stack += [(i, k), (k, j)]
+
+def simplifyFeature(points, tolerance, obstacles, ids, ownId):
+    # obstacles are segments of other features, their crossings with the line must not change
+    n = len(points)
+    if n <= 2:
+        return points
+    own = segments(points)
+    ownIds = np.full(len(own), ownId)
+
+    def accept(i, j):
+        # own segments outside of i..j must not be crossed either
+        others = np.vstack((obstacles, own[:i], own[j:]))
+        otherIds = np.concatenate((ids, ownIds[:i], ownIds[j:]))
+        return crossedIds(points[[i, j]], others, otherIds) == crossedIds(points[i:j + 1], others, otherIds)
+
+    # rings are split in three so they never collapse to a line
+    splits = [0, n // 3, 2 * n // 3, n - 1] if isClosed(points) else [0, n - 1]
+    keep = set(splits)
+    for first, last in zip(splits, splits[1:]):
+        douglasPeucker(points, first, last, tolerance, accept, keep)
+    return points[sorted(keep)]
+
+def simplifyFeatures(features, tolerance):
+    # one feature at a time against the current state of all the others
+    current = [feature.points for feature in features]
+    lines = [index for index, feature in enumerate(features) if feature.shape != SHAPE_POINT]
+    for index in lines:
+        others = [other for other in lines if other != index]
+        if not others:
+            current[index] = simplifyFeature(current[index], tolerance, np.empty((0, 4)), np.empty(0, dtype=int), index)
+            continue
+        obstacles = np.vstack([segments(current[other]) for other in others])
+        ids = np.concatenate([np.full(len(current[other]) - 1, other) for other in others])
+        current[index] = simplifyFeature(current[index], tolerance, obstacles, ids, index)
+    return [feature._replace(points=points) for feature, points in zip(features, current)]
+
+def toGeo(features, layout):
+    # every point of every feature in one batch
+    counts = [len(feature.points) for feature in features]
+    geo = feetToCoordinateBatch(np.vstack([feature.points for feature in features]), layout)
+    parts = np.split(geo, np.cumsum(counts)[:-1])
+    return [feature._replace(points=points) for feature, points in zip(features, parts)]
+
+@functools.lru_cache(maxsize=LOD_CACHE_SIZE)
+def cachedLodLevels(layout, backend, levels):
+    # backend is only part of the key, toGeo reads the current one
+    dense = mapFeatures(buildDisplayList(0, FRAME_FEET, layout, excludeLayers=(LAYER_HOUR_LABELS,)))
+    return tuple((level, toGeo(simplifyFeatures(dense, level.tolerance), layout)) for level in levels)
+
+def buildLodLevels(layout=None, levels=LOD_LEVELS):
+    # ((level, features in lat/lon), ...) from the coarsest level, cached
+    return cachedLodLevels(layout or DEFAULT_LAYOUT, coordinates.geodesicBackend, tuple(levels))
+
+def lodVertexCounts(lodLevels):
+    return {level.name: sum(len(feature.points) for feature in features) for level, features in lodLevels}
+
+def lodBounds(lodLevels):
+    # north, south, east, west of everything in the finest level
+    points = np.vstack([feature.points for feature in lodLevels[-1][1]])
+    return float(points[:, 0].max()), float(points[:, 0].min()), float(points[:, 1].max()), float(points[:, 1].min())
+
+def lodFileName(level):
+    return f"lod_{level.name}.kml"
+
+def writeLodDocument(stream, lodLevels, year):
+    north, south, east, west = lodBounds(lodLevels)
+    stream.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                 f'<kml xmlns="http://www.opengis.net/kml/2.2">\n<Document>\n<name>Burning Man Map {year}</name>\n')
+    for level, features in lodLevels:
+        stream.write(f'<NetworkLink><name>{level.name}</name><Region><LatLonAltBox><north>{north!r}</north><south>{south!r}</south>'
+                     f'<east>{east!r}</east><west>{west!r}</west></LatLonAltBox><Lod><minLodPixels>{level.minLodPixels}</minLodPixels>'
+                     f'<maxLodPixels>{level.maxLodPixels}</maxLodPixels></Lod></Region>'
+                     f'<Link><href>{lodFileName(level)}</href><viewRefreshMode>onRegion</viewRefreshMode></Link></NetworkLink>\n')
+    stream.write('</Document>\n</kml>\n')
+
+def writeLodFeatures(renderer, features):
+    icons = {PRIMITIVE_MAN: renderer.addMan, PRIMITIVE_TEMPLE: renderer.addTemple, PRIMITIVE_AIRPORT: renderer.addAirport}
+    for feature in features:
+        if feature.shape == SHAPE_POINT:
+            icons[feature.kind](feature.points[0].tolist(), feature.width, feature.name)
+            continue
+        coords = toKmlCoordinates(feature.points, renderer.elevation)
+        if feature.shape == SHAPE_RING:
+            renderer.writePlacemark(feature.name, CIRCLE_STYLE, renderer.polygon(coords))
+        else:
+            renderer.writePlacemark(feature.name, ARCH_STYLE if feature.kind == PRIMITIVE_ARCH else LINE_STYLE, renderer.lineString(coords))
+
+def writeLodKmz(fileName, lodLevels, year, placemarks=(), **options):
+    """
+    doc.kml with a NetworkLink per level plus a kml file per level, options go to KmlRenderer.
+    placemarks: (name, (lat, lon), description) of camps or art, streamed into the finest level only
+    """
+    icons = []
+    with zipfile.ZipFile(fileName, 'w', zipfile.ZIP_DEFLATED) as kmz:
+        with openKmzDocument(kmz) as document: # Earth opens the first kml of the archive
+            writeLodDocument(document, lodLevels, year)
+        for index, (level, features) in enumerate(lodLevels):
+            with openKmzDocument(kmz, lodFileName(level)) as document, KmlRenderer(document, year, **options) as renderer:
+                writeLodFeatures(renderer, features)
+                if index == len(lodLevels) - 1:
+                    for name, location, description in placemarks:
+                        renderer.createPoint(location, name, description)
+            icons += [icon for icon in renderer.used_icons if icon not in icons]
+        addKmzIcons(kmz, icons)
+
+def renderLodKmzMap(layout=None):
+    # renders the map into ../renders/burning_man_map_YEAR_lod.kmz, returns the file name
+    layout = layout or DEFAULT_LAYOUT
+    file_name = f"../renders/burning_man_map_{layout.year}_lod.kmz"
+    lodLevels = buildLodLevels(layout)
+    writeLodKmz(file_name, lodLevels, layout.year)
+    for name, count in lodVertexCounts(lodLevels).items():
+        print(f"{name:>10} {count:6} vertices", file=sys.stderr)
+    return file_name
+
+if __name__ == "__main__":
+    renderLodKmzMap()
@@ -1,5 +1,7 @@
-
 import math
+import functools
+from collections import namedtuple
+import numpy as np
 from coordinates import *
 
 ### WHERE IS TEMPLE?
@@ -17,64 +19,67 @@ Letter streets are arches
 
 breakForPlazas = true also forces breakForCenterCamp
 """
-def generateLetterStreet(letter, addArch, breakForPlazas=True, breakForCenterCamp=None):
+def generateLetterStreet(letter, addArch, breakForPlazas=True, breakForCenterCamp=None, layout=None):
+    layout = layout or DEFAULT_LAYOUT
     letter = letter.lower()
-    archRadius = letterToDistance(letter)
+    archRadius = letterToDistance(letter, layout)
 
-    archAngles = [bearing(2, 00)]
+    archAngles = [bearing(2, 00, layout)]
     if breakForPlazas:
         breakForCenterCamp = True # force
         # find angle at which plazas cross the street
-        for (hour, minute, distance, width, outerWidth, name) in plazas:
+        for (hour, minute, distance, width, outerWidth, name) in layout.plazas:
             angle = abAngleInTriangle(archRadius, distance, width / 2)
             if angle is None: # does not cross
                 continue 
-            plazaCenter = bearing(hour, minute)
+            plazaCenter = bearing(hour, minute, layout)
             archAngles.append(plazaCenter - angle)
             archAngles.append(plazaCenter + angle)
 
     if breakForCenterCamp: # here we will check if street breaks for center camp
         if letter=='esplanade': # special treatment - outer circle of center camp
-            angle = abAngleInTriangle(archRadius, manToCenterOfCenterCampInFeet, centerCampOuterRadius)
+            angle = abAngleInTriangle(archRadius, layout.manToCenterOfCenterCampInFeet, layout.centerCampOuterRadius)
         else:
-            angle = abAngleInTriangle(archRadius, manToCenterOfCenterCampInFeet, centerCampStreetCrossRadius)
+            angle = abAngleInTriangle(archRadius, layout.manToCenterOfCenterCampInFeet, layout.centerCampStreetCrossRadius)
 
         if not angle is None:
-            centerCampBearing = bearing(6, 00)
+            centerCampBearing = bearing(6, 00, layout)
             archAngles.append(centerCampBearing - angle)
             archAngles.append(centerCampBearing + angle)
 
-    archAngles.append(bearing(10, 00))
+    archAngles.append(bearing(10, 00, layout))
 
     prevAngle = None
     for currentAngle in sorted(archAngles):
         if prevAngle is None:
             prevAngle = currentAngle
             continue
-        addArch(prevAngle, currentAngle, archRadius, GOLDEN_STAKE, letter)
+        addArch(prevAngle, currentAngle, archRadius, GOLDEN_STAKE_FEET, letter)
         prevAngle = None
 
-def generateLetterStreets(addArch):
-    for key in streetDepths:
-        generateLetterStreet(key, addArch)
+def generateLetterStreets(addArch, layout=None):
+    layout = layout or DEFAULT_LAYOUT
+    for key in layout.distanceToStreetCenter:
+        generateLetterStreet(key, addArch, layout=layout)
 
-def generateRadialStreet(streetHour, streetMinute, addLine, breakForPlazas=True, breakForCenterCamp=None):
+def generateRadialStreet(streetHour, streetMinute, addLine, breakForPlazas=True, breakForCenterCamp=None, layout=None):
+    layout = layout or DEFAULT_LAYOUT
     shortStreet =  streetMinute % 30 == 15
-    startAt = "esplanade" if not shortStreet else quaterHourStreetsStartAt
+    startAt = "esplanade" if not shortStreet else layout.quaterHourStreetsStartAt
 
-    linePoints = [addressToCoordinate(startAt, streetHour, streetMinute)]
+    linePoints = [addressToFeet(startAt, streetHour, streetMinute, layout)]
 
     if breakForPlazas: 
         breakForCenterCamp = True;
      
     if breakForCenterCamp and not shortStreet:
-        angle = abAngleInTriangle(manToCenterOfCenterCampInFeet, manToCenterOfCenterCampInFeet, centerCampStreetCrossRadius)
-        if abs(bearing(streetHour, streetMinute) - bearing(6,00)) < angle: # check if street crosses the circle
-            linePoints = [ distanceToCoordinate (manToCenterOfCenterCampInFeet + centerCampStreetCrossRadius, streetHour, streetMinute) ]
+        angle = abAngleInTriangle(layout.manToCenterOfCenterCampInFeet, layout.manToCenterOfCenterCampInFeet, layout.centerCampStreetCrossRadius)
+        if abs(bearing(streetHour, streetMinute, layout) - bearing(6,00, layout)) < angle: # check if street crosses the circle
+            linePoints = [ distanceToFeet (layout.manToCenterOfCenterCampInFeet + layout.centerCampStreetCrossRadius, streetHour, streetMinute, layout) ]
       
     if breakForPlazas:
         # find angle at which plazas cross the street
-        for (hour, minute, distance, width, outerWidth, name) in plazas:
+        for (hour, minute, distance, width, outerWidth, name) in layout.plazas:
             if (streetHour != hour) or (streetMinute != minute):
                 continue
 
@@ -82,12 +87,12 @@ def generateRadialStreet(streetHour, streetMinute, addLine, breakForPlazas=True,
             # move the point to the golden spike by width/2
             # then move it out by width/2
 
-            linePoints.append( distanceToCoordinate (distance-width/2,hour, minute))
-            linePoints.append( distanceToCoordinate (distance+width/2,hour, minute))
+            linePoints.append( distanceToFeet (distance-width/2,hour, minute, layout))
+            linePoints.append( distanceToFeet (distance+width/2,hour, minute, layout))
 
 
    
-    linePoints.append(addressToCoordinate(lastStreet, streetHour, streetMinute))
+    linePoints.append(addressToFeet(layout.lastStreet, streetHour, streetMinute, layout))
 
 
     name = f"{streetHour:02}:{streetMinute:02}"
@@ -100,18 +105,19 @@ def generateRadialStreet(streetHour, streetMinute, addLine, breakForPlazas=True,
         start = None
     pass
 
-def generateRadialStreets(addLine):
+def generateRadialStreets(addLine, layout=None):
     firstStreetTime = 2*60
     lastStreetTime = 10*60
     streetStep = 15
 
     currentStreetTime = firstStreetTime
     while currentStreetTime <= lastStreetTime:
-        generateRadialStreet(math.floor(currentStreetTime/60), currentStreetTime%60, addLine)
+        generateRadialStreet(math.floor(currentStreetTime/60), currentStreetTime%60, addLine, layout=layout)
         currentStreetTime += streetStep
 
 # this function will place hour labels. It will also place the 12 hour mark above man, so the renderer needs to decide what to do with it
-def generateRadialStreetNames(addHourLabel, extendByFeet=0):
+def generateRadialStreetNames(addHourLabel, extendByFeet=0, layout=None):
+    layout = layout or DEFAULT_LAYOUT
 
     firstStreetTime = 2*60
     lastStreetTime = 10*60
@@ -119,115 +125,389 @@ def generateRadialStreetNames(addHourLabel, extendByFeet=0):
 
     currentStreetTime = firstStreetTime
 
-    radialStreetNameDistance = diameterKInFeet/2 + extendByFeet
+    radialStreetNameDistance = layout.diameterKInFeet/2 + extendByFeet
 
     while currentStreetTime <= lastStreetTime:
         hour = math.floor(currentStreetTime/60)
         minute = currentStreetTime%60
-        rotation = bearing(hour, minute)
-        coordinate = distanceBearingToCoordinate(radialStreetNameDistance, rotation)
+        rotation = bearing(hour, minute, layout)
+        coordinate = distanceBearingToFeet(radialStreetNameDistance, rotation)
         addHourLabel(hour, minute, coordinate, rotation)
         currentStreetTime += streetStep
 
-    rotation = bearing(12, 0)
-    coordinate = distanceBearingToCoordinate(radialStreetNameDistance, rotation)
+    rotation = bearing(12, 0, layout)
+    coordinate = distanceBearingToFeet(radialStreetNameDistance, rotation)
     addHourLabel(12, 0, coordinate, rotation)
 
 
 
 
-def generatePlazas(addCircle):
-    for (hour, minute, distance, width, outerWidth, name) in plazas:
-        center = distanceToCoordinate(distance, hour, minute)
+def generatePlazas(addCircle, layout=None):
+    layout = layout or DEFAULT_LAYOUT
+    for (hour, minute, distance, width, outerWidth, name) in layout.plazas:
+        center = distanceToFeet(distance, hour, minute, layout)
         addCircle(center, width, name)
         if outerWidth:
             addCircle(center, outerWidth, name)
 
-def generateCenterCamp(addLine, addArch, addCircle):
+def generateCenterCamp(addLine, addArch, addCircle, layout=None):
+    layout = layout or DEFAULT_LAYOUT
+    manToCenterCamp = layout.manToCenterOfCenterCampInFeet
+    insideRadius = layout.centerCampRadiusInsideInFeet
+    outerRadius = layout.centerCampOuterRadius
 
-    center = distanceToCoordinate(manToCenterOfCenterCampInFeet, 6, 00)
-    addCircle(center, centerCampRadiusInsideInFeet*2, "Center Camp") # so far seems to be constant
+    center = distanceToFeet(manToCenterCamp, 6, 00, layout)
+    addCircle(center, insideRadius*2, "Center Camp") # so far seems to be constant
 
-    if YEAR == 2024:
-        angle = abAngleInTriangle(centerCampOuterRadius, manToCenterOfCenterCampInFeet, letterToDistance('a'))
-        addArch(midnightBearing-angle, midnightBearing+angle, centerCampOuterRadius,  center, "Center Camp")
+    if layout.year == 2024:
+        angle = abAngleInTriangle(outerRadius, manToCenterCamp, letterToDistance('a', layout))
+        addArch(layout.midnightBearing-angle, layout.midnightBearing+angle, outerRadius,  center, "Center Camp")
 
-        addLine(distanceToCoordinate(manToCenterOfCenterCampInFeet - centerCampRadiusInsideInFeet,6,00), 
-                distanceToCoordinate(manToCenterOfCenterCampInFeet - centerCampOuterRadius,6,00), 
+        addLine(distanceToFeet(manToCenterCamp - insideRadius,6,00, layout), 
+                distanceToFeet(manToCenterCamp - outerRadius,6,00, layout), 
                 "Center Camp")
         return
     
-    if YEAR == 2023:
-        addCircle(center, centerCampOuterRadius*2, centerCampStreetName)
+    if layout.year == 2023:
+        addCircle(center, outerRadius*2, layout.centerCampStreetName)
 
-        addLine(distanceToCoordinate(manToCenterOfCenterCampInFeet + centerCampRadiusInsideInFeet,6,00), 
-                distanceToCoordinate(manToCenterOfCenterCampInFeet + centerCampOuterRadius,6,00), 
+        addLine(distanceToFeet(manToCenterCamp + insideRadius,6,00, layout), 
+                distanceToFeet(manToCenterCamp + outerRadius,6,00, layout), 
                 "Center Camp")
         
         magicalAngle = 150/2 # something approximate, I wasn't able to find it in the spec
-        addLine(addressToCoordinate('a', 6, 30), 
-                distanceBearingFromCenter(centerCampRadiusInsideInFeet, midnightBearing + 360-magicalAngle, center),
+        addLine(addressToFeet('a', 6, 30, layout), 
+                distanceBearingToFeet(insideRadius, layout.midnightBearing + 360-magicalAngle, center),
                 "Center Camp")
-        addLine(addressToCoordinate('a', 5, 30), 
-                distanceBearingFromCenter(centerCampRadiusInsideInFeet, midnightBearing + magicalAngle, center),
+        addLine(addressToFeet('a', 5, 30, layout), 
+                distanceBearingToFeet(insideRadius, layout.midnightBearing + magicalAngle, center),
                 "Center Camp")
         return
     
 
-def renderPromenades(addLine):
+def renderPromenades(addLine, layout=None):
+    layout = layout or DEFAULT_LAYOUT
     addLine( 
-        distanceToCoordinate(manToCenterOfCenterCampInFeet - centerCampOuterRadius, 6, 00),
-        distanceToCoordinate(manRadiusInFeet, 6, 00),
+        distanceToFeet(layout.manToCenterOfCenterCampInFeet - layout.centerCampOuterRadius, 6, 00, layout),
+        distanceToFeet(layout.manRadiusInFeet, 6, 00, layout),
         "6:00 Promenade"
     )
     addLine( 
-        addressToCoordinate('esplanade', 3, 00),
-        distanceToCoordinate(manRadiusInFeet, 3, 00),
+        addressToFeet('esplanade', 3, 00, layout),
+        distanceToFeet(layout.manRadiusInFeet, 3, 00, layout),
         "3:00 Promenade"
     )
     addLine( 
-        addressToCoordinate('esplanade', 9, 00),
-        distanceToCoordinate(manRadiusInFeet, 9, 00),
+        addressToFeet('esplanade', 9, 00, layout),
+        distanceToFeet(layout.manRadiusInFeet, 9, 00, layout),
         "9:00 Promenade"
     )
     addLine( 
-        distanceToCoordinate(manToTempleInFeet - templeRadiusInFeet, 12, 00),
-        distanceToCoordinate(manRadiusInFeet, 12, 00),
+        distanceToFeet(layout.manToTempleInFeet - layout.templeRadiusInFeet, 12, 00, layout),
+        distanceToFeet(layout.manRadiusInFeet, 12, 00, layout),
         "12:00 Promenade"
     )
     
 
-def renderManAndTemple(renderMan, renderTemple):
+def renderManAndTemple(renderMan, renderTemple, layout=None):
     ### renderMan, renderTemple are compatible with renderCircle
-    renderMan(GOLDEN_STAKE, manRadiusInFeet*2, "Man")
-    renderTemple(distanceToCoordinate(manToTempleInFeet, 12, 00), templeRadiusInFeet*2, "Temple")
-
-def renderAirport(addAirport):
-    airportWidth = templeRadiusInFeet * 2 
-    addAirport(AIRPORT_COORDINATES, airportWidth, "airport") 
-
-def renderTrashFence(addLine):
-    lastPoint = fencePoints[-1]
-    for point in fencePoints:
+    layout = layout or DEFAULT_LAYOUT
+    renderMan(GOLDEN_STAKE_FEET, layout.manRadiusInFeet*2, "Man")
+    renderTemple(distanceToFeet(layout.manToTempleInFeet, 12, 00, layout), layout.templeRadiusInFeet*2, "Temple")
+
+def renderAirport(addAirport, layout=None):
+    layout = layout or DEFAULT_LAYOUT
+    airportWidth = layout.templeRadiusInFeet * 2 
+    addAirport(coordinateToFeet(layout.airportCoordinates, layout), airportWidth, "airport") 
+
+def renderTrashFence(addLine, layout=None):
+    layout = layout or DEFAULT_LAYOUT
+    points = [coordinateToFeet(point, layout) for point in layout.fencePoints]
+    lastPoint = points[-1]
+    for point in points:
         addLine(lastPoint, point, "Trash Fence")
         lastPoint = point
 
-    
-def renderMap(addArch, addLine, addFenceLine, addCircle, addMan, addTemple, addHourLabel = None, addAirport = None, extendRadialNamesByBlocks = 0):
+
+"""
+Densifying arcs and circles into polylines for renderers that can't draw arcs (kml, geojson).
+Vertices are spaced so the chord between two of them never strays more than tolerance feet from the arc:
+chord deviation (sagitta) of a step is radius * (1 - cos(step / 2)), so small plazas get a few points and
+big streets get as many as they need to look round.
+"""
+# tolerance in feet per output target
+CHORD_TOLERANCE_PRESETS = {
+    'overview': 10, # whole city on a screen, fewer vertices than the old fixed 7.5 degree steps (up to 12 ft off)
+    'street': 2, # zoomed in to a few blocks
+    'print': 0.5, # large prints
+    'survey': 0.1, # staking out on the playa
+}
+DEFAULT_CHORD_TOLERANCE = CHORD_TOLERANCE_PRESETS['overview']
+MIN_CIRCLE_SEGMENTS = 8
+
+def chordTolerance(tolerance):
+    # preset name or feet
+    if isinstance(tolerance, str):
+        if tolerance not in CHORD_TOLERANCE_PRESETS:
+            raise ValueError(f"Unknown chord tolerance preset: {tolerance}, expected one of {list(CHORD_TOLERANCE_PRESETS)}")
+        return CHORD_TOLERANCE_PRESETS[tolerance]
+    if tolerance <= 0:
+        raise ValueError(f"Chord tolerance must be positive, got {tolerance}")
+    return tolerance
+
+def arcSegments(sweep, radius, tolerance=DEFAULT_CHORD_TOLERANCE):
+    # fewest equal steps over sweep degrees that keep the chord deviation within tolerance
+    tolerance = chordTolerance(tolerance)
+    if radius <= tolerance:
+        return 1
+    maxStep = math.degrees(2 * math.acos(1 - tolerance / radius))
+    return max(1, math.ceil(abs(sweep) / maxStep - 1e-9))
+
+def arcAngles(startAngle, endAngle, radius, tolerance=DEFAULT_CHORD_TOLERANCE):
+    # bearings of every vertex, both ends included
+    return np.linspace(startAngle, endAngle, arcSegments(endAngle - startAngle, radius, tolerance) + 1)
+
+def circleAngles(radius, tolerance=DEFAULT_CHORD_TOLERANCE):
+    # bearings of a closed ring, last one is 360 so the ring ends where it starts
+    return np.linspace(0, 360, max(MIN_CIRCLE_SEGMENTS, arcSegments(360, radius, tolerance)) + 1)
+
+
+"""
+Map is generated in the local feet frame (see coordinates.py). By default renderMap converts every point 
+to lat/lon before calling renderer functions, so geo renderers (kml) keep working as before.
+Renderers that work in feet should pass frame=FRAME_FEET and skip the geodesic conversion completely.
+"""
+FRAME_GEO = 'geo'
+FRAME_FEET = 'feet'
+
+"""
+Display list: renderMap doesn't call generators directly, it records everything they emit once per layout into
+a DisplayList - typed primitives in numpy arrays - and replays it into the renderer callbacks.
+Rendering kml, svg and Fusion from the same process costs one geometry computation, the rest are cached replays.
+For FRAME_GEO all points are converted to lat/lon in one batch call when the list is built.
+
+Every primitive is a row of values, columns depend on the kind:
+    PRIMITIVE_ARCH: startAngle, endAngle, radius, center x, center y - clockwise, counterclockwise when endAngle < startAngle
+    PRIMITIVE_LINE, PRIMITIVE_FENCE_LINE: start x, start y, end x, end y
+    PRIMITIVE_CIRCLE, PRIMITIVE_MAN, PRIMITIVE_TEMPLE, PRIMITIVE_AIRPORT: x, y, width
+    PRIMITIVE_HOUR_LABEL: hour, minute, x, y, rotation
+x, y are feet east/north of the Golden Stake, or lat, lon for FRAME_GEO.
+"""
+PRIMITIVE_ARCH = 0
+PRIMITIVE_LINE = 1
+PRIMITIVE_FENCE_LINE = 2
+PRIMITIVE_CIRCLE = 3
+PRIMITIVE_MAN = 4
+PRIMITIVE_TEMPLE = 5
+PRIMITIVE_AIRPORT = 6
+PRIMITIVE_HOUR_LABEL = 7
+
+PRIMITIVE_VALUES = 5
+# (x, y) column pairs of every kind, converted for FRAME_GEO
+PRIMITIVE_POINT_COLUMNS = {
+    PRIMITIVE_ARCH: ((3, 4),),
+    PRIMITIVE_LINE: ((0, 1), (2, 3)),
+    PRIMITIVE_FENCE_LINE: ((0, 1), (2, 3)),
+    PRIMITIVE_CIRCLE: ((0, 1),),
+    PRIMITIVE_MAN: ((0, 1),),
+    PRIMITIVE_TEMPLE: ((0, 1),),
+    PRIMITIVE_AIRPORT: ((0, 1),),
+    PRIMITIVE_HOUR_LABEL: ((2, 3),),
+}
+
+# layers in the order renderMap draws them
+LAYER_LETTER_STREETS = 'letter streets'
+LAYER_RADIAL_STREETS = 'radial streets'
+LAYER_PLAZAS = 'plazas'
+LAYER_CENTER_CAMP = 'center camp'
+LAYER_PROMENADES = 'promenades'
+LAYER_MAN_AND_TEMPLE = 'man and temple'
+LAYER_AIRPORT = 'airport'
+LAYER_TRASH_FENCE = 'trash fence'
+LAYER_HOUR_LABELS = 'hour labels'
+MAP_LAYERS = (LAYER_LETTER_STREETS, LAYER_RADIAL_STREETS, LAYER_PLAZAS, LAYER_CENTER_CAMP, LAYER_PROMENADES,
+              LAYER_MAN_AND_TEMPLE, LAYER_AIRPORT, LAYER_TRASH_FENCE, LAYER_HOUR_LABELS)
+
+DISPLAY_LIST_CACHE_SIZE = 64
+
+# kinds: int8 (N,), values: float (N, PRIMITIVE_VALUES), names and layers: int (N,) indexes into nameTable and MAP_LAYERS
+DisplayList = namedtuple('DisplayList', ['kinds', 'values', 'names', 'layers', 'nameTable', 'frame'])
+# one primitive, as iterMapPrimitives yields it: values is a list laid out as described above
+Primitive = namedtuple('Primitive', ['kind', 'layer', 'name', 'values'])
+
+def renderLayer(layer, addArch, addLine, addFenceLine, addCircle, addMan, addTemple, addHourLabel, addAirport, extendRadialNamesByBlocks, layout):
+    # calls generators of one layer, all points are in feet
+    if layer == LAYER_LETTER_STREETS:
+        generateLetterStreets(addArch, layout)
+    elif layer == LAYER_RADIAL_STREETS:
+        generateRadialStreets(addLine, layout)
+    elif layer == LAYER_PLAZAS:
+        generatePlazas(addCircle, layout)
+    elif layer == LAYER_CENTER_CAMP:
+        generateCenterCamp(addLine, addArch, addCircle, layout)
+    elif layer == LAYER_PROMENADES:
+        renderPromenades(addLine, layout)
+    elif layer == LAYER_MAN_AND_TEMPLE:
+        renderManAndTemple(addMan, addTemple, layout)
+    elif layer == LAYER_AIRPORT:
+        renderAirport(addAirport, layout)
+    elif layer == LAYER_TRASH_FENCE:
+        renderTrashFence(addFenceLine, layout)
+    elif layer == LAYER_HOUR_LABELS:
+        generateRadialStreetNames(addHourLabel, extendRadialNamesByBlocks * layout.depthAtoIInFeet, layout)
+    else:
+        raise ValueError(f"Unknown layer: {layer}")
+
+def recordPrimitives(draw):
+    # calls draw(addArch, addLine, addFenceLine, addCircle, addMan, addTemple, addHourLabel, addAirport)
+    # and returns what it emitted as (kinds, values, names) python lists
+    kinds, values, names = [], [], []
+
+    def add(kind, row, name):
+        kinds.append(kind)
+        values.append(row + [0] * (PRIMITIVE_VALUES - len(row)))
+        names.append(name)
+    def addArch(startAngle, endAngle, archRadius, center, name):
+        add(PRIMITIVE_ARCH, [startAngle, endAngle, archRadius, center[0], center[1]], name)
+    def lineRecorder(kind):
+        return lambda start, end, name: add(kind, [start[0], start[1], end[0], end[1]], name)
+    def shapeRecorder(kind):
+        return lambda location, width, name: add(kind, [location[0], location[1], width], name)
+    def addHourLabel(hour, minute, location, rotation):
+        add(PRIMITIVE_HOUR_LABEL, [hour, minute, location[0], location[1], rotation], '')
+
+    draw(addArch, lineRecorder(PRIMITIVE_LINE), lineRecorder(PRIMITIVE_FENCE_LINE), shapeRecorder(PRIMITIVE_CIRCLE),
+         shapeRecorder(PRIMITIVE_MAN), shapeRecorder(PRIMITIVE_TEMPLE), addHourLabel, shapeRecorder(PRIMITIVE_AIRPORT))
+    return kinds, values, names
+
+def recordLayers(layers, extendRadialNamesByBlocks, layout):
+    # runs generators of the layers and returns (kinds, values, names, layer indexes) as python lists
+    kinds, values, names, layerIndexes = [], [], [], []
+    for layer in layers:
+        layerKinds, layerValues, layerNames = recordPrimitives(
+            lambda *callbacks: renderLayer(layer, *callbacks, extendRadialNamesByBlocks, layout))
+        kinds += layerKinds
+        values += layerValues
+        names += layerNames
+        layerIndexes += [MAP_LAYERS.index(layer)] * len(layerKinds)
+    return kinds, values, names, layerIndexes
+
+def pointsToGeo(kinds, values, layout):
+    # converts every (x, y) column pair of the primitives to (lat, lon) with one batch call, in place
+    columns = [(row, x, y) for row, kind in enumerate(kinds) for x, y in PRIMITIVE_POINT_COLUMNS[kind]]
+    if not columns:
+        return
+    rows, xs, ys = (np.array(column) for column in zip(*columns))
+    coordinates = feetToCoordinateBatch(np.column_stack((values[rows, xs], values[rows, ys])), layout)
+    values[rows, xs] = coordinates[:, 0]
+    values[rows, ys] = coordinates[:, 1]
+
+def makeDisplayList(kinds, values, names, layerIndexes, frame, layout):
+    nameTable = list(dict.fromkeys(names))
+    nameIndex = {name: index for index, name in enumerate(nameTable)}
+    values = np.array(values, dtype=float).reshape(-1, PRIMITIVE_VALUES)
+    if frame == FRAME_GEO:
+        pointsToGeo(kinds, values, layout)
+    displayList = DisplayList(np.array(kinds, dtype=np.int8), values,
+                              np.array([nameIndex[name] for name in names], dtype=np.int32),
+                              np.array(layerIndexes, dtype=np.int8), tuple(nameTable), frame)
+    for array in displayList[:4]:
+        array.flags.writeable = False # shared through the cache
+    return displayList
+
+def selectLayers(layers=None, excludeLayers=None):
+    # requested layers in the MAP_LAYERS order, all of them by default
+    for layer in tuple(layers or ()) + tuple(excludeLayers or ()):
+        if layer not in MAP_LAYERS:
+            raise ValueError(f"Unknown layer: {layer}, expected one of {list(MAP_LAYERS)}")
+    return tuple(layer for layer in MAP_LAYERS
+                 if (layers is None or layer in layers) and (excludeLayers is None or layer not in excludeLayers))
+
+def concatDisplayLists(displayLists, frame):
+    if not displayLists:
+        return makeDisplayList([], [], [], [], frame, None)
+    nameTable = list(dict.fromkeys(name for displayList in displayLists for name in displayList.nameTable))
+    nameIndex = {name: index for index, name in enumerate(nameTable)}
+    names = [np.array([nameIndex[name] for name in displayList.nameTable], dtype=np.int32)[displayList.names]
+             for displayList in displayLists]
+    displayList = DisplayList(np.concatenate([displayList.kinds for displayList in displayLists]),
+                              np.concatenate([displayList.values for displayList in displayLists]).reshape(-1, PRIMITIVE_VALUES),
+                              np.concatenate(names).astype(np.int32),
+                              np.concatenate([displayList.layers for displayList in displayLists]),
+                              tuple(nameTable), frame)
+    for array in displayList[:4]:
+        array.flags.writeable = False
+    return displayList
+
+@functools.lru_cache(maxsize=DISPLAY_LIST_CACHE_SIZE)
+def cachedDisplayList(layout, backend, extendRadialNamesByBlocks, frame, layers):
+    # backend is only part of the key: fence and airport are converted from lat/lon, geo lists are converted to lat/lon.
+    # Every layer is computed and cached on its own, lists of several layers are concatenated from them
+    if len(layers) != 1:
+        return concatDisplayLists([cachedDisplayList(layout, backend, extendRadialNamesByBlocks, frame, (layer,)) for layer in layers], frame)
+    if frame == FRAME_GEO:
+        feet = cachedDisplayList(layout, backend, extendRadialNamesByBlocks, FRAME_FEET, layers)
+        return makeDisplayList(feet.kinds.tolist(), feet.values.copy(), [feet.nameTable[name] for name in feet.names],
+                               feet.layers.tolist(), frame, layout)
+    return makeDisplayList(*recordLayers(layers, extendRadialNamesByBlocks, layout), frame, layout)
+
+def buildDisplayList(extendRadialNamesByBlocks=0, frame=FRAME_GEO, layout=None, layers=None, excludeLayers=None):
+    # cached per layout, geodesic backend, label offset, frame and layers - don't modify the arrays.
+    # Only requested layers are computed
+    if frame not in (FRAME_GEO, FRAME_FEET):
+        raise ValueError(f"Unknown frame: {frame}")
+    return cachedDisplayList(layout or DEFAULT_LAYOUT, geodesicBackend, extendRadialNamesByBlocks, frame, selectLayers(layers, excludeLayers))
+
+def displayListCacheInfo():
+    return cachedDisplayList.cache_info()
+
+def iterDisplayList(displayList):
+    nameTable = displayList.nameTable
+    for kind, layer, name, row in zip(displayList.kinds.tolist(), displayList.layers.tolist(), displayList.names.tolist(), displayList.values.tolist()):
+        yield Primitive(kind, MAP_LAYERS[layer], nameTable[name], row)
+
+def iterMapPrimitives(layers=None, excludeLayers=None, extendRadialNamesByBlocks=0, frame=FRAME_GEO, layout=None):
+    """
+    Generator form of renderMap: yields Primitive(kind, layer, name, values) one layer at a time.
+    A layer is computed only when the iteration gets to it, and layers that are not requested are never computed:
+        for primitive in iterMapPrimitives(layers=[LAYER_TRASH_FENCE, LAYER_PLAZAS]):
+            output.write(...)
+    Feed primitives to renderer functions with replayPrimitives
+    """
+    for layer in selectLayers(layers, excludeLayers):
+        yield from iterDisplayList(buildDisplayList(extendRadialNamesByBlocks, frame, layout, layers=(layer,)))
+
+def replayPrimitives(primitives, addArch, addLine, addFenceLine, addCircle, addMan, addTemple, addHourLabel = None, addAirport = None):
+    # calls renderer functions for every primitive, in order. Missing optional callbacks skip their primitives
+    shapes = {PRIMITIVE_CIRCLE: addCircle, PRIMITIVE_MAN: addMan, PRIMITIVE_TEMPLE: addTemple, PRIMITIVE_AIRPORT: addAirport}
+    lines = {PRIMITIVE_LINE: addLine, PRIMITIVE_FENCE_LINE: addFenceLine}
+    for kind, layer, name, row in primitives:
+        if kind == PRIMITIVE_ARCH:
+            addArch(row[0], row[1], row[2], [row[3], row[4]], name)
+        elif kind in lines:
+            lines[kind]([row[0], row[1]], [row[2], row[3]], name)
+        elif kind == PRIMITIVE_HOUR_LABEL:
+            if addHourLabel is not None:
+                addHourLabel(int(row[0]), int(row[1]), [row[2], row[3]], row[4])
+        elif shapes[kind] is not None:
+            shapes[kind]([row[0], row[1]], row[2], name)
+
+def replayDisplayList(displayList, addArch, addLine, addFenceLine, addCircle, addMan, addTemple, addHourLabel = None, addAirport = None):
+    replayPrimitives(iterDisplayList(displayList), addArch, addLine, addFenceLine, addCircle, addMan, addTemple, addHourLabel, addAirport)
+
+def renderMap(addArch, addLine, addFenceLine, addCircle, addMan, addTemple, addHourLabel = None, addAirport = None, extendRadialNamesByBlocks = 0, frame = FRAME_GEO, layout = None,
+              layers = None, excludeLayers = None):
     """ Missing elements:
     Portals
     Airport
     Greeters
+
+    layout is a CityLayout (see layoutForYear), DEFAULT_LAYOUT when not given.
+    layers/excludeLayers pick what to draw from MAP_LAYERS, everything by default.
+    Geometry is computed once per layout and cached, see buildDisplayList
     """
-    generateLetterStreets(addArch)
-    generateRadialStreets(addLine)
-    generatePlazas(addCircle)
-    generateCenterCamp(addLine, addArch, addCircle)
-    renderPromenades(addLine)
-    renderManAndTemple(addMan,addTemple) 
-    if not addAirport is None:
-        renderAirport(addAirport)
-    renderTrashFence(addFenceLine)
-    if not addHourLabel is None:
-        generateRadialStreetNames(addHourLabel, extendRadialNamesByBlocks * depthAtoIInFeet)
-   
\ No newline at end of file
+    # no need to compute what can't be drawn
+    excludeLayers = tuple(excludeLayers or ()) + ((LAYER_HOUR_LABELS,) if addHourLabel is None else ()) \
+        + ((LAYER_AIRPORT,) if addAirport is None else ())
+    replayDisplayList(buildDisplayList(extendRadialNamesByBlocks, frame, layout, layers, excludeLayers),
+                      addArch, addLine, addFenceLine, addCircle, addMan, addTemple, addHourLabel, addAirport)
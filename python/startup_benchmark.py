@@ -0,0 +1,60 @@
+"""
+Cold start benchmark: every scenario runs in a fresh python process, the way short-lived geocoding jobs do
+
+Times are wall clock of the whole process minus an empty interpreter start, best and median of --repeat runs.
+Exits with 1 if the median of any scenario is over its budget, so it can run in CI.
+
+usage: python startup_benchmark.py --repeat 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+LOCATION = {"string": "4:30 & E", "frontage": "4:30", "intersection": "E", "intersection_type": "&",
+            "dimensions": "50 x 100", "exact_location": "Corner - facing man & 2:00"}
+
+# name -> (code, budget in seconds on top of the interpreter start)
+SCENARIOS = {
+    "import coordinates": ("import coordinates", 0.2),
+    "import map": ("import map", 0.2),
+    "import kml_map": ("import kml_map", 0.25),
+    "import svg_map": ("import svg_map", 0.2),
+    "geocode one location": (f"import coordinates; coordinates.locationObjectToCoordinate({LOCATION!r})", 0.3),
+    "geocode batch": (f"import coordinates; coordinates.locationObjectsToCoordinates([{LOCATION!r}] * 1000)", 0.2),
+}
+
+def runOnce(code):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    return time.perf_counter() - start
+
+def measure(code, repeat):
+    runOnce(code) # warm up the OS file cache and .pyc files
+    return [runOnce(code) for _ in range(repeat)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold start of the library in fresh processes")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="runs per scenario")
+    args = parser.parse_args()
+
+    interpreter = statistics.median(measure("pass", args.repeat))
+    print(f"interpreter start {interpreter * 1000:.0f} ms, not included below\n")
+    print(f"{'scenario':>22} {'best ms':>9} {'median ms':>10} {'budget ms':>10}")
+
+    overBudget = []
+    for name, (code, budget) in SCENARIOS.items():
+        times = [runTime - interpreter for runTime in measure(code, args.repeat)]
+        median = statistics.median(times)
+        print(f"{name:>22} {min(times) * 1000:>9.0f} {median * 1000:>10.0f} {budget * 1000:>10.0f}" + ("  OVER" if median > budget else ""))
+        if median > budget:
+            overBudget.append(name)
+
+    if overBudget:
+        print(f"\nover budget: {', '.join(overBudget)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,215 +1,441 @@
 import math
-from map import renderMap, GOLDEN_STAKE, YEAR
-from geopy.distance import geodesic
+import functools
+import hashlib
+import itertools
+import re
+from collections import namedtuple
+from map import renderMap, replayDisplayList, replayPrimitives, iterDisplayList, FRAME_FEET, DEFAULT_LAYOUT, \
+    PRIMITIVE_LINE, PRIMITIVE_FENCE_LINE, PRIMITIVE_MAN, PRIMITIVE_TEMPLE, PRIMITIVE_AIRPORT
+import numpy as np
 import os
 import xml.etree.ElementTree as ET
 
 STROKE_COLOR = "black"
 SVG_ANGLE_TURN = -90
 SVG_FEET_PER_PIXEL = 10
+SVG_PRECISION = 2 # decimals of a pixel kept by SvgStreamWriter
 
 LOWER_NUMBERS_FOLLOW_CLOCK = False
 HOUR_FONT_SIZE = "24px"
 HOUR_FONT = "Reef"
 
-# SVG generation
-svg_groups = {}
-element_counters = {"arch": {}, "line": {}, "circle": {}, 'icon': {}}
-max_distance = 0
+SVG_NAMESPACE = "http://www.w3.org/2000/svg"
+XLINK_NAMESPACE = "http://www.w3.org/1999/xlink"
 
+ROMAN_NUMERALS = ["I", "II", "III", "IV", "V", "VI", "VII", "VIII", "IX", "X", "XI", "XII"]
 
-def sanitize_name(name):
-    return name.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace('"', "&quot;").replace("'", "&apos;")
-
-
-def convertGeoToXY(coordinates):
-    distance = geodesic(GOLDEN_STAKE, coordinates).feet
-    bearing = calculate_bearing(GOLDEN_STAKE, coordinates)
-    angle = bearing + SVG_ANGLE_TURN
-    angleRad = math.radians(angle)
-    x = distance * math.cos(angleRad) / SVG_FEET_PER_PIXEL
-    y = distance * math.sin(angleRad) / SVG_FEET_PER_PIXEL
-    return x, y
-
-
-def addSVGArch(startAngle, endAngle, archRadius, center, name):
-    x, y = convertGeoToXY(center)
-    name = sanitize_name(name)
-    if name not in element_counters["arch"]:
-        element_counters["arch"][name] = 0
-    element_id = f"{name} arch_{element_counters['arch'][name]}"
-    element_counters["arch"][name] += 1
-    
-    startAngleRad = math.radians(startAngle + SVG_ANGLE_TURN)
-    endAngleRad = math.radians(endAngle + SVG_ANGLE_TURN)
-    
-    startX = x + archRadius * math.cos(startAngleRad) / SVG_FEET_PER_PIXEL
-    startY = y + archRadius * math.sin(startAngleRad) / SVG_FEET_PER_PIXEL
-    endX = x + archRadius * math.cos(endAngleRad) / SVG_FEET_PER_PIXEL
-    endY = y + archRadius * math.sin(endAngleRad) / SVG_FEET_PER_PIXEL
-    
-    large_arc_flag = 1 if endAngle - startAngle > 180 else 0
-    
-    path = '<path id="{}" d="M {} {} A {} {} 0 {} 1 {} {}" fill="none" stroke="{}" />'.format(
-        element_id, startX, startY, archRadius / SVG_FEET_PER_PIXEL, archRadius / SVG_FEET_PER_PIXEL, large_arc_flag, endX, endY, STROKE_COLOR)
-    
-    if name not in svg_groups:
-        svg_groups[name] = []
-    svg_groups[name].append(path)
-
-def addSVGLine(startCoordinates, endCoordinates, name):
-    global max_distance
-
-    name = sanitize_name(name)
-    if name not in element_counters["line"]:
-        element_counters["line"][name] = 0
-    element_id = f"{name} line_{element_counters['line'][name]}"
-    element_counters["line"][name] += 1
-    
-    startX, startY = convertGeoToXY(startCoordinates)
-    endX, endY = convertGeoToXY(endCoordinates)
-    
-    line = '<line id="{}" x1="{}" y1="{}" x2="{}" y2="{}" stroke="{}" />'.format(element_id, startX, startY, endX, endY, STROKE_COLOR)
-    
-    if name not in svg_groups:
-        svg_groups[name] = []
-    svg_groups[name].append(line)
-
-    # Update max_distance
-    max_distance = max(max_distance, abs(startX), abs(startY), abs(endX), abs(endY))
-
-def calculate_bearing(pointA, pointB):
-    lat1 = math.radians(pointA[0])
-    lat2 = math.radians(pointB[0])
-    diffLong = math.radians(pointB[1] - pointA[1])
-    x = math.sin(diffLong) * math.cos(lat2)
-    y = math.cos(lat1) * math.sin(lat2) - (math.sin(lat1) * math.cos(lat2) * math.cos(diffLong))
-    initial_bearing = math.atan2(x, y)
-    initial_bearing = math.degrees(initial_bearing)
-    compass_bearing = (initial_bearing + 360) % 360
-    return compass_bearing
-
-def addSVGCircle(location, width, name):
-    name = sanitize_name(name)
-    if name not in element_counters["circle"]:
-        element_counters["circle"][name] = 0
-    element_id = f"{name} circle_{element_counters['circle'][name]}"
-    element_counters["circle"][name] += 1
-    
-    x, y = convertGeoToXY(location)
-    radius = width / (2 * SVG_FEET_PER_PIXEL)
-    
-    circle = '<circle id="{}" cx="{}" cy="{}" r="{}" fill="none" stroke="{}" />'.format(element_id, x, y, radius, STROKE_COLOR)
-    
-    if name not in svg_groups:
-        svg_groups[name] = []
-    svg_groups[name].append(circle)
-
-def addSVGIcon(filename, centerX, centerY, width, name, rotation=0):
-    name = sanitize_name(name)
-    if name not in element_counters["icon"]:
-        element_counters["icon"][name] = 0
-    element_id = f"{name}_icon_{element_counters['icon'][name]}"
-    element_counters["icon"][name] += 1
-
-    # Parse the SVG file
-    tree = ET.parse(filename)
-    root = tree.getroot()
-
-    # Get the width and height from the SVG file
-    svg_width = float(root.attrib.get('width', '0').replace('px', ''))
-    svg_height = float(root.attrib.get('height', '0').replace('px', ''))
-
-    # Get the viewBox and use it for scaling if available
-    viewBox = root.attrib.get('viewBox', None)
-    if viewBox:
-        min_x, min_y, vb_width, vb_height = map(float, viewBox.split())
-        scale_factor = width / vb_width
-        translate_x = -min_x - vb_width / 2
-        translate_y = -min_y - vb_height / 2
-    else:
-        scale_factor = width / svg_width
-        translate_x = -svg_width / 2
-        translate_y = -svg_height / 2
+# icons of the shapes that have one, a circle is drawn when the file is missing
+ICON_FILES = {PRIMITIVE_MAN: 'man.svg', PRIMITIVE_TEMPLE: 'temple.svg', PRIMITIVE_AIRPORT: 'airport.svg'}
 
-    # Create a group element to wrap the icon
-    group = ET.Element('g', id=element_id, transform=f"translate({centerX}, {centerY}) scale({scale_factor}) rotate({rotation}) translate({translate_x}, {translate_y})")
 
-    # Add the SVG content to the group
-    for element in root:
-        group.append(element)
+def sanitize_name(name):
+    return name.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace('"', "&quot;").replace("'", "&apos;")
 
-    # Convert the group element to a string
-    svg_group_str = ET.tostring(group, encoding='unicode')
 
-    # Add the group to svg_groups
-    if name not in svg_groups:
-        svg_groups[name] = []
-    svg_groups[name].append(svg_group_str)
+# icon file parsed into a <symbol>, placed with <use>
+IconSymbol = namedtuple('IconSymbol', ['id', 'viewBox', 'markup'])
 
-def addMan(location, width, name):
-    x, y = convertGeoToXY(location)
-    if os.path.isfile('man.svg'):
-        addSVGIcon('man.svg', x, y, width / SVG_FEET_PER_PIXEL, name, rotation=0)
-    else:
-        addSVGCircle(location, width, name)
+def stripEditorData(element):
+    # drops inkscape/sodipodi attributes, they would need their own namespaces in the map,
+    # svg tags lose their namespace, the map svg already declares it
+    element.tag = element.tag.replace(f'{{{SVG_NAMESPACE}}}', '')
+    for key in [key for key in element.attrib if key.startswith('{') and not key.startswith(f'{{{XLINK_NAMESPACE}}}')]:
+        del element.attrib[key]
+    for child in element:
+        stripEditorData(child)
+    return element
 
-def addTemple(location, width, name):
-    x, y = convertGeoToXY(location)
-    if os.path.isfile('temple.svg'):
-        addSVGIcon('temple.svg', x, y, width / SVG_FEET_PER_PIXEL, name, rotation=0)
-    else:
-        addSVGCircle(location, width, name)
+def iconSymbol(filename):
+    # parses an icon file once per process, every renderer shares the result
+    return cachedIconSymbol(os.path.abspath(filename))
 
-def addAirport(location, width, name):
-    x, y = convertGeoToXY(location)
-    if os.path.isfile('airport.svg'):
-        addSVGIcon('airport.svg', x, y, width / SVG_FEET_PER_PIXEL, name, rotation=0)
+@functools.lru_cache(maxsize=None)
+def cachedIconSymbol(path):
+    # path is absolute, so one file reached by two spellings is parsed once and gets one id
+    root = ET.parse(path).getroot()
+    viewBox = root.attrib.get('viewBox', None)
+    if viewBox:
+        viewBox = tuple(float(value) for value in viewBox.replace(',', ' ').split())
     else:
-        addSVGCircle(location, width, name)
+        viewBox = (0.0, 0.0, float(root.attrib.get('width', '0').replace('px', '')), float(root.attrib.get('height', '0').replace('px', '')))
 
-def addHourLabel(hour, minute, location, bearing):
-    if minute > 0:
-        return
-
-    roman_numerals = ["I", "II", "III", "IV", "V", "VI", "VII", "VIII", "IX", "X", "XI", "XII"]
-    text = roman_numerals[hour - 1]  # Adjusting for hours starting at 1
-
-    x, y = convertGeoToXY(location)
-
-    if not LOWER_NUMBERS_FOLLOW_CLOCK and 90 < bearing < 270:
-        bearing += 180
-
-    # Create the SVG text element
-    text_element = f'''
-    <text x="{x}" y="{y}" transform="rotate({bearing}, {x}, {y})" text-anchor="middle" fill="{STROKE_COLOR}" font-size="{HOUR_FONT_SIZE}" font-family="{HOUR_FONT}">
+    # file name for readability, hash of the whole path so icons with the same name in different directories don't collide
+    pathHash = hashlib.sha1(path.encode()).hexdigest()[:8]
+    symbol_id = "icon_" + re.sub(r'\W', '_', os.path.splitext(os.path.basename(path))[0]) + "_" + pathHash
+    symbol = ET.Element('symbol', id=symbol_id, viewBox=" ".join(f"{value:g}" for value in viewBox))
+    for element in root:
+        if element.tag.startswith(f'{{{SVG_NAMESPACE}}}'): # sodipodi:namedview and such are editor only
+            symbol.append(stripEditorData(element))
+    return IconSymbol(symbol_id, viewBox, ET.tostring(symbol, encoding='unicode'))
+
+
+class SvgRenderer:
+    """
+    One svg render: keeps its own groups, counters and options, so any number of renders
+    (different scales, mirrored, other years) can run side by side, also from a thread pool:
+        renderer = SvgRenderer(feetPerPixel=5, mirrorX=True)
+        renderMap(*renderer.callbacks(), 1.5, frame=FRAME_FEET)
+        renderer.save("map.svg")
+    """
+    def __init__(self, feetPerPixel=SVG_FEET_PER_PIXEL, strokeColor=STROKE_COLOR, mirrorX=False, flipY=False, fenceScale=1,
+                 lowerNumbersFollowClock=LOWER_NUMBERS_FOLLOW_CLOCK, hourFontSize=HOUR_FONT_SIZE, hourFont=HOUR_FONT):
+        self.feetPerPixel = feetPerPixel
+        self.strokeColor = strokeColor
+        self.mirrorX = mirrorX # flips the map left to right
+        self.flipY = flipY # flips the map top to bottom
+        self.fenceScale = fenceScale # trash fence is scaled around the Golden Stake, same as lid_fence_scale in the Fusion plugin
+        self.lowerNumbersFollowClock = lowerNumbersFollowClock
+        self.hourFontSize = hourFontSize
+        self.hourFont = hourFont
+
+        self.svg_groups = {}
+        self.symbols = {} # icon file -> IconSymbol, each one goes to <defs> once
+        self.element_counters = {"arch": {}, "line": {}, "circle": {}, 'icon': {}}
+        self.max_distance = 0
+
+    # map is rendered in the local feet frame (x east, y north), svg has y pointing down
+    def convertFeetToXY(self, point):
+        x = -point[0] if self.mirrorX else point[0]
+        y = point[1] if self.flipY else -point[1]
+        return x / self.feetPerPixel, y / self.feetPerPixel
+
+    def convertBearing(self, bearing):
+        # where a bearing points after mirroring and flipping
+        if self.mirrorX:
+            bearing = -bearing
+        if self.flipY:
+            bearing = 180 - bearing
+        return bearing
+
+    def nextElementId(self, kind, name, separator=" "):
+        counters = self.element_counters[kind]
+        if name not in counters:
+            counters[name] = 0
+        element_id = f"{name}{separator}{kind}_{counters[name]}"
+        counters[name] += 1
+        return element_id
+
+    def addElement(self, name, element):
+        if name not in self.svg_groups:
+            self.svg_groups[name] = []
+        self.svg_groups[name].append(element)
+
+    def archEndpoints(self, startAngle, endAngle, archRadius, center):
+        # (startX, startY, endX, endY, large_arc_flag, sweep_flag), the arch starts at startAngle even when it is
+        # reversed (endAngle < startAngle, see toolpath.py), the direction is in the sweep flag
+        x, y = self.convertFeetToXY(center)
+        large_arc_flag = 1 if abs(endAngle - startAngle) > 180 else 0
+        sweep_flag = 1 if endAngle >= startAngle else 0 # clockwise on the map is clockwise on the svg
+        if self.mirrorX != self.flipY: # a single reflection makes the arch go the other way around
+            sweep_flag = 1 - sweep_flag
+        if self.mirrorX or self.flipY:
+            startAngle, endAngle = self.convertBearing(startAngle), self.convertBearing(endAngle)
+
+        startAngleRad = math.radians(startAngle + SVG_ANGLE_TURN)
+        endAngleRad = math.radians(endAngle + SVG_ANGLE_TURN)
+
+        startX = x + archRadius * math.cos(startAngleRad) / self.feetPerPixel
+        startY = y + archRadius * math.sin(startAngleRad) / self.feetPerPixel
+        endX = x + archRadius * math.cos(endAngleRad) / self.feetPerPixel
+        endY = y + archRadius * math.sin(endAngleRad) / self.feetPerPixel
+        return startX, startY, endX, endY, large_arc_flag, sweep_flag
+
+    def addArch(self, startAngle, endAngle, archRadius, center, name):
+        name = sanitize_name(name)
+        element_id = self.nextElementId("arch", name)
+        startX, startY, endX, endY, large_arc_flag, sweep_flag = self.archEndpoints(startAngle, endAngle, archRadius, center)
+
+        path = '<path id="{}" d="M {} {} A {} {} 0 {} {} {} {}" fill="none" stroke="{}" />'.format(
+            element_id, startX, startY, archRadius / self.feetPerPixel, archRadius / self.feetPerPixel, large_arc_flag, sweep_flag, endX, endY, self.strokeColor)
+        self.addElement(name, path)
+
+    def addLine(self, startCoordinates, endCoordinates, name):
+        name = sanitize_name(name)
+        element_id = self.nextElementId("line", name)
+
+        startX, startY = self.convertFeetToXY(startCoordinates)
+        endX, endY = self.convertFeetToXY(endCoordinates)
+
+        line = '<line id="{}" x1="{}" y1="{}" x2="{}" y2="{}" stroke="{}" />'.format(element_id, startX, startY, endX, endY, self.strokeColor)
+        self.addElement(name, line)
+
+        # Update max_distance
+        self.max_distance = max(self.max_distance, abs(startX), abs(startY), abs(endX), abs(endY))
+
+    def addCircle(self, location, width, name):
+        name = sanitize_name(name)
+        element_id = self.nextElementId("circle", name)
+
+        x, y = self.convertFeetToXY(location)
+        radius = width / (2 * self.feetPerPixel)
+
+        circle = '<circle id="{}" cx="{}" cy="{}" r="{}" fill="none" stroke="{}" />'.format(element_id, x, y, radius, self.strokeColor)
+        self.addElement(name, circle)
+
+    def addIcon(self, filename, centerX, centerY, width, name, rotation=0):
+        name = sanitize_name(name)
+        element_id = self.nextElementId("icon", name, "_")
+
+        symbol = iconSymbol(filename)
+        self.symbols[filename] = symbol
+
+        # icon is scaled to width and centered, same as the viewBox of the icon file
+        min_x, min_y, vb_width, vb_height = symbol.viewBox
+        height = width * vb_height / vb_width
+        transform = f' transform="rotate({rotation}, {centerX}, {centerY})"' if rotation else ''
+        use = f'<use id="{element_id}" xlink:href="#{symbol.id}" x="{centerX - width / 2}" y="{centerY - height / 2}" width="{width}" height="{height}"{transform} />'
+        self.addElement(name, use)
+
+    def addIconOrCircle(self, filename, location, width, name):
+        x, y = self.convertFeetToXY(location)
+        if os.path.isfile(filename):
+            self.addIcon(filename, x, y, width / self.feetPerPixel, name, rotation=0)
+        else:
+            self.addCircle(location, width, name)
+
+    def addMan(self, location, width, name):
+        self.addIconOrCircle(ICON_FILES[PRIMITIVE_MAN], location, width, name)
+
+    def addTemple(self, location, width, name):
+        self.addIconOrCircle(ICON_FILES[PRIMITIVE_TEMPLE], location, width, name)
+
+    def addAirport(self, location, width, name):
+        self.addIconOrCircle(ICON_FILES[PRIMITIVE_AIRPORT], location, width, name)
+
+    def hourLabel(self, hour, minute, location, bearing):
+        # (text, x, y, rotation) of a label, None between full hours
+        if minute > 0:
+            return None
+
+        text = ROMAN_NUMERALS[hour - 1]  # Adjusting for hours starting at 1
+
+        x, y = self.convertFeetToXY(location)
+        if self.mirrorX or self.flipY:
+            bearing = self.convertBearing(bearing) % 360
+
+        if not self.lowerNumbersFollowClock and 90 < bearing < 270:
+            bearing += 180
+        return text, x, y, bearing
+
+    def addHourLabel(self, hour, minute, location, bearing):
+        label = self.hourLabel(hour, minute, location, bearing)
+        if label is None:
+            return
+        text, x, y, bearing = label
+
+        # Create the SVG text element
+        text_element = f'''
+    <text x="{x}" y="{y}" transform="rotate({bearing}, {x}, {y})" text-anchor="middle" fill="{self.strokeColor}" font-size="{self.hourFontSize}" font-family="{self.hourFont}">
         {text}
     </text>
     '''
-
-    if "hour_labels" not in svg_groups:
-        svg_groups["hour_labels"] = []
-    svg_groups["hour_labels"].append(text_element)
-
-
-
-renderMap(addSVGArch, addSVGLine, addSVGLine, addSVGCircle, addMan, addTemple, addHourLabel, addAirport, 1.5)
-
-# Generate the SVG content
-svg_group_elements = []
-for name, paths in svg_groups.items():
-    group = '<g id="{}">\n{}\n</g>'.format(name, "\n  ".join(paths))
-    svg_group_elements.append(group)
-
-# Set the viewBox size based on the maximum distance
-viewBox_size = max_distance * 2
-
-svg_content = '''
-<svg xmlns="http://www.w3.org/2000/svg" viewBox="-{0} -{0} {1} {1}" width="{1}" height="{1}">
+        self.addElement("hour_labels", text_element)
+
+    def addFenceLine(self, startCoordinates, endCoordinates, name):
+        if self.fenceScale != 1:
+            startCoordinates = [value * self.fenceScale for value in startCoordinates]
+            endCoordinates = [value * self.fenceScale for value in endCoordinates]
+        self.addLine(startCoordinates, endCoordinates, name)
+
+    def callbacks(self):
+        # renderer functions in renderMap argument order
+        return (self.addArch, self.addLine, self.addFenceLine, self.addCircle, self.addMan, self.addTemple, self.addHourLabel, self.addAirport)
+
+    def render(self, displayList):
+        # renders a feet frame display list (see map.buildDisplayList)
+        replayDisplayList(displayList, *self.callbacks())
+        return self
+
+    def content(self):
+        return buildSvgContent(self.svg_groups, self.max_distance, self.symbols.values())
+
+    def save(self, fileName):
+        with open(fileName, "w") as svg_file:
+            svg_file.write(self.content())
+
+
+def formatFixed(units, precision):
+    # integer count of 10**-precision as a decimal string without trailing zeros: 1250, 2 -> "12.5"
+    whole, fraction = divmod(abs(units), 10 ** precision)
+    fraction = f"{fraction:0{precision}d}".rstrip('0') if precision > 0 else ''
+    return ('-' if units < 0 else '') + str(whole) + ('.' + fraction if fraction else '')
+
+def svgHeader(halfSize, size, symbols):
+    xlink = f' xmlns:xlink="{XLINK_NAMESPACE}"' if symbols else ''
+    return f'<svg xmlns="{SVG_NAMESPACE}"{xlink} viewBox="-{halfSize} -{halfSize} {size} {size}" width="{size}" height="{size}">'
+
+
+class SvgStreamWriter(SvgRenderer):
+    """
+    Writes the svg straight to a file handle while a display list is replayed, nothing is collected.
+    Coordinates are rounded to precision decimals of a pixel, and consecutive lines, arches and circles of a layer
+    are merged into one <path> of relative commands, so a whole layer is one element instead of thousands:
+        with open("map.svg", "w") as stream:
+            SvgStreamWriter(stream, precision=2, mirrorX=True).render(displayList)
+    Takes the same options as SvgRenderer. The viewBox comes from the display list, so it has to be given up front.
+    """
+    def __init__(self, stream, precision=SVG_PRECISION, **options):
+        super().__init__(**options)
+        self.write = stream.write
+        self.precision = precision
+        self.unit = 10 ** precision
+        self.path = [] # commands of the open path
+        self.cursor = None # pen position in the open path, in 10**-precision pixels
+        self.command = None # last command letter, repeats are left out
+        self.layerCounters = {}
+
+    def quantize(self, x, y):
+        # everything is rounded once on the absolute position, relative moves are exact differences of those
+        return round(x * self.unit), round(y * self.unit)
+
+    def number(self, units):
+        return formatFixed(units, self.precision)
+
+    def pathCommand(self, command, *values):
+        self.path.append(" ".join(values) if command == self.command else command + " " + " ".join(values))
+        self.command = command
+
+    def moveTo(self, point):
+        if point == self.cursor: # touching segments are one stroke
+            return
+        if self.cursor is None:
+            self.pathCommand('M', self.number(point[0]), self.number(point[1]))
+        else:
+            self.pathCommand('m', self.number(point[0] - self.cursor[0]), self.number(point[1] - self.cursor[1]))
+        self.cursor = point
+
+    def lineTo(self, point):
+        self.pathCommand('l', self.number(point[0] - self.cursor[0]), self.number(point[1] - self.cursor[1]))
+        self.cursor = point
+
+    def arcTo(self, radius, largeArc, sweep, point):
+        radius = self.number(radius)
+        self.pathCommand('a', radius, radius, '0', str(largeArc), str(sweep),
+                         self.number(point[0] - self.cursor[0]), self.number(point[1] - self.cursor[1]))
+        self.cursor = point
+
+    def flushPath(self):
+        if self.path:
+            self.write(f'<path d="{" ".join(self.path)}" fill="none" stroke="{self.strokeColor}" />\n')
+        self.path = []
+        self.cursor = None
+        self.command = None
+
+    def addArch(self, startAngle, endAngle, archRadius, center, name):
+        startX, startY, endX, endY, large_arc_flag, sweep_flag = self.archEndpoints(startAngle, endAngle, archRadius, center)
+        self.moveTo(self.quantize(startX, startY))
+        self.arcTo(round(archRadius / self.feetPerPixel * self.unit), large_arc_flag, sweep_flag, self.quantize(endX, endY))
+
+    def addLine(self, startCoordinates, endCoordinates, name):
+        self.moveTo(self.quantize(*self.convertFeetToXY(startCoordinates)))
+        self.lineTo(self.quantize(*self.convertFeetToXY(endCoordinates)))
+
+    def addCircle(self, location, width, name):
+        # two half circles from the west point, where toolpath.py expects the head to enter
+        west = self.quantize(*self.convertFeetToXY([location[0] - width / 2, location[1]]))
+        east = self.quantize(*self.convertFeetToXY([location[0] + width / 2, location[1]]))
+        radius = round(width / (2 * self.feetPerPixel) * self.unit)
+        self.moveTo(west)
+        self.arcTo(radius, 1, 1, east)
+        self.arcTo(radius, 1, 1, west)
+
+    def addIcon(self, filename, centerX, centerY, width, name, rotation=0):
+        self.flushPath()
+        symbol = iconSymbol(filename)
+        min_x, min_y, vb_width, vb_height = symbol.viewBox
+        height = width * vb_height / vb_width
+        x, y = self.quantize(centerX - width / 2, centerY - height / 2)
+        transform = f' transform="rotate({rotation:g}, {centerX}, {centerY})"' if rotation else ''
+        self.write(f'<use xlink:href="#{symbol.id}" x="{self.number(x)}" y="{self.number(y)}" '
+                   f'width="{self.number(round(width * self.unit))}" height="{self.number(round(height * self.unit))}"{transform} />\n')
+
+    def addHourLabel(self, hour, minute, location, bearing):
+        label = self.hourLabel(hour, minute, location, bearing)
+        if label is None:
+            return
+        self.flushPath()
+        text, x, y = label[0], self.number(round(label[1] * self.unit)), self.number(round(label[2] * self.unit))
+        self.write(f'<text x="{x}" y="{y}" transform="rotate({label[3]:g}, {x}, {y})" text-anchor="middle" fill="{self.strokeColor}" '
+                   f'font-size="{self.hourFontSize}" font-family="{self.hourFont}">{text}</text>\n')
+
+    def maxDistance(self, displayList):
+        # same as SvgRenderer.max_distance: furthest line end from the center, in pixels
+        lines = np.isin(displayList.kinds, (PRIMITIVE_LINE, PRIMITIVE_FENCE_LINE))
+        if not lines.any():
+            return 0
+        ends = displayList.values[lines, :4] * np.where(displayList.kinds[lines] == PRIMITIVE_FENCE_LINE, self.fenceScale, 1)[:, None]
+        return float(np.abs(ends).max()) / self.feetPerPixel
+
+    def beginLayer(self, layer):
+        layer_id = layer.replace(' ', '_')
+        count = self.layerCounters.get(layer_id, 0)
+        self.layerCounters[layer_id] = count + 1
+        self.write(f'<g id="{layer_id}_{count}">\n' if count else f'<g id="{layer_id}">\n')
+
+    def endLayer(self):
+        self.flushPath()
+        self.write('</g>\n')
+
+    def render(self, displayList):
+        # writes a whole document for a feet frame display list (see map.buildDisplayList)
+        kinds = set(displayList.kinds.tolist())
+        symbols = [iconSymbol(filename) for kind, filename in ICON_FILES.items() if kind in kinds and os.path.isfile(filename)]
+        halfSize = math.ceil(self.maxDistance(displayList) * self.unit)
+        self.write(svgHeader(self.number(halfSize), self.number(2 * halfSize), symbols) + '\n')
+        if symbols:
+            self.write('<defs>\n{}\n</defs>\n'.format("\n".join(symbol.markup for symbol in symbols)))
+
+        for layer, primitives in itertools.groupby(iterDisplayList(displayList), key=lambda primitive: primitive.layer):
+            self.beginLayer(layer)
+            replayPrimitives(primitives, *self.callbacks())
+            self.endLayer()
+        self.write('</svg>\n')
+        return self
+
+    def content(self):
+        raise TypeError("SvgStreamWriter writes to its stream, see render")
+
+
+def writeSvg(displayList, fileName, precision=SVG_PRECISION, **options):
+    # streams a feet frame display list to fileName, options go to SvgRenderer
+    with open(fileName, "w") as svg_file:
+        SvgStreamWriter(svg_file, precision, **options).render(displayList)
+
+def renderSvgGroups(displayList, **options):
+    # renders a feet frame display list with a new SvgRenderer, returns (svg_groups, max_distance, symbols)
+    renderer = SvgRenderer(**options).render(displayList)
+    return renderer.svg_groups, renderer.max_distance, renderer.symbols
+
+def buildSvgContent(groups, maxDistance, symbols=()):
+    # Generate the SVG content, symbols of used icons go to <defs>
+    svg_group_elements = []
+    symbols = list(symbols)
+    if symbols:
+        svg_group_elements.append('<defs>\n{}\n</defs>'.format("\n".join(symbol.markup for symbol in symbols)))
+    for name, paths in groups.items():
+        group = '<g id="{}">\n{}\n</g>'.format(name, "\n  ".join(paths))
+        svg_group_elements.append(group)
+
+    # Set the viewBox size based on the maximum distance
+    viewBox_size = maxDistance * 2
+
+    return '''
+<svg xmlns="http://www.w3.org/2000/svg"{3} viewBox="-{0} -{0} {1} {1}" width="{1}" height="{1}">
   {2}
 </svg>
-'''.format(viewBox_size / 2, viewBox_size, "\n  ".join(svg_group_elements))
-
-# Write the SVG content to a file
-with open(f"../renders/burning_man_map_{YEAR}.svg", "w") as svg_file:
-    svg_file.write(svg_content)
+'''.format(viewBox_size / 2, viewBox_size, "\n  ".join(svg_group_elements), f' xmlns:xlink="{XLINK_NAMESPACE}"' if symbols else '')
+
+def renderSvgMap(layout=None, fileName=None, **options):
+    # renders the map into ../renders/burning_man_map_YEAR.svg by default, returns the file name.
+    # options go to SvgRenderer
+    layout = layout or DEFAULT_LAYOUT
+    renderer = SvgRenderer(**options)
+    renderMap(*renderer.callbacks(), 1.5, frame=FRAME_FEET, layout=layout)
+
+    # Write the SVG content to a file
+    file_name = fileName or f"../renders/burning_man_map_{layout.year}.svg"
+    renderer.save(file_name)
+    return file_name
+
+if __name__ == "__main__":
+    renderSvgMap()
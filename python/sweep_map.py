@@ -0,0 +1,138 @@
+"""
+Parametric sweep: renders one svg per combination of a parameter grid, for prints and lids at many sizes.
+
+Variants only differ by scale, mirroring and the fence scale, so the map geometry (display list in feet) is computed once
+and every variant is just a different SvgStreamWriter over it, fanned out to worker processes.
+The display list is put in cutting order once (toolpath.py), scaling and mirroring don't change the best order.
+Writes the files plus sweep_manifest.json with the parameters, file and render time of every variant.
+
+    sweepMap({"cityDiameterCm": [4.7, 9.4], "fenceScale": [1, 1.2], "mirrorX": [False, True]}, "../renders/sweep")
+
+usage: python sweep_map.py -o ../renders/sweep --city-diameter-cm 4.7 9.4 --fence-scale 1 1.2 --mirror-x false true
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+import coordinates
+from map import buildDisplayList, FRAME_FEET, DEFAULT_LAYOUT, layoutForYear, YEAR
+import svg_map
+from toolpath import optimizeToolpath
+
+EXTEND_RADIAL_NAMES_BY_BLOCKS = 1.5 # same as svg_map and the Fusion plugin
+PIXELS_PER_CM = 96 / 2.54 # svg pixels are 1/96 inch
+MANIFEST_NAME = "sweep_manifest.json"
+
+def parseBool(value):
+    if value.lower() in ("1", "true", "yes", "on"):
+        return True
+    if value.lower() in ("0", "false", "no", "off"):
+        return False
+    raise argparse.ArgumentTypeError(f"expected true or false, got {value}")
+
+# parameter -> (type, command line flag)
+# cityDiameterCm is lid_city_diameter of the Fusion plugin: K street diameter on the print, overrides feetPerPixel
+SWEEP_PARAMETERS = {
+    "feetPerPixel": (float, "--feet-per-pixel"),
+    "cityDiameterCm": (float, "--city-diameter-cm"),
+    "fenceScale": (float, "--fence-scale"),
+    "mirrorX": (parseBool, "--mirror-x"),
+    "flipY": (parseBool, "--flip-y"),
+}
+
+# worker process state, set by initWorker
+workerDisplayList = None
+
+def initWorker(displayList):
+    # the display list is sent once per worker instead of once per variant
+    global workerDisplayList
+    workerDisplayList = displayList
+
+def sweepVariants(grid):
+    # {"fenceScale": [1, 1.2], "mirrorX": [False, True]} -> every combination as a dict, in grid order
+    for name in grid:
+        if name not in SWEEP_PARAMETERS:
+            raise ValueError(f"Unknown sweep parameter: {name}, expected one of {list(SWEEP_PARAMETERS)}")
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+def variantName(variant):
+    # part of the file name: cityDiameterCm4.7_fenceScale1.2_mirrorX, "default" when nothing is set
+    parts = []
+    for name, value in variant.items():
+        if isinstance(value, bool):
+            if value:
+                parts.append(name)
+        else:
+            parts.append(f"{name}{value:g}")
+    return "_".join(parts) or "default"
+
+def rendererOptions(variant, layout):
+    options = {name: value for name, value in variant.items() if name != "cityDiameterCm"}
+    if "cityDiameterCm" in variant:
+        options["feetPerPixel"] = layout.diameterKInFeet / (variant["cityDiameterCm"] * PIXELS_PER_CM)
+    return options
+
+def renderVariant(options, fileName):
+    # runs in a worker process, returns (file name, seconds)
+    start = time.perf_counter()
+    svg_map.writeSvg(workerDisplayList, fileName, **options)
+    return fileName, time.perf_counter() - start
+
+def sweepMap(grid, outputDirectory="../renders/sweep", workers=None, layout=None, toolpath=True):
+    """
+    Renders every combination of grid (parameter -> list of values, see SWEEP_PARAMETERS) to outputDirectory
+    as burning_man_map_YEAR_VARIANT.svg and writes the manifest. Returns the manifest.
+    toolpath=False keeps the renderMap order
+    """
+    layout = layout or DEFAULT_LAYOUT
+    variants = sweepVariants(grid)
+    os.makedirs(outputDirectory, exist_ok=True)
+
+    start = time.perf_counter()
+    displayList = buildDisplayList(EXTEND_RADIAL_NAMES_BY_BLOCKS, FRAME_FEET, layout)
+    toolpathReport = None
+    if toolpath:
+        displayList, toolpathReport = optimizeToolpath(displayList)
+    geometrySeconds = time.perf_counter() - start
+
+    fileNames = [os.path.join(outputDirectory, f"burning_man_map_{layout.year}_{variantName(variant)}.svg") for variant in variants]
+    with Pool(workers or min(len(variants), os.cpu_count() or 1), initWorker, (displayList,)) as pool:
+        results = [pool.apply_async(renderVariant, (rendererOptions(variant, layout), fileName))
+                   for variant, fileName in zip(variants, fileNames)]
+        seconds = [result.get()[1] for result in results]
+
+    manifest = {
+        "year": layout.year,
+        "layout": layout.fingerprint,
+        "geodesicBackend": coordinates.geodesicBackend,
+        "geometrySeconds": geometrySeconds,
+        "toolpath": toolpathReport, # pen-up travel in feet before and after ordering
+        "totalSeconds": time.perf_counter() - start,
+        "variants": [{"file": os.path.basename(fileName), "parameters": variant, "seconds": variantSeconds}
+                     for variant, fileName, variantSeconds in zip(variants, fileNames, seconds)],
+    }
+    with open(os.path.join(outputDirectory, MANIFEST_NAME), "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser(description="Render svg variants for every combination of the given parameters")
+    parser.add_argument("-o", "--output-dir", default="../renders/sweep")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="one process per core by default")
+    parser.add_argument("-y", "--year", type=int, default=YEAR)
+    parser.add_argument("--no-toolpath", action="store_true", help="keep the renderMap order instead of the cutting order")
+    for name, (parameterType, flag) in SWEEP_PARAMETERS.items():
+        parser.add_argument(flag, dest=name, nargs="+", type=parameterType, default=None)
+    args = parser.parse_args()
+
+    grid = {name: getattr(args, name) for name in SWEEP_PARAMETERS if getattr(args, name) is not None}
+    manifest = sweepMap(grid, args.output_dir, args.workers, layoutForYear(args.year), not args.no_toolpath)
+    print(f"{len(manifest['variants'])} variants in {manifest['totalSeconds'] * 1000:.1f} ms, "
+          f"geometry {manifest['geometrySeconds'] * 1000:.1f} ms", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
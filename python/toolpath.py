@@ -0,0 +1,359 @@
+"""
+Toolpath ordering for laser cutters and plotters. Primitives come out of renderMap in generation order (all letter
+streets, then radials, then plazas), so the head crosses the whole city between cuts.
+
+optimizeToolpath chains touching lines and arches into continuous strokes, then orders the strokes of every layer
+with nearest neighbour followed by 2-opt, both on a grid spatial index. Layers stay in map order, so every layer is
+still one group (one laser operation) in the svg, and the optimized display list works with any renderer:
+
+    displayList, report = optimizeToolpath(buildDisplayList(1.5, FRAME_FEET, layout))
+    svg_map.writeSvg(displayList, "map.svg")
+    print(report["before"], report["after"]) # pen-up travel in feet
+
+Lines are reversed by swapping their ends, arches by swapping their angles (endAngle < startAngle is counterclockwise).
+
+usage: python toolpath.py -y 2024 -o ../renders/burning_man_map_2024_toolpath.svg
+"""
+import argparse
+import itertools
+import math
+import re
+import sys
+import time
+import numpy as np
+from map import buildDisplayList, iterDisplayList, DisplayList, FRAME_FEET, YEAR, layoutForYear, \
+    PRIMITIVE_ARCH, PRIMITIVE_LINE, PRIMITIVE_FENCE_LINE, PRIMITIVE_CIRCLE
+import svg_map
+
+EXTEND_RADIAL_NAMES_BY_BLOCKS = 1.5 # same as svg_map
+CHAIN_TOLERANCE = 0.01 # feet, ends closer than this touch
+TWO_OPT_NEIGHBOURS = 8 # strokes considered for every 2-opt move, from the spatial index
+TWO_OPT_MAX_PASSES = 50
+
+def arcPoint(center, radius, bearing):
+    # bearing is clockwise from north, same as map.py
+    return (center[0] + radius * math.sin(math.radians(bearing)), center[1] + radius * math.cos(math.radians(bearing)))
+
+def segmentEnds(kind, row):
+    # (start, end) of a primitive the head cuts, in feet, None for icons and labels.
+    # Circles start and end at their west point, same as SvgStreamWriter draws them
+    if kind == PRIMITIVE_ARCH:
+        return arcPoint(row[3:5], row[2], row[0]), arcPoint(row[3:5], row[2], row[1])
+    if kind in (PRIMITIVE_LINE, PRIMITIVE_FENCE_LINE):
+        return (row[0], row[1]), (row[2], row[3])
+    if kind == PRIMITIVE_CIRCLE:
+        west = (row[0] - row[2] / 2, row[1])
+        return west, west
+    return None
+
+def reverseRow(kind, row):
+    if kind == PRIMITIVE_ARCH:
+        return [row[1], row[0]] + row[2:]
+    if kind in (PRIMITIVE_LINE, PRIMITIVE_FENCE_LINE):
+        return [row[2], row[3], row[0], row[1]] + row[4:]
+    return row
+
+def penUpTravel(displayList):
+    # feet the head travels between cuts, in display list order
+    travel = 0
+    position = None
+    for primitive in iterDisplayList(displayList):
+        ends = segmentEnds(primitive.kind, primitive.values)
+        if ends is None:
+            continue
+        if position is not None:
+            travel += math.dist(position, ends[0])
+        position = ends[1]
+    return travel
+
+
+class SpatialGrid:
+    # points bucketed in square cells, for neighbourhood and nearest point queries
+    def __init__(self, cellSize):
+        self.cellSize = cellSize
+        self.cells = {}
+        self.count = 0
+        self.bounds = None # (min cell x, min cell y, max cell x, max cell y)
+
+    def cell(self, point):
+        return math.floor(point[0] / self.cellSize), math.floor(point[1] / self.cellSize)
+
+    def add(self, point, item):
+        cell = self.cell(point)
+        self.cells.setdefault(cell, []).append((point, item))
+        self.count += 1
+        if self.bounds is None:
+            self.bounds = cell + cell
+        else:
+            self.bounds = (min(self.bounds[0], cell[0]), min(self.bounds[1], cell[1]), max(self.bounds[2], cell[0]), max(self.bounds[3], cell[1]))
+
+    def remove(self, point, item):
+        cell = self.cell(point)
+        entries = self.cells[cell]
+        entries.remove((point, item))
+        if not entries:
+            del self.cells[cell]
+        self.count -= 1
+
+    def ring(self, center, distance):
+        # occupied part of the cells exactly distance cells away from center (chebyshev)
+        cx, cy = center
+        minX, minY, maxX, maxY = self.bounds
+        if distance == 0:
+            yield center
+            return
+        for y in (cy - distance, cy + distance):
+            if minY <= y <= maxY:
+                for x in range(max(cx - distance, minX), min(cx + distance, maxX) + 1):
+                    yield x, y
+        for x in (cx - distance, cx + distance):
+            if minX <= x <= maxX:
+                for y in range(max(cy - distance + 1, minY), min(cy + distance - 1, maxY) + 1):
+                    yield x, y
+
+    def near(self, point, radius):
+        # items within radius of point
+        cx, cy = self.cell(point)
+        reach = math.ceil(radius / self.cellSize)
+        for x in range(cx - reach, cx + reach + 1):
+            for y in range(cy - reach, cy + reach + 1):
+                for entry, item in self.cells.get((x, y), ()):
+                    if math.dist(entry, point) <= radius:
+                        yield item
+
+    def nearest(self, point, k=1):
+        # up to k (distance, item) pairs closest to point, closest first
+        if self.count == 0:
+            return []
+        center = self.cell(point)
+        minX, minY, maxX, maxY = self.bounds
+        # rings between the first and the last one that reach occupied cells
+        minRing = max(minX - center[0], center[0] - maxX, minY - center[1], center[1] - maxY, 0)
+        maxRing = max(abs(center[0] - minX), abs(center[0] - maxX), abs(center[1] - minY), abs(center[1] - maxY))
+        found = []
+        for distance in range(minRing, maxRing + 1):
+            # a cell that is distance rings away holds nothing closer than (distance - 1) cells
+            if len(found) >= k and (distance - 1) * self.cellSize > found[k - 1][0]:
+                break
+            for cell in self.ring(center, distance):
+                for entry, item in self.cells.get(cell, ()):
+                    found.append((math.dist(entry, point), item))
+            found.sort(key=lambda pair: pair[0])
+        return found[:k]
+
+def gridFor(points, tolerance):
+    # about one point per cell
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    if len(points) == 0:
+        return SpatialGrid(1)
+    extent = max(float(np.ptp(points[:, 0])), float(np.ptp(points[:, 1])))
+    return SpatialGrid(max(extent / math.sqrt(len(points)), tolerance, 1e-9))
+
+
+class Stroke:
+    # touching segments cut without lifting the head: pieces are (primitive index, reversed)
+    def __init__(self, pieces, start, end):
+        self.pieces = pieces
+        self.start = start
+        self.end = end
+
+    def ends(self, reverse):
+        return (self.end, self.start) if reverse else (self.start, self.end)
+
+    def oriented(self, reverse):
+        if not reverse:
+            return self.pieces
+        return [(index, not reversed_) for index, reversed_ in reversed(self.pieces)]
+
+def chainSegments(segments, tolerance=CHAIN_TOLERANCE):
+    # segments: (primitive index, start, end) in map order -> list of Stroke.
+    # Every stroke grows forward from its first segment, then backward, taking the earliest touching segment
+    grid = gridFor([point for segment in segments for point in segment[1:]], tolerance)
+    for position, (index, start, end) in enumerate(segments):
+        grid.add(start, (position, False))
+        grid.add(end, (position, True))
+    used = [False] * len(segments)
+
+    def take(position):
+        used[position] = True
+        index, start, end = segments[position]
+        grid.remove(start, (position, False))
+        grid.remove(end, (position, True))
+
+    def touching(point):
+        candidates = [item for item in grid.near(point, tolerance) if not used[item[0]]]
+        return min(candidates) if candidates else None
+
+    strokes = []
+    for position, (index, start, end) in enumerate(segments):
+        if used[position]:
+            continue
+        take(position)
+        pieces = [(index, False)]
+        if math.dist(start, end) > tolerance: # closed segments (circles) are strokes on their own
+            while math.dist(end, start) > tolerance and (candidate := touching(end)) is not None:
+                take(candidate[0])
+                other, otherStart, otherEnd = segments[candidate[0]]
+                reverse = candidate[1] # touching at its end, cut it backwards
+                pieces.append((other, reverse))
+                end = otherStart if reverse else otherEnd
+            while math.dist(end, start) > tolerance and (candidate := touching(start)) is not None:
+                take(candidate[0])
+                other, otherStart, otherEnd = segments[candidate[0]]
+                reverse = not candidate[1] # must end where the stroke starts
+                pieces.insert(0, (other, reverse))
+                start = otherEnd if reverse else otherStart
+        strokes.append(Stroke(pieces, start, end))
+    return strokes
+
+def routeTravel(strokes, route, startPoint):
+    travel = 0
+    position = startPoint
+    for stroke, reverse in route:
+        entry, exit_ = strokes[stroke].ends(reverse)
+        if position is not None:
+            travel += math.dist(position, entry)
+        position = exit_
+    return travel
+
+def nearestNeighbourRoute(strokes, startPoint, tolerance=CHAIN_TOLERANCE):
+    # always goes to the closest free stroke end, returns [(stroke index, reversed)]
+    grid = gridFor([point for stroke in strokes for point in (stroke.start, stroke.end)], tolerance)
+    for index, stroke in enumerate(strokes):
+        grid.add(stroke.start, (index, False))
+        grid.add(stroke.end, (index, True))
+    route = []
+    position = startPoint if startPoint is not None else strokes[0].start
+    while grid.count:
+        distance, (index, reverse) = grid.nearest(position)[0]
+        grid.remove(strokes[index].start, (index, False))
+        grid.remove(strokes[index].end, (index, True))
+        route.append((index, reverse))
+        position = strokes[index].ends(reverse)[1]
+    return route
+
+def twoOpt(strokes, route, startPoint, neighbours=TWO_OPT_NEIGHBOURS, maxPasses=TWO_OPT_MAX_PASSES):
+    """
+    Reverses runs of the route while that shortens the travel. A run i..j is reversed as a whole (every stroke of it
+    is cut backwards), the move only changes the hops into i and out of j. Only runs that end at one of the nearest
+    strokes of the hop into i are tried, found with the spatial index.
+    """
+    if len(route) < 2:
+        return route
+    route = list(route)
+    grid = gridFor([point for stroke in strokes for point in (stroke.start, stroke.end)], CHAIN_TOLERANCE)
+    for index, stroke in enumerate(strokes):
+        grid.add(stroke.start, index)
+        grid.add(stroke.end, index)
+    candidates = {} # point -> nearby stroke indexes
+    def nearby(point):
+        if point not in candidates:
+            candidates[point] = list(dict.fromkeys(index for distance, index in grid.nearest(point, 2 * neighbours)))[:neighbours]
+        return candidates[point]
+
+    for _ in range(maxPasses):
+        improved = False
+        positions = {stroke: position for position, (stroke, reverse) in enumerate(route)}
+        for i in range(len(route)):
+            previous = startPoint if i == 0 else strokes[route[i - 1][0]].ends(route[i - 1][1])[1]
+            if previous is None:
+                continue
+            entry = strokes[route[i][0]].ends(route[i][1])[0]
+            for stroke in nearby(previous):
+                j = positions[stroke]
+                if j <= i:
+                    continue
+                exit_ = strokes[route[j][0]].ends(route[j][1])[1]
+                nextEntry = strokes[route[j + 1][0]].ends(route[j + 1][1])[0] if j + 1 < len(route) else None
+                # after the move previous -> old exit of j (new entry), old entry of i (new exit) -> next
+                gain = math.dist(previous, entry) - math.dist(previous, exit_)
+                if nextEntry is not None:
+                    gain += math.dist(exit_, nextEntry) - math.dist(entry, nextEntry)
+                if gain > 1e-9:
+                    route[i:j + 1] = [(index, not reverse) for index, reverse in reversed(route[i:j + 1])]
+                    for position in range(i, j + 1):
+                        positions[route[position][0]] = position
+                    entry = strokes[route[i][0]].ends(route[i][1])[0]
+                    improved = True
+        if not improved:
+            break
+    return route
+
+def optimizeToolpath(displayList, tolerance=CHAIN_TOLERANCE, keepLayers=True):
+    """
+    Reorders a FRAME_FEET display list for cutting, returns (display list, report). Report has pen-up travel in feet
+    before and after, and the number of cut segments and strokes. Icons and labels go after the cuts of their layer.
+    keepLayers=False optimizes all layers as one, streets chain into radials, but layers are split up in the output
+    """
+    if displayList.frame != FRAME_FEET:
+        raise ValueError(f"Toolpaths are optimized in the feet frame, got {displayList.frame}")
+    primitives = list(iterDisplayList(displayList))
+    order = [] # (primitive index, reversed)
+    position = None
+    segmentCount = strokeCount = 0
+    for layer, group in itertools.groupby(range(len(primitives)), key=lambda index: primitives[index].layer if keepLayers else None):
+        group = list(group)
+        segments = []
+        for index in group:
+            ends = segmentEnds(primitives[index].kind, primitives[index].values)
+            if ends is not None:
+                segments.append((index,) + ends)
+        if segments:
+            strokes = chainSegments(segments, tolerance)
+            route = twoOpt(strokes, nearestNeighbourRoute(strokes, position, tolerance), position)
+            for stroke, reverse in route:
+                order += strokes[stroke].oriented(reverse)
+            position = strokes[route[-1][0]].ends(route[-1][1])[1]
+            segmentCount += len(segments)
+            strokeCount += len(strokes)
+        cut = {index for index, start, end in segments}
+        order += [(index, False) for index in group if index not in cut]
+
+    indexes = np.array([index for index, reverse in order], dtype=np.int64)
+    values = np.array([reverseRow(primitives[index].kind, primitives[index].values) if reverse else primitives[index].values
+                       for index, reverse in order], dtype=float).reshape(-1, displayList.values.shape[1])
+    optimized = DisplayList(displayList.kinds[indexes], values, displayList.names[indexes], displayList.layers[indexes],
+                            displayList.nameTable, displayList.frame)
+    for array in optimized[:4]:
+        array.flags.writeable = False
+    report = {"before": penUpTravel(displayList), "after": penUpTravel(optimized), "segments": segmentCount, "strokes": strokeCount}
+    return optimized, report
+
+def svgArchStartErrors(displayList):
+    # {(mirrorX, flipY): largest distance in pixels between where svg_map starts an arch and where the toolpath
+    # expects the head}, should be rounding noise for every reflection
+    errors = {}
+    for mirrorX, flipY in itertools.product((False, True), repeat=2):
+        renderer = svg_map.SvgRenderer(mirrorX=mirrorX, flipY=flipY)
+        error = 0
+        for primitive in iterDisplayList(displayList):
+            if primitive.kind != PRIMITIVE_ARCH:
+                continue
+            row = primitive.values
+            renderer.addArch(row[0], row[1], row[2], row[3:5], primitive.name)
+            path = renderer.svg_groups[svg_map.sanitize_name(primitive.name)][-1]
+            start = [float(value) for value in re.search(r'd="M (\S+) (\S+) A', path).groups()]
+            error = max(error, math.dist(start, renderer.convertFeetToXY(segmentEnds(primitive.kind, row)[0])))
+        errors[(mirrorX, flipY)] = error
+    return errors
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the svg in cutting order and report the pen-up travel")
+    parser.add_argument("-y", "--year", type=int, default=YEAR)
+    parser.add_argument("-o", "--output", default=None, help="../renders/burning_man_map_YEAR_toolpath.svg by default")
+    parser.add_argument("--mix-layers", action="store_true", help="optimize all layers as one, layers are split up in the svg")
+    args = parser.parse_args()
+
+    displayList = buildDisplayList(EXTEND_RADIAL_NAMES_BY_BLOCKS, FRAME_FEET, layoutForYear(args.year))
+    start = time.perf_counter()
+    optimized, report = optimizeToolpath(displayList, keepLayers=not args.mix_layers)
+    seconds = time.perf_counter() - start
+    svg_map.writeSvg(optimized, args.output or f"../renders/burning_man_map_{args.year}_toolpath.svg")
+    print(f"{report['segments']} segments in {report['strokes']} strokes, pen-up travel {report['before']:.0f} ft -> "
+          f"{report['after']:.0f} ft in {seconds * 1000:.1f} ms", file=sys.stderr)
+    for (mirrorX, flipY), error in svgArchStartErrors(optimized).items():
+        if error > 1e-6:
+            sys.exit(f"svg arches don't start where the toolpath expects with mirrorX={mirrorX} flipY={flipY}: {error} px off")
+
+if __name__ == "__main__":
+    main()
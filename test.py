@@ -1,29 +1,51 @@
-import json
 from collections import defaultdict
-from python.coordinates import locationObjectToCoordinate
+from python.coordinates import locationObjectsToCoordinates, LOCATION_ERROR, LOCATION_EMPTY
+from python.json_stream import iterJsonArray, chunked
+
+CHUNK_SIZE = 1000
 
 def count_camp_locations(file_path):
-    with open(file_path, 'r') as file:
-        data = json.load(file)
-    
     location_counts = defaultdict(int)
     location_details = {}
-    total_count = len(data)
+    total_count = 0
     
-    for item in data:
-        if 'location' in item:
-            location = item['location']
-            coordinates = tuple(locationObjectToCoordinate(location))  # Convert to tuple
-            location_counts[coordinates] += 1
-            # Only store one camp's details for each unique location
-            if coordinates not in location_details:
-                location_details[coordinates] = {
-                    "string": location.get('string', 'N/A'),
-                    "location": location
-                }
+    # stream the file and geocode it chunk by chunk, memory stays flat for any size of the dump
+    for chunk in chunked(iterJsonArray(file_path), CHUNK_SIZE):
+        total_count += len(chunk)
+        items = [item for item in chunk if 'location' in item]
+        result = locationObjectsToCoordinates(item['location'] for item in items)
+        count_chunk_locations(items, result, location_counts, location_details)
     
     return location_counts, location_details, total_count
 
+def count_chunk_locations(items, result, location_counts, location_details):
+    for item, lat, lon, kind, error in zip(items, result["lat"], result["lon"], result["kind"], result["error"]):
+        location = item['location']
+        if kind == LOCATION_ERROR:
+            print(f"Cannot resolve location: {error}")
+            continue
+        if kind == LOCATION_EMPTY or lat != lat or lon != lon: # NaN never equals itself, each one would be its own key
+            coordinates = (None, None)
+        else:
+            coordinates = (float(lat), float(lon))
+        location_counts[coordinates] += 1
+        # Only store one camp's details for each unique location
+        if coordinates not in location_details:
+            location_details[coordinates] = {
+                "string": location.get('string', 'N/A'),
+                "location": location
+            }
+
+def check_bad_records_keep_the_batch():
+    # one record that can't be converted to numbers must only error its own row
+    good = {'gps_latitude': 40.786, 'gps_longitude': -119.2065}
+    for bad in ({'gps_latitude': 'abc', 'gps_longitude': 'x'},
+                {'hour': 3, 'minute': 0, 'distance': 'far'},
+                {'hour': 'x', 'minute': 0, 'distance': 2500}):
+        result = locationObjectsToCoordinates([good, bad])
+        assert result["kind"][1] == LOCATION_ERROR and result["error"][1] is not None, bad
+        assert result["error"][0] is None and (float(result["lat"][0]), float(result["lon"][0])) == (40.786, -119.2065), bad
+
 def print_location_counts(location_counts, location_details, total_count):
     unique_locations = 0
     non_unique_locations = 0
@@ -54,6 +76,7 @@ def print_location_counts(location_counts, location_details, total_count):
     print(f"Sum of None, Unique, and Non-Unique counts: \t{total_non_unique_unique}")
 
 if __name__ == "__main__":
+    check_bad_records_keep_the_batch()
     camp_file_path = 'camp.json'
     location_counts, location_details, total_count = count_camp_locations(camp_file_path)
     
@@ -62,9 +85,7 @@ if __name__ == "__main__":
 
 
 def count_items(file_path):
-    with open(file_path, 'r') as file:
-        data = json.load(file)
-    return len(data)
+    return sum(1 for _ in iterJsonArray(file_path))
 
 def main():
     event_file_path = 'event.json'